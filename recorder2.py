@@ -1,25 +1,4728 @@
-import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
-import cv2
 import threading
-import numpy as np
 import os
-from datetime import datetime
+import time
+from array import array
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime, timedelta
+
+STARTED = time.monotonic()  # Reference point for startup timings
+
+class _LazyModule:
+    """Placeholder for a heavy module; the first attribute access imports it
+    
+    The loader rebinds the module-level name to the real module, so later lookups
+    never go through the placeholder. Plain import statements in the loaders keep the
+    modules visible to PyInstaller's analysis.
+    """
+    
+    def __init__(self, load):
+        self._load = load
+    
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+def _import_cv2():
+    global cv2
+    import cv2
+    return cv2
+
+def _import_numpy():
+    global np
+    import numpy as np
+    return np
+
+# OpenCV and NumPy dominate import time; the window paints before either is loaded
+cv2 = _LazyModule(_import_cv2)
+np = _LazyModule(_import_numpy)
+
+def preload_modules():
+    """Import the heavy modules now, e.g. on a background thread once the window is up"""
+    np.ndarray
+    cv2.VideoCapture
+
+try:
+    import tkinter as tk
+    from tkinter import ttk, messagebox, filedialog
+except ImportError:  # Headless capture boxes may not ship Tk
+    tk = None
+
+class LatencyHistogram:
+    """Latency counts over fixed millisecond buckets plus a running sum
+    
+    Counts can live in a caller-supplied float64 array, so an encoder process can record
+    into shared memory that the capture process reads. observe() takes no lock: each
+    histogram has a single writer.
+    """
+    
+    BOUNDS_MS = (1, 2, 5, 10, 20, 30, 40, 50, 75, 100, 250, 500, 1000)
+    SIZE = len(BOUNDS_MS) + 2  # Buckets, the +Inf bucket, then the sum in seconds
+    
+    def __init__(self, values=None):
+        self.values = np.zeros(self.SIZE) if values is None else values
+        self.lock = threading.Lock()  # Guards swapping the storage out from under readers
+    
+    def observe(self, seconds):
+        self.values[bisect_left(self.BOUNDS_MS, seconds * 1000)] += 1
+        self.values[-1] += seconds
+    
+    def snapshot(self):
+        """Cumulative bucket counts keyed by upper bound in seconds, with count, sum and quantiles"""
+        with self.lock:
+            values = np.array(self.values)
+        cumulative = np.cumsum(values[:-1])
+        count = int(cumulative[-1])
+        buckets = {f"{bound / 1000:g}": int(n) for bound, n in zip(self.BOUNDS_MS, cumulative)}
+        buckets['+Inf'] = count
+        return {
+            'buckets': buckets,
+            'count': count,
+            'sum': float(values[-1]),
+            'mean_ms': float(values[-1]) * 1000 / count if count else None,
+            'p50_ms': self.quantile_ms(cumulative, 0.5),
+            'p99_ms': self.quantile_ms(cumulative, 0.99)
+        }
+    
+    def quantile_ms(self, cumulative, q):
+        """Upper bound of the bucket holding quantile q, capped at the last bound; None without samples"""
+        if not cumulative[-1]:
+            return None
+        position = int(np.searchsorted(cumulative, q * cumulative[-1]))
+        return self.BOUNDS_MS[min(position, len(self.BOUNDS_MS) - 1)]
+
+class FrameRing:
+    """Bounded ring of preallocated frame slots joining a capture and an encode stage
+    
+    Slots hold either decoded frames or, with a 1-D frame_shape, variable-length
+    compressed payloads (e.g. MJPEG) up to the slot size.
+    """
+    
+    OVERFLOW_POLICIES = ('block', 'drop_oldest', 'drop_newest')
+    
+    def __init__(self, capacity, frame_shape=None, overflow='drop_oldest'):
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        if capacity < 2:
+            raise ValueError("Frame ring needs at least 2 slots")
+        
+        self.capacity = capacity
+        self.overflow = overflow
+        # Slots are allocated up front so the hot path only ever copies into them
+        self.slots = [np.empty(frame_shape, dtype=np.uint8) if frame_shape else None
+                      for _ in range(capacity)]
+        self.timestamps = [0.0] * capacity
+        self.lengths = [None] * capacity  # Payload bytes used, None for decoded frames
+        self.free_slots = deque(range(capacity))
+        self.ready_slots = deque()
+        self.cond = threading.Condition()
+        self.closed = False
+        
+        # Per-camera counters
+        self.frames_queued = 0
+        self.frames_dropped = 0
+        self.high_water = 0
+        self.encode_latency = LatencyHistogram()  # Filled by the encode side
+        self.frame_latency = LatencyHistogram()   # Capture to written, per frame
+    
+    def stats(self):
+        """Queue counters for metrics"""
+        return {'frames_queued': self.frames_queued, 'frames_dropped': self.frames_dropped,
+                'depth': self.depth, 'high_water': self.high_water}
+    
+    @property
+    def depth(self):
+        """Number of frames waiting to be encoded"""
+        return len(self.ready_slots)
+    
+    def put(self, frame, timestamp, block=False):
+        """Copy a frame into a free slot, applying the overflow policy when full
+        
+        block=True waits for a slot whatever the policy.
+        """
+        with self.cond:
+            if self.closed:
+                return False
+            
+            if not self.free_slots:
+                if self.overflow == 'block' or block:
+                    while not self.free_slots and not self.closed:
+                        self.cond.wait()
+                    if self.closed:
+                        return False
+                elif self.overflow == 'drop_oldest' and self.ready_slots:
+                    self.free_slots.append(self.ready_slots.popleft())
+                    self.frames_dropped += 1
+                else:
+                    # drop_newest, or nothing left to evict while the encoder holds a slot
+                    self.frames_dropped += 1
+                    return False
+            
+            slot_index = self.free_slots.popleft()
+        
+        # Copy outside the lock; the slot is owned by the producer until published
+        slot = self.slots[slot_index]
+        if frame.ndim == 1:
+            # Compressed payload: reuse the slot unless this one is bigger than any before
+            if slot is None or slot.ndim != 1 or slot.size < frame.size:
+                slot = self.slots[slot_index] = np.empty(frame.size * 2, dtype=np.uint8)
+            slot[:frame.size] = frame
+            self.lengths[slot_index] = frame.size
+        else:
+            if slot is None or slot.shape != frame.shape:
+                slot = self.slots[slot_index] = np.empty_like(frame)
+            np.copyto(slot, frame)
+            self.lengths[slot_index] = None
+        
+        with self.cond:
+            if self.closed:
+                self.free_slots.append(slot_index)
+                return False
+            self.timestamps[slot_index] = timestamp
+            self.ready_slots.append(slot_index)
+            self.frames_queued += 1
+            self.high_water = max(self.high_water, len(self.ready_slots))
+            self.cond.notify_all()
+        return True
+    
+    def get(self, timeout=None):
+        """Wait for the oldest queued slot; returns its index or None once closed and drained"""
+        with self.cond:
+            while not self.ready_slots:
+                if self.closed:
+                    return None
+                if not self.cond.wait(timeout):
+                    return None
+            return self.ready_slots.popleft()
+    
+    def frame(self, slot_index):
+        """The frame or payload held in a slot"""
+        length = self.lengths[slot_index]
+        slot = self.slots[slot_index]
+        return slot if length is None else slot[:length]
+    
+    def release(self, slot_index):
+        """Hand a slot back to the producer after it has been encoded"""
+        with self.cond:
+            self.free_slots.append(slot_index)
+            self.cond.notify_all()
+    
+    def close(self):
+        """Stop accepting frames; queued frames can still be drained"""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+class FrameSource:
+    """Base class for pluggable frame sources driven by the recorder engine"""
+    
+    # True when frames are 1-D JPEG payloads rather than decoded BGR images
+    compressed = False
+    
+    def __init__(self, camera_info):
+        self.camera_info = camera_info
+    
+    def open(self):
+        """Open the source; returns True when frames can be read"""
+        raise NotImplementedError
+    
+    def read(self):
+        """Return (ret, frame) like cv2.VideoCapture.read"""
+        raise NotImplementedError
+    
+    def grab(self):
+        """Latch the next frame without decoding it; returns True on success"""
+        self.grabbed = self.read()
+        return self.grabbed[0]
+    
+    def retrieve(self):
+        """Return (ret, frame) for the frame latched by grab()"""
+        return self.grabbed
+    
+    def get_properties(self):
+        """Return the (width, height, fps) the source delivers"""
+        raise NotImplementedError
+    
+    def release(self):
+        """Release any underlying device or file"""
+        pass
+
+class CaptureSource(FrameSource):
+    """Frame source backed by a cv2.VideoCapture"""
+    
+    def __init__(self, camera_info):
+        super().__init__(camera_info)
+        self.cap = None
+    
+    def create_capture(self):
+        raise NotImplementedError
+    
+    def open(self):
+        self.cap = self.create_capture()
+        return self.cap.isOpened()
+    
+    def read(self):
+        return self.cap.read()
+    
+    def grab(self):
+        return self.cap.grab()
+    
+    def retrieve(self):
+        return self.cap.retrieve()
+    
+    def get_properties(self):
+        width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = int(self.cap.get(cv2.CAP_PROP_FPS)) if self.cap.get(cv2.CAP_PROP_FPS) > 0 else 20
+        return width, height, fps
+    
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+
+class V4L2Source(CaptureSource):
+    """Live camera device (/dev/videoN on Linux)"""
+    
+    def create_capture(self):
+        # Use V4L2 backend explicitly on Linux for better compatibility
+        if os.name == 'posix':
+            return cv2.VideoCapture(self.camera_info['index'], cv2.CAP_V4L2)
+        return cv2.VideoCapture(self.camera_info['index'])
+    
+    def open(self):
+        if not super().open():
+            return False
+        
+        # Negotiate a mode from the advertised ones instead of taking the driver's default
+        camera_index = self.camera_info['index']
+        passthrough = self.camera_info.get('passthrough')
+        requested = choose_mode(self.camera_info.get('modes', ()), self.camera_info.get('mode'), passthrough)
+        if self.camera_info.get('low_latency'):
+            requested['buffers'] = 1  # Newest frame only, no driver queue behind it
+        self.apply_mode(requested)
+        granted = self.granted_mode()
+        self.profile = {'requested': requested, 'granted': granted}
+        if any(granted.get(key) != value for key, value in requested.items()):
+            print(f"Camera {camera_index}: requested {format_mode(requested)}, granted {format_mode(granted)}")
+        
+        if passthrough:
+            # Hand the driver's JPEG buffers through undecoded
+            if granted['fourcc'] == 'MJPG':
+                self.cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+                self.compressed = True
+            else:
+                print(f"Camera {camera_index} does not offer MJPEG; recording decoded frames")
+        return True
+    
+    def apply_mode(self, mode):
+        # Pixel format first: the driver re-validates size and rate against it
+        if 'fourcc' in mode:
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*mode['fourcc']))
+        if 'width' in mode:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, mode['width'])
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, mode['height'])
+        if 'fps' in mode:
+            self.cap.set(cv2.CAP_PROP_FPS, mode['fps'])
+        if 'buffers' in mode:
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, mode['buffers'])
+    
+    def granted_mode(self):
+        """The mode the driver actually settled on"""
+        return {
+            'fourcc': fourcc_to_str(self.cap.get(cv2.CAP_PROP_FOURCC)),
+            'width': int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            'height': int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            'fps': self.cap.get(cv2.CAP_PROP_FPS),
+            'buffers': int(self.cap.get(cv2.CAP_PROP_BUFFERSIZE))
+        }
+    
+    def retrieve(self):
+        ret, frame = self.cap.retrieve()
+        if ret and self.compressed:
+            frame = frame.reshape(-1)
+        return ret, frame
+    
+    def read(self):
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+class VideoFileSource(CaptureSource):
+    """Video file replayed at its native frame rate, looping at the end"""
+    
+    def __init__(self, camera_info):
+        super().__init__(camera_info)
+        self.next_frame_time = 0
+    
+    def create_capture(self):
+        return cv2.VideoCapture(self.camera_info['path'])
+    
+    def read(self):
+        if not self.grab():
+            return False, None
+        return self.cap.retrieve()
+    
+    def grab(self):
+        ret = self.cap.grab()
+        if not ret and self.camera_info.get('loop', True):
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret = self.cap.grab()
+        
+        # Pace playback like a live camera would
+        fps = self.cap.get(cv2.CAP_PROP_FPS)
+        if ret and fps > 0:
+            self.next_frame_time = pace_until(self.next_frame_time, 1.0 / fps)
+        return ret
+
+class SyntheticSource(FrameSource):
+    """Generated test pattern for load testing without cameras"""
+    
+    def __init__(self, camera_info):
+        super().__init__(camera_info)
+        self.frame_number = 0
+        self.next_frame_time = 0
+        self.pattern = None
+    
+    def open(self):
+        width, height, _ = self.get_properties()
+        # Emulate an MJPEG camera by compressing each frame
+        self.compressed = bool(self.camera_info.get('passthrough'))
+        
+        # Static gradient, a moving bar is drawn over a copy per frame
+        ramp = np.linspace(0, 255, width, dtype=np.uint8)
+        self.pattern = np.empty((height, width, 3), dtype=np.uint8)
+        self.pattern[:, :, 0] = ramp
+        self.pattern[:, :, 1] = ramp[::-1]
+        self.pattern[:, :, 2] = (self.camera_info['index'] * 40) % 256
+        return True
+    
+    def read(self):
+        self.grab()
+        return self.retrieve()
+    
+    def grab(self):
+        # fps of 0 means run unthrottled
+        fps = self.get_properties()[2]
+        if fps > 0:
+            self.next_frame_time = pace_until(self.next_frame_time, 1.0 / fps)
+        self.frame_number += 1
+        return True
+    
+    def retrieve(self):
+        frame = self.pattern.copy()
+        bar = (self.frame_number * 8) % frame.shape[1]
+        frame[:, bar:bar + 16] = 255
+        cv2.putText(frame, f"cam {self.camera_info['index']} #{self.frame_number}", (20, 50),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.2, (255, 255, 255), 2)
+        if self.compressed:
+            return True, cv2.imencode('.jpg', frame)[1].reshape(-1)
+        return True, frame
+    
+    def get_properties(self):
+        return (self.camera_info.get('width', 640), self.camera_info.get('height', 480),
+                self.camera_info.get('fps', 30))
+
+# Registry of frame sources, keyed by camera_info['source']
+FRAME_SOURCES = {
+    'v4l2': V4L2Source,
+    'file': VideoFileSource,
+    'synthetic': SyntheticSource,
+}
+
+class FrameMailbox:
+    """Latest-frame slot for preview; posting overwrites, nothing is ever queued"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.frame = None
+        self.timestamp = 0.0
+        self.sequence = 0        # Bumped on every post
+        self.taken_sequence = 0  # Sequence of the last frame handed to the renderer
+        
+        # Coalescing metrics
+        self.frames_posted = 0
+        self.frames_taken = 0
+    
+    def post(self, frame, timestamp):
+        """Publish a frame reference (no copy); an unrendered older frame is simply dropped"""
+        with self.lock:
+            self.frame = frame
+            self.timestamp = timestamp
+            self.sequence += 1
+            self.frames_posted += 1
+    
+    def take(self):
+        """Return (frame, timestamp) if a newer frame arrived since the last take, else None"""
+        with self.lock:
+            if self.sequence == self.taken_sequence:
+                return None
+            self.taken_sequence = self.sequence
+            self.frames_taken += 1
+            return self.frame, self.timestamp
+    
+    def peek(self):
+        """Return (frame, timestamp, sequence) of the newest frame without consuming it"""
+        with self.lock:
+            return self.frame, self.timestamp, self.sequence
+    
+    def get_metrics(self):
+        with self.lock:
+            posted, taken = self.frames_posted, self.frames_taken
+        return {
+            'frames_posted': posted,
+            'frames_rendered': taken,
+            'frames_coalesced': posted - taken,
+            # Fraction of captured frames that never reached the screen
+            'coalesce_rate': (posted - taken) / posted if posted else 0.0
+        }
+
+class PreRollBuffer:
+    """The last few seconds of one camera as JPEG payloads in a fixed number of slots
+    
+    Decoded frames are compressed on a helper thread so capture never waits on the JPEG
+    encoder; cameras already delivering MJPEG keep their payloads as-is. slack seconds of
+    extra history are kept beyond the pre-roll window, so frames a recording has already
+    claimed survive while its writers are still opening (an encoder process can take
+    most of a second to spawn).
+    """
+    
+    def __init__(self, seconds, fps, compressed=False, quality=85, slack=1.0):
+        import math
+        
+        self.seconds = seconds
+        self.fps = fps
+        self.window = max(2, int(math.ceil(seconds * fps)))  # Frames a recording starts with
+        self.capacity = self.window + int(math.ceil(slack * fps))
+        self.interval = 1.0 / fps
+        self.compressed = compressed
+        self.quality = quality
+        self.payloads = [None] * self.capacity
+        self.timestamps = array('d', [0.0]) * self.capacity
+        self.head = 0   # Next slot to fill
+        self.count = 0
+        self.nbytes = 0
+        self.lock = threading.Lock()
+        self.handoff = threading.Lock()  # Held while deciding between pre-roll and live recording
+        
+        self.frames_compressed = 0
+        self.frames_overwritten = 0
+        
+        self.pending = None
+        self.thread = None
+        if not compressed:
+            self.pending = FrameRing(4, overflow='drop_oldest')
+            self.thread = threading.Thread(target=self.compress_loop, daemon=True)
+            self.thread.start()
+    
+    def push(self, frame, timestamp):
+        """Add a captured frame; the oldest buffered frame is overwritten once full"""
+        if self.compressed:
+            self.store(frame.copy(), timestamp)
+        else:
+            self.pending.put(frame, timestamp)
+    
+    def compress_loop(self):
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        while True:
+            slot_index = self.pending.get()
+            if slot_index is None:
+                break
+            try:
+                ok, payload = cv2.imencode('.jpg', self.pending.frame(slot_index), params)
+                if ok:
+                    self.store(payload.reshape(-1), self.pending.timestamps[slot_index])
+            finally:
+                self.frames_compressed += 1
+                self.pending.release(slot_index)
+    
+    def store(self, payload, timestamp):
+        with self.lock:
+            old = self.payloads[self.head]
+            if self.count == self.capacity:
+                self.frames_overwritten += 1
+            else:
+                self.count += 1
+            self.nbytes += payload.size - (old.size if old is not None else 0)
+            self.payloads[self.head] = payload
+            self.timestamps[self.head] = timestamp
+            self.head = (self.head + 1) % self.capacity
+    
+    def oldest_time(self):
+        """Capture time of the oldest frame inside the pre-roll window"""
+        with self.lock:
+            if not self.count:
+                return None
+            return self.timestamps[(self.head - min(self.count, self.window)) % self.capacity]
+    
+    def origin(self):
+        """Timeline origin for a recording that starts with this buffer, or None if empty
+        
+        Half a frame before the oldest frame, so frames sit mid-slot on a constant-rate
+        timeline instead of on slot boundaries where jitter turns into skip/duplicate pairs.
+        """
+        oldest = self.oldest_time()
+        return None if oldest is None else oldest - self.interval / 2
+    
+    def pop_oldest(self):
+        """Remove and return (payload, timestamp) of the oldest buffered frame, or None"""
+        with self.lock:
+            if not self.count:
+                return None
+            slot_index = (self.head - self.count) % self.capacity
+            payload = self.payloads[slot_index]
+            self.payloads[slot_index] = None
+            self.nbytes -= payload.size
+            self.count -= 1
+            return payload, self.timestamps[slot_index]
+    
+    def wait_idle(self, timeout=1.0):
+        """Wait until every pushed frame has been compressed into the buffer"""
+        if self.pending is None:
+            return
+        deadline = time.monotonic() + timeout
+        while (self.frames_compressed + self.pending.frames_dropped < self.pending.frames_queued
+               and time.monotonic() < deadline):
+            time.sleep(0.002)
+    
+    def fits(self, seconds, fps, compressed, quality):
+        """Whether this buffer can be reused for a camera started with these settings"""
+        return (self.seconds, self.fps, self.compressed, self.quality) == (seconds, fps, compressed, quality)
+    
+    def reset(self):
+        """Drop every buffered frame; the slots and compress thread stay for the next start"""
+        self.wait_idle()
+        with self.lock:
+            for slot_index in range(self.capacity):
+                self.payloads[slot_index] = None
+            self.head = self.count = self.nbytes = 0
+    
+    def close(self):
+        if self.pending is not None:
+            self.pending.close()
+            self.thread.join(timeout=1)
+        with self.lock:
+            self.payloads = [None] * self.capacity
+            self.count = self.nbytes = 0
+
+class MotionDetector:
+    """Activity detector on a small grayscale copy of each frame
+    
+    The frame is subsampled to a few thousand pixels before anything else, so the cost
+    is nearly independent of the capture resolution. JPEG payloads still need a (reduced)
+    decode, so only every payload_stride-th one is analysed.
+    """
+    
+    def __init__(self, threshold=25, min_area=0.005, mask=None, width=160, learning_rate=0.05,
+                 payload_stride=3):
+        self.threshold = threshold          # Grey-level change that counts a pixel as moving
+        self.min_area = min_area            # Fraction of watched pixels that must move
+        self.mask = mask                    # Nonzero where motion is watched, any size
+        self.width = width
+        self.learning_rate = learning_rate  # Weight of each frame in the running background
+        self.payload_stride = payload_stride
+        self.frames_seen = 0
+        self.moving = False
+        self.size = None
+        self.small_mask = None
+        self.watched = 0
+        self.background = None
+        self.diff = None
+        self.level = 0.0  # Moving fraction of the last frame
+        self.last_motion_time = None
+    
+    def prepare(self, frame):
+        """Downsampled, lightly blurred grayscale copy of a frame or JPEG payload"""
+        if frame.ndim == 1:
+            # Compressed payload: let the JPEG decoder do most of the downscaling
+            gray = cv2.imdecode(frame, cv2.IMREAD_REDUCED_GRAYSCALE_8)
+            if gray is None:
+                return None
+            if self.size is None:
+                self.set_size(gray.shape[1], gray.shape[0])
+            gray = cv2.resize(gray, self.size, interpolation=cv2.INTER_AREA)
+        else:
+            if self.size is None:
+                self.set_size(frame.shape[1], frame.shape[0])
+            gray = cv2.cvtColor(cv2.resize(frame, self.size, interpolation=cv2.INTER_NEAREST),
+                                cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+    
+    def set_size(self, frame_width, frame_height):
+        height = max(1, int(round(frame_height * self.width / frame_width)))
+        self.size = (self.width, height)
+        if self.mask is not None:
+            self.small_mask = cv2.resize(np.asarray(self.mask, dtype=np.uint8), self.size,
+                                         interpolation=cv2.INTER_NEAREST)
+            self.watched = cv2.countNonZero(self.small_mask)
+        else:
+            self.watched = self.width * height
+    
+    def update(self, frame, timestamp):
+        """Feed one frame; returns True if it shows motion"""
+        self.frames_seen += 1
+        if frame.ndim == 1 and self.frames_seen % self.payload_stride:
+            # Skipped payload: carry the last verdict forward
+            if self.moving:
+                self.last_motion_time = timestamp
+            return self.moving
+        
+        self.moving = self.detect(frame, timestamp)
+        return self.moving
+    
+    def detect(self, frame, timestamp):
+        gray = self.prepare(frame)
+        if gray is None:
+            return False
+        if self.background is None:
+            self.background = gray.astype(np.float32)
+            self.diff = np.empty_like(gray)
+            return False
+        
+        cv2.absdiff(gray, self.background.astype(np.uint8), dst=self.diff)
+        cv2.threshold(self.diff, self.threshold, 255, cv2.THRESH_BINARY, dst=self.diff)
+        if self.small_mask is not None:
+            cv2.bitwise_and(self.diff, self.small_mask, dst=self.diff)
+        cv2.accumulateWeighted(gray, self.background, self.learning_rate)
+        
+        self.level = cv2.countNonZero(self.diff) / self.watched if self.watched else 0.0
+        if self.level >= self.min_area:
+            self.last_motion_time = timestamp
+            return True
+        return False
+    
+    def idle_for(self, timestamp):
+        """Seconds since the last frame with motion, None if there never was any"""
+        return None if self.last_motion_time is None else timestamp - self.last_motion_time
+
+class SyncBarrier:
+    """Reusable barrier whose party count shrinks when a camera leaves the group"""
+    
+    def __init__(self, parties, action=None):
+        self.cond = threading.Condition()
+        self.parties = parties
+        self.waiting = 0
+        self.generation = 0
+        self.action = action  # Run by the last arriving thread before anyone is released
+        self.broken = False
+    
+    def wait(self, timeout=None):
+        with self.cond:
+            if self.broken:
+                raise threading.BrokenBarrierError
+            generation = self.generation
+            self.waiting += 1
+            if self.waiting >= self.parties:
+                self.trip()
+                return
+            
+            if not self.cond.wait_for(lambda: self.generation != generation or self.broken, timeout):
+                # A member hung; nobody can make progress in lock-step any more
+                self.broken = True
+                self.cond.notify_all()
+            if self.generation == generation:
+                raise threading.BrokenBarrierError
+    
+    def trip(self):
+        self.waiting = 0
+        self.generation += 1
+        if self.action:
+            self.action()
+        self.cond.notify_all()
+    
+    def leave(self):
+        with self.cond:
+            self.parties -= 1
+            if self.parties > 0 and self.waiting >= self.parties:
+                self.trip()
+    
+    def abort(self):
+        with self.cond:
+            self.broken = True
+            self.cond.notify_all()
+
+class SyncGroup:
+    """Lock-step capture: every member grab()s together, then they retrieve() in parallel
+    
+    Each completed set of grabs gets one shared timestamp (the mean grab time) and its
+    skew (latest minus earliest grab) is kept for reporting.
+    """
+    
+    def __init__(self, camera_indices, timeout=2.0):
+        self.members = set(camera_indices)
+        self.timeout = timeout
+        self.grab_times = {}
+        self.set_time = 0.0
+        self.set_sequence = 0
+        self.skews = array('d')  # Seconds, one entry per frame set
+        self.ready = SyncBarrier(len(self.members))
+        self.grabbed = SyncBarrier(len(self.members), action=self.close_set)
+    
+    def close_set(self):
+        times = list(self.grab_times.values())
+        self.set_time = sum(times) / len(times)
+        self.skews.append(max(times) - min(times))
+        self.set_sequence += 1
+        self.grab_times = {}
+    
+    def leave(self, camera_index):
+        self.members.discard(camera_index)
+        self.ready.leave()
+        self.grabbed.leave()
+    
+    def abort(self):
+        self.ready.abort()
+        self.grabbed.abort()
+    
+    def skew_stats(self, start=0):
+        """min/mean/p99/max skew in milliseconds over frame sets from index start on"""
+        skews = np.frombuffer(self.skews, dtype=np.float64)[start:] * 1000
+        if not len(skews):
+            return {'frame_sets': 0}
+        return {
+            'frame_sets': int(len(skews)),
+            'min_ms': float(skews.min()),
+            'mean_ms': float(skews.mean()),
+            'p99_ms': float(np.percentile(skews, 99)),
+            'max_ms': float(skews.max())
+        }
+
+def fit_preview_size(frame_width, frame_height, widget_width, widget_height):
+    """Largest size with the frame's aspect ratio that fits the widget, or None if the widget is not laid out"""
+    # Skip if widget is too small or not properly initialized
+    if widget_width <= 10 or widget_height <= 10:
+        return None
+    
+    # Calculate aspect ratio to maintain proportions
+    aspect_ratio = frame_width / frame_height
+    
+    # Calculate new dimensions while maintaining aspect ratio
+    if widget_width / widget_height > aspect_ratio:
+        # Window is wider than video aspect ratio
+        new_height = widget_height
+        new_width = int(widget_height * aspect_ratio)
+    else:
+        # Window is taller than video aspect ratio
+        new_width = widget_width
+        new_height = int(widget_width / aspect_ratio)
+    
+    # Ensure minimum size
+    return max(new_width, 100), max(new_height, 75)
+
+def achieved_frame_rate(writer_info):
+    """Frames per second the camera actually delivered while recording"""
+    first, last = writer_info['first_capture_time'], writer_info['last_capture_time']
+    if first is None or last <= first:
+        return 0.0
+    return (writer_info['frames_captured'] - 1) / (last - first)
+
+def ppm_size(ppm_data):
+    """Return (width, height) from a binary PPM header"""
+    return tuple(int(v) for v in ppm_data[3:ppm_data.index(b'\n', 3)].split())
+
+class PreviewRenderer:
+    """Resizes and colour-converts preview frames on worker threads into ready-made PPM data
+    
+    The Tk thread only has to hand the finished bytes to a PhotoImage it already owns.
+    """
+    
+    def __init__(self, engine, fps=15, workers=2):
+        self.engine = engine
+        self.fps = fps
+        self.scale = 1.0  # Fraction of the widget size to render at; lowered when shedding load
+        self.take_frame = engine.take_preview_frame  # A ReviewPlayer's take_frame while reviewing
+        self.workers = workers
+        self.tiles = {}  # {camera_index: {'widget_size', 'size', 'ppm', 'rgb', 'ready'}}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.threads = []
+    
+    def start(self):
+        self.stop_event.clear()
+        for worker_index in range(self.workers):
+            thread = threading.Thread(target=self.render_loop, args=(worker_index,), daemon=True)
+            thread.start()
+            self.threads.append(thread)
+    
+    def stop(self):
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join(timeout=2)
+        self.threads = []
+    
+    def set_widget_size(self, camera_index, width, height):
+        """Record a tile's geometry; called from <Configure> so nothing polls winfo_* per frame"""
+        with self.lock:
+            tile = self.tiles.setdefault(camera_index, {'size': None, 'ppm': None, 'rgb': None, 'ready': None})
+            tile['widget_size'] = (width, height)
+    
+    def remove_tile(self, camera_index):
+        with self.lock:
+            self.tiles.pop(camera_index, None)
+    
+    def take_ready(self, camera_index):
+        """Return the newest finished PPM bytes for a tile, or None"""
+        with self.lock:
+            tile = self.tiles.get(camera_index)
+            if tile is None or tile['ready'] is None:
+                return None
+            data, tile['ready'] = tile['ready'], None
+            return data
+    
+    def render_loop(self, worker_index):
+        # Rate is re-read every pass so it can be changed while running
+        while not self.stop_event.wait(1.0 / self.fps):
+            for camera_index in list(self.tiles.keys()):
+                if camera_index % self.workers != worker_index:
+                    continue  # Another worker owns this tile
+                try:
+                    self.render_tile(camera_index)
+                except Exception as e:
+                    print(f"Error updating display for camera {camera_index}: {e}")
+    
+    def render_tile(self, camera_index):
+        tile = self.tiles.get(camera_index)
+        if tile is None or 'widget_size' not in tile:
+            return
+        
+        latest = self.take_frame(camera_index)
+        if latest is None:
+            return  # Nothing new since the last render
+        frame = latest[0]
+        
+        if frame.ndim == 1:
+            # Passthrough cameras deliver JPEG; decode only at preview rate, reduced in
+            # the DCT as far as the tile size allows
+            reduce_factor = 1
+            if 'source_size' in tile:
+                source_width = tile['source_size'][0]
+                while reduce_factor < 8 and source_width // (reduce_factor * 2) >= tile['widget_size'][0] * self.scale:
+                    reduce_factor *= 2
+            frame = decode_jpeg(frame, reduce_factor)
+            if frame is None:
+                return
+            tile['source_size'] = (frame.shape[1] * reduce_factor, frame.shape[0] * reduce_factor)
+        
+        widget_width, widget_height = tile['widget_size']
+        size = fit_preview_size(frame.shape[1], frame.shape[0],
+                                int(widget_width * self.scale), int(widget_height * self.scale))
+        if size is None:
+            return
+        
+        if tile['size'] != size:
+            # (Re)allocate the PPM buffer; resize and colour conversion write straight into it
+            width, height = size
+            header = f'P6\n{width} {height}\n255\n'.encode()
+            tile['ppm'] = bytearray(header) + bytearray(width * height * 3)
+            tile['rgb'] = np.frombuffer(tile['ppm'], dtype=np.uint8,
+                                        offset=len(header)).reshape(height, width, 3)
+            tile['size'] = size
+        
+        # Resize into the buffer, then BGR to RGB in place
+        cv2.resize(frame, size, dst=tile['rgb'])
+        cv2.cvtColor(tile['rgb'], cv2.COLOR_BGR2RGB, dst=tile['rgb'])
+        
+        # Tk only accepts bytes for binary image data
+        data = bytes(tile['ppm'])
+        with self.lock:
+            tile['ready'] = data
+
+class MosaicCompositor:
+    """Tiles the newest frame of every camera into one preallocated canvas at a fixed rate
+    
+    The layout mirrors the GUI grid: one row, a column per camera in camera order. Each
+    frame is resized straight into its tile's slice of the canvas, and only tiles whose
+    camera delivered something new are redrawn. A camera that stops delivering is marked
+    stale, or offline, on its tile; the compositor never waits on a camera.
+    """
+    
+    def __init__(self, engine, camera_indices, tile_height=360, fps=15, stale_seconds=1.0):
+        self.engine = engine
+        self.fps = fps
+        self.stale_seconds = stale_seconds
+        
+        # Equal tiles, wide enough for the widest camera; codecs want even dimensions
+        aspect = max((engine.active_cameras[idx].source.get_properties()[0] /
+                      engine.active_cameras[idx].source.get_properties()[1]
+                      for idx in camera_indices if idx in engine.active_cameras), default=4 / 3)
+        self.tile_height = tile_height // 2 * 2
+        self.tile_width = int(self.tile_height * aspect) // 2 * 2
+        self.canvas = np.zeros((self.tile_height, self.tile_width * len(camera_indices), 3),
+                               dtype=np.uint8)
+        self.tiles = {camera_index: {'view': self.canvas[:, col * self.tile_width:(col + 1) * self.tile_width],
+                                     'sequence': None, 'state': None, 'size': None}
+                      for col, camera_index in enumerate(camera_indices)}
+        self.stop_event = threading.Event()
+        self.thread = None
+    
+    @property
+    def size(self):
+        """(width, height) of the encoded stream"""
+        return self.canvas.shape[1], self.canvas.shape[0]
+    
+    def start(self, writer_info):
+        self.thread = threading.Thread(target=self.run, args=(writer_info,), daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+    
+    def run(self, writer_info):
+        interval = 1.0 / self.fps
+        next_tick = writer_info['start_time']
+        while not self.stop_event.is_set() and writer_info['stop_time'] is None:
+            next_tick = pace_until(next_tick, interval)
+            now = time.monotonic()
+            try:
+                self.compose(now)
+                self.engine.queue_recording_frame(writer_info, self.canvas, now)
+            except Exception as e:
+                print(f"Error compositing mosaic: {e}")
+    
+    def compose(self, now):
+        """Bring every tile up to date with its camera's newest frame"""
+        for camera_index, tile in self.tiles.items():
+            camera = self.engine.active_cameras.get(camera_index)
+            mailbox = self.engine.preview_mailboxes.get(camera_index)
+            latest = mailbox.peek() if camera is not None and camera.active and mailbox else None
+            if latest is None or latest[0] is None:
+                self.mark_offline(camera_index, tile)
+                continue
+            
+            frame, timestamp, sequence = latest
+            if sequence != tile['sequence']:
+                tile['sequence'] = sequence
+                self.draw_frame(camera_index, tile, frame)
+            if now - timestamp > self.stale_seconds:
+                self.mark_stale(camera_index, tile, now - timestamp)
+    
+    def draw_frame(self, camera_index, tile, frame):
+        if frame.ndim == 1:
+            # Passthrough JPEG: decode reduced in the DCT as far as the tile allows
+            reduce_factor = 1
+            if tile.get('source_width'):
+                while reduce_factor < 8 and tile['source_width'] // (reduce_factor * 2) >= self.tile_width:
+                    reduce_factor *= 2
+            frame = decode_jpeg(frame, reduce_factor)
+            if frame is None:
+                return
+            tile['source_width'] = frame.shape[1] * reduce_factor
+        
+        size = fit_preview_size(frame.shape[1], frame.shape[0], self.tile_width, self.tile_height)
+        if size is None:
+            return
+        view = tile['view']
+        if tile['size'] != size or tile['state'] != 'live':
+            view[:] = 0  # Letterbox bars, and clears any marker
+            tile['size'] = size
+        
+        width, height = size
+        x = (self.tile_width - width) // 2
+        y = (self.tile_height - height) // 2
+        cv2.resize(frame, size, dst=view[y:y + height, x:x + width])
+        cv2.putText(view, f"Camera {camera_index}", (8, self.tile_height - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 136), 1, cv2.LINE_AA)
+        tile['state'] = 'live'
+    
+    def mark_stale(self, camera_index, tile, age):
+        """Red border and banner over the last frame, with how long ago it arrived"""
+        view = tile['view']
+        cv2.rectangle(view, (0, 0), (self.tile_width - 1, self.tile_height - 1), (0, 0, 200), 3)
+        cv2.rectangle(view, (0, 0), (self.tile_width - 1, 28), (0, 0, 160), -1)
+        cv2.putText(view, f"Camera {camera_index} stale {age:.0f}s", (8, 20),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1, cv2.LINE_AA)
+        tile['state'] = 'stale'
+    
+    def mark_offline(self, camera_index, tile):
+        if tile['state'] == 'offline':
+            return
+        view = tile['view']
+        view[:] = (26, 26, 26)
+        cv2.putText(view, f"Camera {camera_index} offline", (8, self.tile_height // 2),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (102, 102, 102), 2, cv2.LINE_AA)
+        tile['state'] = 'offline'
+        tile['sequence'] = None
+
+def read_sysfs_identity(device_index):
+    """Return (bus path, vendor, product, serial, name, node index) for /dev/videoN, or None without sysfs"""
+    node = f'/sys/class/video4linux/video{device_index}'
+    if not os.path.isdir(node):
+        return None
+    
+    def read_attr(path):
+        try:
+            with open(path) as f:
+                return f.read().strip()
+        except OSError:
+            return ''
+    
+    bus_path = os.path.realpath(os.path.join(node, 'device'))
+    
+    # USB descriptors live on the parent of the interface the node hangs off
+    vendor = product = serial = ''
+    path = bus_path
+    while path.startswith('/sys/devices/'):
+        if os.path.exists(os.path.join(path, 'idVendor')):
+            vendor = read_attr(os.path.join(path, 'idVendor'))
+            product = read_attr(os.path.join(path, 'idProduct'))
+            serial = read_attr(os.path.join(path, 'serial'))
+            break
+        path = os.path.dirname(path)
+    
+    return (bus_path, vendor, product, serial,
+            read_attr(os.path.join(node, 'name')), read_attr(os.path.join(node, 'index')))
+
+def list_video_nodes():
+    """Indices of the /dev/videoN nodes present right now (none off Linux)"""
+    import glob
+    
+    if os.name != 'posix':
+        return []
+    return sorted(int(d.split('video')[1]) for d in glob.glob('/dev/video*')
+                  if d.split('video')[1].isdigit())
+
+def open_dev_inotify():
+    """Non-blocking inotify descriptor for nodes appearing in /dev, or None where unavailable"""
+    import ctypes
+    
+    IN_ATTRIB, IN_CREATE, IN_DELETE = 0x4, 0x100, 0x200
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    # IN_ATTRIB catches udev fixing up permissions just after the node is created
+    if libc.inotify_add_watch(fd, b'/dev', IN_ATTRIB | IN_CREATE | IN_DELETE) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+def fourcc_to_str(fourcc):
+    """Decode a CAP_PROP_FOURCC value into its four characters"""
+    fourcc = int(fourcc)
+    return ''.join(chr((fourcc >> (8 * i)) & 0xFF) for i in range(4))
+
+# Frame sizes offered from stepwise/continuous V4L2 ranges
+STANDARD_SIZES = ((640, 480), (800, 600), (1280, 720), (1280, 960), (1920, 1080),
+                  (2560, 1440), (3840, 2160))
+
+# Pixel formats OpenCV can turn into BGR frames
+CAPTURE_FOURCCS = ('YUYV', 'UYVY', 'NV12', 'YU12', 'GREY', 'BGR3', 'RGB3', 'MJPG')
+
+def v4l2_capture_capable(device_index):
+    """Whether /dev/videoN can capture video at all, from VIDIOC_QUERYCAP; None if unknown
+    
+    UVC cameras add a metadata node next to each capture node; those answer False.
+    """
+    try:
+        import fcntl
+    except ImportError:  # Not Linux
+        return None
+    import struct
+    
+    capability = struct.Struct('=16s32s32sIII3I')  # struct v4l2_capability
+    request = (2 << 30) | (capability.size << 16) | (ord('V') << 8) | 0
+    try:
+        fd = os.open(f'/dev/video{device_index}', os.O_RDWR | os.O_NONBLOCK)
+    except OSError:
+        return None
+    try:
+        buf = bytearray(capability.size)
+        fcntl.ioctl(fd, request, buf)
+    except OSError:
+        return None
+    finally:
+        os.close(fd)
+    capabilities, device_caps = capability.unpack(buf)[4:6]
+    if capabilities & 0x80000000:  # V4L2_CAP_DEVICE_CAPS: device_caps describes this node
+        capabilities = device_caps
+    return bool(capabilities & (0x1 | 0x1000))  # VIDEO_CAPTURE, VIDEO_CAPTURE_MPLANE
+
+def list_v4l2_modes(device_index):
+    """Capture modes /dev/videoN advertises as {'fourcc', 'width', 'height', 'fps'} dicts
+    
+    fps lists the advertised rates, fastest first. Queried with the V4L2 enumeration
+    ioctls, which work while the device is open elsewhere; [] where V4L2 is unavailable.
+    """
+    try:
+        import fcntl
+    except ImportError:  # Not Linux
+        return []
+    import struct
+    from itertools import count
+    
+    # struct v4l2_fmtdesc, v4l2_frmsizeenum and v4l2_frmivalenum
+    fmtdesc = struct.Struct('=III32sII3I')
+    frmsize = struct.Struct('=III6I2I')
+    frmival = struct.Struct('=IIIII6I2I')
+    
+    def iowr(number, size):
+        return (3 << 30) | (size << 16) | (ord('V') << 8) | number
+    
+    def query(request, layout, *fields):
+        """Run one enumeration ioctl; returns the unpacked struct or None past the last entry"""
+        buf = bytearray(layout.pack(*fields))
+        try:
+            fcntl.ioctl(fd, request, buf)
+        except OSError:
+            return None
+        return layout.unpack(buf)
+    
+    try:
+        fd = os.open(f'/dev/video{device_index}', os.O_RDWR | os.O_NONBLOCK)
+    except OSError:
+        return []
+    
+    modes = []
+    try:
+        for format_index in count():
+            fmt = query(iowr(2, fmtdesc.size), fmtdesc,
+                        format_index, 1, 0, b'', 0, 0, 0, 0, 0)  # 1: V4L2_BUF_TYPE_VIDEO_CAPTURE
+            if fmt is None:
+                break
+            pixelformat = fmt[4]
+            
+            for size_index in count():
+                size = query(iowr(74, frmsize.size), frmsize, size_index, pixelformat, *[0] * 9)
+                if size is None:
+                    break
+                if size[2] == 1:  # Discrete
+                    sizes = [size[3:5]]
+                else:
+                    min_width, max_width, step_width, min_height, max_height, step_height = size[3:9]
+                    sizes = [(width, height) for width, height in STANDARD_SIZES
+                             if min_width <= width <= max_width and min_height <= height <= max_height
+                             and (width - min_width) % max(step_width, 1) == 0
+                             and (height - min_height) % max(step_height, 1) == 0]
+                
+                for width, height in sizes:
+                    rates = set()
+                    for interval_index in count():
+                        interval = query(iowr(75, frmival.size), frmival,
+                                         interval_index, pixelformat, width, height, *[0] * 9)
+                        if interval is None:
+                            break
+                        # Discrete intervals, or the shortest interval of a range
+                        numerator, denominator = interval[5:7]
+                        if numerator:
+                            rates.add(round(denominator / numerator, 2))
+                        if interval[4] != 1:
+                            break
+                    modes.append({'fourcc': fourcc_to_str(pixelformat), 'width': width, 'height': height,
+                                  'fps': sorted(rates, reverse=True)})
+                
+                if size[2] != 1:
+                    break  # A range is reported once
+    finally:
+        os.close(fd)
+    return modes
+
+def choose_mode(modes, request=None, passthrough=False, max_pixels=1920 * 1080):
+    """Pick a capture mode from a device's advertised modes, honouring a partial request
+    
+    Without a size, the largest mode up to max_pixels that reaches the requested rate
+    (default 30 fps) wins; otherwise the mode closest to the requested size. Formats the
+    host decodes cheaply win ties over MJPEG, unless passthrough needs MJPEG. Returns the
+    request as-is when nothing is known about the device.
+    """
+    request = dict(request or {})
+    if passthrough:
+        request['fourcc'] = 'MJPG'
+    usable = [mode for mode in modes if mode['fourcc'] in CAPTURE_FOURCCS and mode['fps']]
+    if request.get('fourcc'):
+        usable = [mode for mode in usable if mode['fourcc'] == request['fourcc']] or usable
+    if not usable:
+        return request
+    
+    target_fps = request.get('fps', 30)
+    fast = [mode for mode in usable if mode['fps'][0] >= target_fps] or usable
+    if 'width' in request and 'height' in request:
+        pixels = request['width'] * request['height']
+        mode = min(fast, key=lambda mode: (abs(mode['width'] * mode['height'] - pixels),
+                                           mode['fourcc'] == 'MJPG'))
+    else:
+        fitting = [mode for mode in fast if mode['width'] * mode['height'] <= max_pixels] or fast
+        mode = max(fitting, key=lambda mode: (mode['width'] * mode['height'], mode['fourcc'] != 'MJPG'))
+    
+    # Slowest advertised rate that still meets the target, so the driver is not pushed harder
+    fps = min((rate for rate in mode['fps'] if rate >= target_fps), default=mode['fps'][0])
+    return {'fourcc': mode['fourcc'], 'width': mode['width'], 'height': mode['height'], 'fps': fps}
+
+def parse_mode(text):
+    """'1280x720@30:MJPG' (every part optional) into a mode request dict"""
+    mode = {}
+    text, _, fourcc = text.partition(':')
+    size, _, fps = text.partition('@')
+    if size:
+        mode['width'], mode['height'] = (int(v) for v in size.lower().split('x'))
+    if fps:
+        mode['fps'] = float(fps)
+    if fourcc:
+        mode['fourcc'] = fourcc
+    return mode
+
+def format_mode(mode):
+    """Short description of a requested or granted capture mode"""
+    if not mode:
+        return "driver default"
+    parts = [mode['fourcc']] if mode.get('fourcc') else []
+    if 'width' in mode:
+        parts.append(f"{mode['width']}×{mode['height']}")
+    if 'fps' in mode:
+        parts.append(f"{mode['fps']:g} fps")
+    if 'buffers' in mode:
+        parts.append(f"{mode['buffers']} buffer" + ("s" if mode['buffers'] != 1 else ""))
+    return " ".join(parts)
+
+def decode_jpeg(payload, reduce_factor=1):
+    """Decode a JPEG payload, optionally at 1/2, 1/4 or 1/8 scale straight from the DCT"""
+    flags = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2,
+             4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}[reduce_factor]
+    return cv2.imdecode(payload, flags)
+
+class MjpegAviWriter:
+    """Muxes already-compressed JPEG frames into an MJPEG AVI without touching the pixels
+    
+    Mirrors the cv2.VideoWriter calls the engine uses. Files roll over to _partN.avi before
+    the 32-bit RIFF sizes of a plain AVI would overflow.
+    """
+    
+    MAX_FILE_BYTES = 1 << 30
+    
+    def __init__(self, filepath, fps, frame_size):
+        self.base_path = filepath
+        self.fps = fps
+        self.width, self.height = frame_size
+        self.parts = []
+        self.file = None
+        self.frames_in_part = 0
+        self.last_offset = None  # File offset of the most recent frame chunk
+        try:
+            self.open_part()
+        except OSError as e:
+            print(f"Could not open {filepath}: {e}")
+    
+    def isOpened(self):
+        return self.file is not None
+    
+    def open_part(self):
+        import struct
+        
+        root, ext = os.path.splitext(self.base_path)
+        path = self.base_path if not self.parts else f"{root}_part{len(self.parts) + 1}{ext}"
+        self.file = open(path, 'wb')
+        self.parts.append(path)
+        self.frames_in_part = 0
+        self.index = array('I')  # Flattened (offset, size) pairs for idx1
+        self.max_chunk = 0
+        
+        rate = int(round(self.fps * 1000))
+        avih = struct.pack('<10I4I', int(1000000 / self.fps), 0, 0, 0x10, 0, 0, 1, 0,
+                           self.width, self.height, 0, 0, 0, 0)
+        strh = struct.pack('<4s4sI2H8I4h', b'vids', b'MJPG', 0, 0, 0, 0, 1000, rate, 0, 0, 0,
+                           0xFFFFFFFF, 0, 0, 0, self.width, self.height)
+        strf = struct.pack('<I2i2H4s5I', 40, self.width, self.height, 1, 24, b'MJPG',
+                           self.width * self.height * 3, 0, 0, 0, 0)
+        strl = b'strl' + chunk(b'strh', strh) + chunk(b'strf', strf)
+        hdrl = b'hdrl' + chunk(b'avih', avih) + chunk(b'LIST', strl)
+        
+        self.file.write(b'RIFF\0\0\0\0AVI ' + chunk(b'LIST', hdrl))
+        self.movi_start = self.file.tell()
+        self.file.write(b'LIST\0\0\0\0movi')
+        
+        # Header fields patched on close
+        self.avih_frames_pos = 12 + 8 + 4 + 8 + 16
+        self.avih_buffer_pos = self.avih_frames_pos + 12
+        self.strh_length_pos = 12 + 8 + 4 + 8 + 56 + 8 + 4 + 8 + 32
+    
+    def write(self, payload):
+        """Append one JPEG payload (1-D uint8 array or bytes) as a frame"""
+        import struct
+        
+        size = len(payload)
+        if self.file.tell() + size + 16 * (self.frames_in_part + 2) > self.MAX_FILE_BYTES:
+            self.close_part()
+            self.open_part()
+        
+        self.last_offset = self.file.tell()
+        self.index.append(self.last_offset - self.movi_start - 8)
+        self.index.append(size)
+        self.file.write(b'00dc' + struct.pack('<I', size))
+        self.file.write(payload)
+        if size % 2:
+            self.file.write(b'\0')
+        self.frames_in_part += 1
+        self.max_chunk = max(self.max_chunk, size)
+    
+    def close_part(self):
+        import struct
+        
+        movi_end = self.file.tell()
+        entries = bytearray()
+        for n in range(self.frames_in_part):
+            entries += struct.pack('<4s3I', b'00dc', 0x10, self.index[2 * n], self.index[2 * n + 1])
+        self.file.write(chunk(b'idx1', bytes(entries)))
+        file_end = self.file.tell()
+        
+        for position, value in ((4, file_end - 8), (self.movi_start + 4, movi_end - self.movi_start - 8),
+                                (self.avih_frames_pos, self.frames_in_part),
+                                (self.avih_buffer_pos, self.max_chunk + 8),
+                                (self.strh_length_pos, self.frames_in_part),
+                                (self.strh_length_pos + 4, self.max_chunk + 8)):
+            self.file.seek(position)
+            self.file.write(struct.pack('<I', value))
+        self.file.close()
+        self.file = None
+    
+    def release(self):
+        if self.file is not None:
+            self.close_part()
+
+def chunk(fourcc, data):
+    """RIFF chunk with its size header and pad byte"""
+    import struct
+    return fourcc + struct.pack('<I', len(data)) + data + (b'\0' if len(data) % 2 else b'')
+
+def create_writer(filepath, fourcc, fps, frame_size, compressed):
+    """Writer for one output file: JPEG passthrough muxer or an OpenCV encoder"""
+    if compressed:
+        return MjpegAviWriter(filepath, fps, frame_size)
+    return cv2.VideoWriter(filepath, cv2.VideoWriter_fourcc(*fourcc), fps, frame_size)
+
+def codec_cache_path():
+    """Per-user cache file for codec benchmark results"""
+    base = os.environ.get('LOCALAPPDATA') or os.environ.get('XDG_CACHE_HOME') or os.path.expanduser("~/.cache")
+    return os.path.join(base, 'recorder2', 'codecs.json')
+
+class CodecPlanner:
+    """Picks the recording fourcc per resolution from a short encode benchmark
+    
+    Each candidate encodes a synthetic clip with sensor-like noise at the camera's size;
+    time per frame and bytes per frame are cached on disk under a key for this machine
+    and OpenCV build, so the benchmark runs once per resolution rather than per start.
+    The chosen codec is the smallest output whose encode time fits cpu_budget (the
+    fraction of one core a camera's encoder may use) and whose bitrate fits
+    disk_budget_mb (MB/s per camera, 0 for no limit). When nothing fits, the fastest
+    working codec is used so the encoder keeps up.
+    """
+    
+    CANDIDATES = ('XVID', 'MJPG', 'mp4v', 'H264', 'FFV1', 'HFYU')
+    WARMUP_FRAMES = 3     # Encoder start-up, not timed
+    MAX_SECONDS = 1.5     # Per candidate, so very slow codecs are cut short
+    
+    def __init__(self, cache_path=None, frames=24, cpu_budget=0.5, disk_budget_mb=0):
+        self.cache_path = cache_path or codec_cache_path()
+        self.frames = frames
+        self.cpu_budget = cpu_budget
+        self.disk_budget_mb = disk_budget_mb
+        self.cache = None
+        self.lock = threading.Lock()  # One benchmark at a time; later callers reuse its result
+    
+    def cache_key(self):
+        """Machine and OpenCV build identity; results from elsewhere are never reused"""
+        import hashlib
+        import platform
+        
+        build = hashlib.sha1(cv2.getBuildInformation().encode()).hexdigest()[:12]
+        return f"{platform.node()}/{platform.machine()}/opencv-{cv2.__version__}/{build}"
+    
+    def load_cache(self):
+        import json
+        
+        try:
+            with open(self.cache_path) as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+        return cache if isinstance(cache, dict) else {}
+    
+    def save_cache(self):
+        """Write atomically so a concurrent start never reads a partial file"""
+        import json
+        
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.cache, f, indent=2)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"Could not save codec benchmark cache: {e}")
+    
+    def results(self, width, height):
+        """Benchmark results for every candidate at one resolution, measuring what is not cached"""
+        with self.lock:
+            if self.cache is None:
+                self.cache = self.load_cache()
+            results = self.cache.setdefault(self.cache_key(), {}).setdefault(f"{width}x{height}", {})
+            missing = [fourcc for fourcc in self.CANDIDATES if fourcc not in results]
+            if missing:
+                print(f"Benchmarking codecs at {width}x{height}: {', '.join(missing)}")
+                clip = self.make_clip(width, height)
+                for fourcc in missing:
+                    results[fourcc] = self.measure(fourcc, clip)
+                self.save_cache()
+            return {fourcc: results[fourcc] for fourcc in self.CANDIDATES}
+    
+    def make_clip(self, width, height, count=8):
+        """Gradient, moving bar and per-frame noise; flat test patterns compress unrealistically well"""
+        rng = np.random.default_rng(0)
+        ramp = np.linspace(0, 255, width, dtype=np.uint8)
+        base = np.empty((height, width, 3), dtype=np.uint8)
+        base[:, :, 0] = ramp
+        base[:, :, 1] = ramp[::-1]
+        base[:, :, 2] = 96
+        clip = []
+        for i in range(count):
+            frame = cv2.add(base, rng.integers(0, 12, base.shape, dtype=np.uint8))
+            bar = (i * width // count) % width
+            frame[:, bar:bar + width // 30] = 255
+            clip.append(frame)
+        return clip
+    
+    def measure(self, fourcc, clip):
+        """Encode time and output size per frame for one fourcc; ok is False if it cannot open"""
+        import shutil
+        import tempfile
+        
+        height, width = clip[0].shape[:2]
+        directory = tempfile.mkdtemp(prefix='recorder-codec-')
+        filepath = os.path.join(directory, f"bench_{fourcc}.avi")
+        try:
+            writer = cv2.VideoWriter(filepath, cv2.VideoWriter_fourcc(*fourcc), 30, (width, height))
+            if not writer.isOpened():
+                return {'ok': False}
+            
+            for frame in clip[:self.WARMUP_FRAMES]:
+                writer.write(frame)
+            written = 0
+            start = time.perf_counter()
+            while written < self.frames and time.perf_counter() - start < self.MAX_SECONDS:
+                writer.write(clip[written % len(clip)])
+                written += 1
+            elapsed = time.perf_counter() - start
+            writer.release()
+            
+            total = written + self.WARMUP_FRAMES
+            return {
+                'ok': True,
+                'ms_per_frame': elapsed * 1000 / written,
+                'bytes_per_frame': os.path.getsize(filepath) / total
+            }
+        except cv2.error as e:
+            print(f"Codec {fourcc} failed: {e}")
+            return {'ok': False}
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+    
+    def fits(self, result, fps):
+        """Whether a benchmark result meets the CPU and disk budgets at fps"""
+        if result['ms_per_frame'] > self.cpu_budget * 1000 / fps:
+            return False
+        return not self.disk_budget_mb or result['bytes_per_frame'] * fps / 1e6 <= self.disk_budget_mb
+    
+    def choose(self, width, height, fps):
+        """Best fourcc for a camera at this size and rate"""
+        working = {fourcc: result for fourcc, result in self.results(width, height).items()
+                   if result['ok']}
+        if not working:
+            raise Exception(f"No usable video codec at {width}x{height}")
+        
+        fitting = [fourcc for fourcc, result in working.items() if self.fits(result, fps)]
+        if fitting:
+            return min(fitting, key=lambda fourcc: (working[fourcc]['bytes_per_frame'],
+                                                   working[fourcc]['ms_per_frame']))
+        
+        fastest = min(working, key=lambda fourcc: working[fourcc]['ms_per_frame'])
+        print(f"No codec fits the budget at {width}x{height}@{fps}, using fastest: {fastest}")
+        return fastest
+    
+    def report(self, width, height, fps):
+        """Benchmark table at this size and rate, for printing"""
+        lines = []
+        for fourcc, result in self.results(width, height).items():
+            if not result['ok']:
+                lines.append(f"  {fourcc:5} unavailable")
+                continue
+            budget = "ok" if self.fits(result, fps) else "over budget"
+            lines.append(f"  {fourcc:5} {result['ms_per_frame']:7.1f} ms/frame "
+                         f"{result['bytes_per_frame'] * fps / 1e6:8.2f} MB/s  {budget}")
+        return "\n".join(lines)
+
+class SegmentedWriter:
+    """Rotates one camera's recording across segment files by duration and/or size
+    
+    Mirrors the cv2.VideoWriter calls the encode loops use. The next segment's writer is
+    opened ahead of time so a boundary costs no more than an ordinary frame, and the
+    finished segment is released on a background thread. The manifest is rewritten each
+    time a segment is finalized, so it stays valid if the recording ends abruptly.
+    """
+    
+    SIZE_CHECK_FRAMES = 15  # Frames between file size checks
+    
+    def __init__(self, open_writer, filepath, fps, segment_seconds=0, segment_bytes=0, started=None):
+        import queue
+        
+        self.open_writer = open_writer  # open_writer(path) -> writer
+        self.root, self.ext = os.path.splitext(filepath)
+        self.manifest_path = manifest_path(filepath)
+        self.fps = fps
+        self.segment_frames = int(round(segment_seconds * fps)) if segment_seconds else 0
+        self.segment_bytes = segment_bytes
+        self.started = started or datetime.now()
+        self.segments = []
+        self.current = None
+        self.frames_written = 0
+        self.lock = threading.Lock()
+        
+        self.next_writer = None
+        self.next_ready = threading.Event()
+        self.finalize_queue = queue.Queue()
+        self.finalizer = threading.Thread(target=self.finalize_loop, daemon=True)
+        self.finalizer.start()
+        
+        writer = self.open_writer(self.segment_path(1))
+        if writer.isOpened():
+            self.start_segment(writer)
+            self.prepare_next()
+    
+    def isOpened(self):
+        return self.current is not None
+    
+    @property
+    def parts(self):
+        return [segment['path'] for segment in self.segments]
+    
+    def segment_path(self, number):
+        return f"{self.root}_seg{number:03d}{self.ext}"
+    
+    def prepare_next(self):
+        """Open the following segment's writer in the background"""
+        path = self.segment_path(len(self.segments) + 1)
+        self.next_writer = None
+        self.next_ready.clear()
+        
+        def open_next():
+            try:
+                self.next_writer = self.open_writer(path)
+            except Exception as e:
+                print(f"Could not open segment {path}: {e}")
+            finally:
+                self.next_ready.set()
+        
+        threading.Thread(target=open_next, daemon=True).start()
+    
+    def start_segment(self, writer):
+        with self.lock:
+            self.current = {
+                'index': len(self.segments) + 1,
+                'path': self.segment_path(len(self.segments) + 1),
+                'writer': writer,
+                'first_frame': self.frames_written,
+                'frames': 0,
+                'finalized': False
+            }
+            self.segments.append(self.current)
+    
+    def segment_size(self, segment):
+        writer = segment['writer']
+        if isinstance(writer, MjpegAviWriter) and writer.file is not None:
+            return writer.file.tell()
+        try:
+            return os.path.getsize(segment['path'])
+        except OSError:
+            return 0
+    
+    def should_rotate(self):
+        frames = self.current['frames']
+        if not frames:
+            return False
+        if self.segment_frames and frames >= self.segment_frames:
+            return True
+        return bool(self.segment_bytes and frames % self.SIZE_CHECK_FRAMES == 0
+                    and self.segment_size(self.current) >= self.segment_bytes)
+    
+    def rotate(self):
+        """Switch to the pre-opened writer and hand the full segment to the finalizer"""
+        self.next_ready.wait()  # Normally set long before the boundary comes up
+        writer = self.next_writer
+        if writer is None or not writer.isOpened():
+            print(f"Next segment for {self.root} is not available; continuing current segment")
+            if writer is not None:
+                writer.release()
+            self.prepare_next()
+            return
+        
+        self.finalize_queue.put(self.current)
+        self.start_segment(writer)
+        self.prepare_next()
+    
+    def write(self, frame):
+        if self.should_rotate():
+            self.rotate()
+        self.current['writer'].write(frame)
+        self.current['frames'] += 1
+        self.frames_written += 1
+    
+    def finalize_loop(self):
+        while True:
+            segment = self.finalize_queue.get()
+            if segment is None:
+                break
+            try:
+                segment['writer'].release()
+            except Exception as e:
+                print(f"Error finalizing segment {segment['path']}: {e}")
+            segment['finalized'] = True
+            self.write_manifest()
+    
+    def release(self):
+        """Finalize the last segment, drop the unused pre-opened one and wait for both"""
+        if self.current is not None:
+            self.finalize_queue.put(self.current)
+        self.finalize_queue.put(None)
+        self.finalizer.join()
+        
+        if self.current is not None:
+            self.next_ready.wait(timeout=10)
+            spare = self.next_writer
+            self.next_writer = None
+            if spare is not None:
+                spare.release()
+                try:
+                    os.remove(self.segment_path(len(self.segments) + 1))
+                except OSError:
+                    pass
+        self.current = None
+        self.write_manifest()
+    
+    def manifest(self):
+        """Segment list with frame counts and the time range each covers on the output timeline"""
+        with self.lock:
+            segments = [dict(segment) for segment in self.segments]
+        entries = []
+        for segment in segments:
+            start = segment['first_frame'] / self.fps
+            end = (segment['first_frame'] + segment['frames']) / self.fps
+            entries.append({
+                'index': segment['index'],
+                'filepath': os.path.basename(segment['path']),
+                'frames': segment['frames'],
+                'first_frame': segment['first_frame'],
+                'start_offset': start,
+                'end_offset': end,
+                'start': (self.started + timedelta(seconds=start)).isoformat(),
+                'end': (self.started + timedelta(seconds=end)).isoformat(),
+                'finalized': segment['finalized']
+            })
+        return {'started': self.started.isoformat(), 'fps': self.fps, 'segments': entries}
+    
+    def write_manifest(self):
+        import json
+        
+        temp_path = self.manifest_path + '.tmp'
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump(self.manifest(), f, indent=2)
+            os.replace(temp_path, self.manifest_path)  # Readers never see a half-written manifest
+        except OSError as e:
+            print(f"Could not write segment manifest: {e}")
+
+def manifest_path(filepath):
+    """Manifest file listing the segments of a recording started at filepath"""
+    return os.path.splitext(filepath)[0] + '_manifest.json'
+
+def frame_index_path(filepath):
+    """Timestamp sidecar of a recording started at filepath"""
+    return os.path.splitext(filepath)[0] + '_frames.npy'
+
+def writer_position(writer):
+    """(file number, byte offset) of the frame a writer just wrote; the offset is -1 when unknown
+    
+    File numbers count segments of a SegmentedWriter, or _partN files of an MjpegAviWriter,
+    from 0. Every MJPEG frame is a keyframe; OpenCV encoders do not expose offsets.
+    """
+    file_number = 0
+    if isinstance(writer, SegmentedWriter):
+        file_number = writer.current['index'] - 1
+        writer = writer.current['writer']
+    if isinstance(writer, MjpegAviWriter):
+        return file_number + len(writer.parts) - 1, writer.last_offset
+    return file_number, -1
+
+class FrameIndex:
+    """Capture time of every output frame of one recording, saved as a NumPy sidecar
+    
+    Row n describes output frame n: the monotonic and wall-clock capture time of the frame
+    it shows (a duplicated frame repeats its source's times), and the file number and
+    keyframe byte offset from writer_position(). Rows are kept in compact arrays while
+    recording and written as one structured .npy on save().
+    """
+    
+    DTYPE = [('frame', '<u4'), ('monotonic', '<f8'), ('wall_time', '<f8'), ('file', '<i2'), ('offset', '<i8')]
+    
+    def __init__(self):
+        self.wall_offset = time.time() - time.monotonic()
+        self.monotonic = array('d')
+        self.wall_time = array('d')
+        self.files = array('h')
+        self.offsets = array('q')
+    
+    def __len__(self):
+        return len(self.monotonic)
+    
+    def add(self, capture_time, writer, wall_time=None):
+        """Record the frame the writer just wrote"""
+        file_number, offset = writer_position(writer)
+        self.monotonic.append(capture_time)
+        self.wall_time.append(capture_time + self.wall_offset if wall_time is None else wall_time)
+        self.files.append(file_number)
+        self.offsets.append(-1 if offset is None else offset)
+    
+    def save(self, path):
+        rows = np.empty(len(self), dtype=self.DTYPE)
+        rows['frame'] = np.arange(len(self))
+        rows['monotonic'] = self.monotonic
+        rows['wall_time'] = self.wall_time
+        rows['file'] = self.files
+        rows['offset'] = self.offsets
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            np.save(f, rows)
+        os.replace(temp_path, path)
+        return path
+
+def frame_at(rows, wall_time):
+    """Row of the last frame captured at or before wall_time, or None outside the recording
+    
+    rows is a loaded FrameIndex sidecar; capture times never decrease, so this is a binary search.
+    """
+    if not len(rows):
+        return None
+    frame = int(np.searchsorted(rows['wall_time'], wall_time, side='right')) - 1
+    if frame < 0:
+        return None
+    if frame == len(rows) - 1 and len(rows) > 1:
+        # Past the end by more than one frame interval means the recording had stopped
+        interval = (rows['wall_time'][-1] - rows['wall_time'][0]) / (len(rows) - 1)
+        if wall_time - rows['wall_time'][-1] > max(interval, 1e-3) * 2:
+            return None
+    return rows[frame]
+
+class SessionIndex:
+    """Wall-clock lookups across every recording of a session, from its session_*.json
+    
+    Each recording's sidecar is memory-mapped on load; locate() is a binary search per
+    recording, so it costs O(log n) in the number of frames.
+    """
+    
+    def __init__(self, session_path):
+        import json
+        
+        with open(session_path) as f:
+            self.session = json.load(f)
+        directory = os.path.dirname(os.path.abspath(session_path))
+        self.recordings = []
+        for info in self.session['cameras']:
+            if 'frame_index' in info:
+                path = os.path.join(directory, info['frame_index'])
+            elif 'transcoding_to' in info:
+                # Spools get their sidecar once transcoded, after the session file was written
+                info = dict(info, filepath=info['transcoding_to'])
+                path = frame_index_path(os.path.join(directory, info['transcoding_to']))
+            else:
+                continue
+            if os.path.exists(path):
+                self.recordings.append((info, np.load(path, mmap_mode='r')))
+    
+    def locate(self, wall_time):
+        """Frame showing wall_time in every recording that covers it
+        
+        wall_time is a datetime or seconds since the epoch. Returns a list of dicts with the
+        camera, recording file, frame number, file number, keyframe offset and capture time.
+        """
+        if isinstance(wall_time, datetime):
+            wall_time = wall_time.timestamp()
+        hits = []
+        for info, rows in self.recordings:
+            row = frame_at(rows, wall_time)
+            if row is None:
+                continue
+            hits.append({'camera': info['camera'], 'filepath': info['filepath'], 'frame': int(row['frame']),
+                         'file': int(row['file']), 'offset': int(row['offset']),
+                         'capture_time': datetime.fromtimestamp(float(row['wall_time'])).isoformat()})
+        return hits
+
+def recording_files(directory, info, rows):
+    """[(path, first output frame)] of the files a recording is split across"""
+    names = info.get('segments') or info.get('parts') or [info['filepath']]
+    paths = [os.path.join(directory, name) for name in names]
+    if len(paths) == 1:
+        return [(paths[0], 0)]
+    # The sidecar's file column never decreases, so each file starts at its first row
+    return [(path, int(np.searchsorted(rows['file'], file_number))) for file_number, path in enumerate(paths)]
+
+class PlaybackDecoder:
+    """Decodes one recording on its own thread into a small cache of upcoming frames
+    
+    request(n) names the frame wanted now; the thread keeps frames n .. n + prefetch - 1
+    decoded. A request outside that reach, such as a scrub or a step backwards, seeks the
+    container straight to n (it starts from the nearest keyframe before n) instead of
+    decoding everything in between. Evicted frames are decoded into again.
+    """
+    
+    SEEK_GAP = 12  # Frames ahead that are cheaper to decode through than to seek past
+    
+    def __init__(self, files, frame_count, prefetch=6):
+        self.files = files  # [(path, first frame)]
+        self.frame_count = frame_count
+        self.prefetch = prefetch
+        self.cache = {}     # {frame number: decoded frame}
+        self.spare = []     # Evicted frames, reused as decode buffers
+        self.wanted = 0
+        self.capture = None
+        self.file_number = None
+        self.next_frame = None  # Frame number the capture returns next
+        self.cond = threading.Condition()
+        self.stop_event = threading.Event()
+        self.thread = None
+        
+        # Counters
+        self.frames_decoded = 0
+        self.seeks = 0
+    
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        self.stop_event.set()
+        with self.cond:
+            self.cond.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+    
+    def request(self, frame_number):
+        with self.cond:
+            if frame_number != self.wanted:
+                self.wanted = frame_number
+                self.cond.notify_all()
+    
+    def get(self, frame_number):
+        """The decoded frame, or None while it is still being decoded"""
+        with self.cond:
+            return self.cache.get(frame_number)
+    
+    def wait_for(self, frame_number, timeout):
+        with self.cond:
+            self.cond.wait_for(lambda: frame_number in self.cache or self.stop_event.is_set(), timeout)
+            return self.cache.get(frame_number)
+    
+    def file_for(self, frame_number):
+        return max(number for number, (path, first) in enumerate(self.files) if first <= frame_number)
+    
+    def seek(self, frame_number):
+        file_number = self.file_for(frame_number)
+        if file_number != self.file_number:
+            if self.capture is not None:
+                self.capture.release()
+            self.capture = cv2.VideoCapture(self.files[file_number][0])
+            self.file_number = file_number
+        local_frame = frame_number - self.files[file_number][1]
+        if local_frame:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, local_frame)
+        elif self.seeks:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        self.next_frame = frame_number
+        self.seeks += 1
+    
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                with self.cond:
+                    window = range(self.wanted, min(self.wanted + self.prefetch, self.frame_count))
+                    for frame_number in [n for n in self.cache if n not in window]:
+                        self.spare.append(self.cache.pop(frame_number))
+                    needed = next((n for n in window if n not in self.cache), None)
+                    if needed is None:
+                        self.cond.wait(0.1)
+                        continue
+                    buffer = self.spare.pop() if self.spare else None
+                
+                if (self.next_frame is None or not self.next_frame <= needed <= self.next_frame + self.SEEK_GAP
+                        or self.file_for(needed) != self.file_number):
+                    self.seek(needed)
+                while self.next_frame < needed:
+                    self.capture.grab()
+                    self.next_frame += 1
+                
+                ok, frame = self.capture.read(buffer) if buffer is not None else self.capture.read()
+                self.next_frame += 1
+                if not ok:
+                    # Shorter than its index claims; never ask for these frames again
+                    with self.cond:
+                        self.frame_count = min(self.frame_count, needed)
+                    continue
+                self.frames_decoded += 1
+                with self.cond:
+                    if self.wanted <= needed < self.wanted + self.prefetch:
+                        self.cache[needed] = frame
+                        self.cond.notify_all()
+                    else:
+                        self.spare.append(frame)
+        except Exception as e:
+            print(f"Playback decoder error: {e}")
+        finally:
+            if self.capture is not None:
+                self.capture.release()
+                self.capture = None
+
+class ReviewPlayer:
+    """Plays back a recorded session's files in lockstep by capture time
+    
+    One PlaybackDecoder per recording prefetches upcoming frames. A single wall-clock
+    position drives every recording: each shows the frame its timestamp sidecar maps that
+    instant to, so cameras stay aligned however their frame rates and starts differ.
+    take_frame() is the PreviewRenderer hook.
+    """
+    
+    def __init__(self, session_path, prefetch=6):
+        session_index = SessionIndex(session_path)
+        directory = os.path.dirname(os.path.abspath(session_path))
+        self.tracks = []
+        for info, rows in session_index.recordings:
+            if not len(rows):
+                continue
+            self.tracks.append({
+                'label': recording_label(info),
+                'times': np.asarray(rows['wall_time']),
+                'decoder': PlaybackDecoder(recording_files(directory, info, rows), len(rows), prefetch),
+                'frame': None,  # Frame number for the current position
+                'shown': None   # Frame number last handed to the renderer
+            })
+        if not self.tracks:
+            raise Exception(f"No recordings with frame timestamps in {session_path}")
+        
+        self.start_time = min(float(track['times'][0]) for track in self.tracks)
+        self.end_time = max(float(track['times'][-1]) for track in self.tracks)
+        self.position = self.start_time
+        self.playing = False
+        self.speed = 1.0
+        self.play_origin = None  # (monotonic, position) when playback last started
+        self.lock = threading.Lock()
+    
+    def start(self):
+        for track in self.tracks:
+            track['decoder'].start()
+        self.seek(self.start_time)
+    
+    def stop(self):
+        for track in self.tracks:
+            track['decoder'].stop()
+    
+    def current_time(self):
+        """Playback position as wall-clock seconds since the epoch"""
+        with self.lock:
+            if self.playing:
+                origin_monotonic, origin_position = self.play_origin
+                self.position = origin_position + (time.monotonic() - origin_monotonic) * self.speed
+                if self.position >= self.end_time:
+                    self.position = self.end_time
+                    self.playing = False
+            return self.position
+    
+    def play(self):
+        with self.lock:
+            if self.position >= self.end_time:
+                self.position = self.start_time
+            self.playing = True
+            self.play_origin = (time.monotonic(), self.position)
+    
+    def pause(self):
+        self.current_time()
+        with self.lock:
+            self.playing = False
+    
+    def seek(self, wall_time):
+        with self.lock:
+            self.position = min(max(wall_time, self.start_time), self.end_time)
+            self.play_origin = (time.monotonic(), self.position)
+        self.update()
+    
+    def step(self, direction):
+        """Pause and move to the next (+1) or previous (-1) captured frame of any recording"""
+        self.pause()
+        now = self.current_time()
+        if direction > 0:
+            candidates = [track['times'][index] for track in self.tracks
+                          for index in [int(np.searchsorted(track['times'], now, side='right'))]
+                          if index < len(track['times'])]
+            target = min(candidates, default=now)
+        else:
+            candidates = [track['times'][index - 1] for track in self.tracks
+                          for index in [int(np.searchsorted(track['times'], now, side='left'))]
+                          if index > 0]
+            target = max(candidates, default=now)
+        self.seek(float(target))
+    
+    def update(self):
+        """Work out every recording's frame for the current position and ask for it"""
+        now = self.current_time()
+        for track in self.tracks:
+            index = int(np.searchsorted(track['times'], now, side='right')) - 1
+            track['frame'] = index if index >= 0 else None  # None until the camera's file begins
+            if track['frame'] is not None:
+                track['decoder'].request(track['frame'])
+        return now
+    
+    def take_frame(self, track_number):
+        """(frame, wall time) when a recording's frame changed and is decoded, else None"""
+        track = self.tracks[track_number] if track_number < len(self.tracks) else None
+        if track is None or track['frame'] is None or track['frame'] == track['shown']:
+            return None
+        frame_number = track['frame']
+        frame = track['decoder'].get(frame_number)
+        if frame is None:
+            return None  # Still decoding; the tile keeps its previous frame
+        track['shown'] = frame_number
+        return frame, float(track['times'][frame_number])
+
+def open_recording_writer(filepath, fourcc, fps, frame_size, compressed,
+                          segment_seconds=0, segment_bytes=0, started=None):
+    """Single-file writer, or a SegmentedWriter when either rotation limit is set"""
+    if not (segment_seconds or segment_bytes):
+        return create_writer(filepath, fourcc, fps, frame_size, compressed)
+    return SegmentedWriter(lambda path: create_writer(path, fourcc, fps, frame_size, compressed),
+                           filepath, fps, segment_seconds, segment_bytes, started)
+
+SPOOL_MAGIC = b'RECSPOOL'
+SPOOL_HEADER_BYTES = 64
+SPOOL_RECORD_HEADER_BYTES = 64  # Keeps every frame's pixels 64-byte aligned
+
+def spool_header_dtype():
+    """File header at the start of a spool"""
+    return np.dtype({'names': ['magic', 'version', 'compressed', 'width', 'height', 'channels',
+                               'slot_bytes', 'capacity', 'count', 'fps', 'wall_offset'],
+                     'formats': ['S8', '<u4', '<u4', '<u4', '<u4', '<u4', '<u4', '<u8', '<u8', '<f8', '<f8'],
+                     'offsets': [0, 8, 12, 16, 20, 24, 28, 32, 40, 48, 56],
+                     'itemsize': SPOOL_HEADER_BYTES})
+
+def spool_record_dtype(slot_bytes):
+    """One spooled frame: fixed-size header, then a slot of slot_bytes pixels or JPEG bytes"""
+    frame_header = np.dtype({'names': ['timestamp', 'wall_time', 'sequence', 'height', 'width',
+                                       'channels', 'nbytes'],
+                             'formats': ['<f8', '<f8', '<u8', '<u4', '<u4', '<u4', '<u4'],
+                             'offsets': [0, 8, 16, 24, 28, 32, 36],
+                             'itemsize': SPOOL_RECORD_HEADER_BYTES})
+    return np.dtype([('header', frame_header), ('data', np.uint8, (slot_bytes,))])
+
+class FrameSpool:
+    """Raw frames copied straight into a preallocated memory-mapped file
+    
+    Stands in for both the frame ring and the writer of a recording: put() copies the
+    frame and a header (capture time, wall-clock time, sequence, shape) into the next
+    fixed-size record from the capture thread, so nothing is encoded while recording.
+    The file is sized for capacity frames up front; frames beyond that are dropped.
+    release() trims the unused records. transcode_spool() turns the file into an AVI.
+    """
+    
+    def __init__(self, path, width, height, fps, compressed, capacity):
+        import shutil
+        
+        self.path = path
+        self.capacity = capacity
+        # JPEG rarely exceeds 1.5 bytes per pixel even at high quality on noisy scenes
+        slot_bytes = width * height * 3 // 2 if compressed else width * height * 3
+        self.record_dtype = spool_record_dtype(slot_bytes)
+        size = SPOOL_HEADER_BYTES + capacity * self.record_dtype.itemsize
+        free = shutil.disk_usage(os.path.dirname(os.path.abspath(path))).free
+        if size > free:
+            raise Exception(f"Spool needs {size / 1e9:.1f} GB but only {free / 1e9:.1f} GB is free")
+        
+        # Reserve the blocks now, so a full disk fails here rather than mid-recording
+        with open(path, 'wb') as f:
+            if hasattr(os, 'posix_fallocate'):
+                os.posix_fallocate(f.fileno(), 0, size)
+            else:
+                f.truncate(size)
+        self.map = np.memmap(path, dtype=np.uint8, mode='r+', shape=(size,))
+        self.header = self.map[:SPOOL_HEADER_BYTES].view(spool_header_dtype())
+        records = self.map[SPOOL_HEADER_BYTES:].view(self.record_dtype)
+        self.frame_headers = records['header']
+        self.data = records['data']
+        self.header[0] = (SPOOL_MAGIC, 1, int(compressed), width, height, 3, slot_bytes, capacity, 0,
+                          fps, time.time() - time.monotonic())
+        self.wall_offset = float(self.header['wall_offset'][0])
+        
+        self.lock = threading.Lock()
+        self.closed = False
+        self.count = 0
+        self.oversize_dropped = 0  # Payloads too big for a slot
+        
+        # FrameRing-compatible counters
+        self.frames_queued = 0
+        self.frames_dropped = 0
+        self.high_water = 0
+        self.depth = 0  # Nothing ever waits; put() has already written the frame
+        self.encode_latency = LatencyHistogram()  # Time to copy a frame into the map
+        self.frame_latency = LatencyHistogram()
+    
+    def stats(self):
+        return {'frames_queued': self.frames_queued, 'frames_dropped': self.frames_dropped,
+                'depth': 0, 'high_water': 0}
+    
+    def put(self, frame, timestamp, block=False):
+        """Copy a frame and its header into the next record; False once full or closed"""
+        with self.lock:
+            if self.closed:
+                return False
+            oversize = frame.size > self.data.shape[1]
+            if self.count >= self.capacity or oversize:
+                if oversize and not self.oversize_dropped:
+                    print(f"Spool {os.path.basename(self.path)}: dropping {frame.size}-byte frames, "
+                          f"larger than its {self.data.shape[1]}-byte slots")
+                self.oversize_dropped += oversize
+                self.frames_dropped += 1
+                return False
+            
+            copy_start = time.perf_counter()
+            index = self.count
+            self.data[index, :frame.size] = frame.reshape(-1)
+            height, width = frame.shape[:2] if frame.ndim > 1 else (0, 0)
+            channels = frame.shape[2] if frame.ndim == 3 else 1
+            self.frame_headers[index] = (timestamp, timestamp + self.wall_offset, index,
+                                         height, width, channels, frame.size)
+            self.count += 1
+            self.header['count'] = self.count
+            self.frames_queued += 1
+            self.encode_latency.observe(time.perf_counter() - copy_start)
+            self.frame_latency.observe(time.monotonic() - timestamp)
+        return True
+    
+    def close(self):
+        with self.lock:
+            self.closed = True
+    
+    def isOpened(self):
+        return True
+    
+    def release(self):
+        """Flush and give back the records that were never used"""
+        with self.lock:
+            self.closed = True
+            self.map.flush()
+            used = SPOOL_HEADER_BYTES + self.count * self.record_dtype.itemsize
+            self.map = self.header = self.frame_headers = self.data = None
+        os.truncate(self.path, used)
+
+def open_spool(path):
+    """Read-only (header, frame headers, frame data) views of a spool's written frames"""
+    spool_map = np.memmap(path, dtype=np.uint8, mode='r')
+    header = spool_map[:SPOOL_HEADER_BYTES].view(spool_header_dtype())[0]
+    if header['magic'] != SPOOL_MAGIC:
+        raise Exception(f"{path} is not a frame spool")
+    record_dtype = spool_record_dtype(int(header['slot_bytes']))
+    count = int(header['count'])
+    records = spool_map[SPOOL_HEADER_BYTES:SPOOL_HEADER_BYTES + count * record_dtype.itemsize].view(record_dtype)
+    return header, records['header'], records['data']
+
+def transcode_spool(spool_path, fourcc='MJPG', output_path=None, remove_spool=False, planner=None):
+    """Encode a spool into an AVI, placing frames by capture time at the spool's rate
+    
+    Missing frame times repeat the previous frame and frames that arrive early for their
+    slot are skipped, as in constant-rate recording. Returns a summary dict.
+    """
+    output_path = output_path or os.path.splitext(spool_path)[0] + '.avi'
+    summary = encode_spool(spool_path, fourcc, output_path, planner)
+    if remove_spool:
+        # Every view into the map went away with encode_spool's locals; Windows will not
+        # delete a file that is still mapped
+        os.remove(spool_path)
+    return summary
+
+def encode_spool(spool_path, fourcc, output_path, planner):
+    """The work of transcode_spool, kept in its own frame so the spool is unmapped on return"""
+    header, frame_headers, data = open_spool(spool_path)
+    compressed = bool(header['compressed'])
+    fps = float(header['fps'])
+    frame_size = (int(header['width']), int(header['height']))
+    if compressed:
+        fourcc = 'MJPG'
+    elif fourcc == 'auto':
+        fourcc = (planner or CodecPlanner()).choose(frame_size[0], frame_size[1], fps)
+    writer = create_writer(output_path, fourcc, fps, frame_size, compressed)
+    if not writer.isOpened():
+        raise Exception(f"Failed to create video writer for {output_path}")
+    
+    started = time.monotonic()
+    frames_written = frames_duplicated = frames_skipped = 0
+    previous = previous_header = None
+    frame_index = FrameIndex()
+    try:
+        origin = frame_headers['timestamp'][0] if len(frame_headers) else 0.0
+        for index, frame_header in enumerate(frame_headers):
+            slot = round((frame_header['timestamp'] - origin) * fps)
+            if slot < frames_written:
+                frames_skipped += 1
+                continue
+            payload = data[index, :frame_header['nbytes']]
+            if compressed:
+                frame = payload
+            else:
+                frame = payload.reshape(frame_header['height'], frame_header['width'], frame_header['channels'])
+            while previous is not None and frames_written < slot:
+                writer.write(previous)
+                frame_index.add(previous_header['timestamp'], writer, previous_header['wall_time'])
+                frames_written += 1
+                frames_duplicated += 1
+            writer.write(frame)
+            frame_index.add(frame_header['timestamp'], writer, frame_header['wall_time'])
+            frames_written += 1
+            previous, previous_header = frame, frame_header
+    finally:
+        writer.release()
+    frame_index.save(frame_index_path(output_path))
+    return {'spool': spool_path, 'filepath': output_path, 'frame_index': frame_index_path(output_path),
+            'codec': fourcc, 'frames': frames_written,
+            'duplicated': frames_duplicated, 'skipped': frames_skipped,
+            'seconds': time.monotonic() - started}
+
+class SpoolTranscoder:
+    """Transcodes finished spools on a worker pool, during or after a session
+    
+    OpenCV releases the GIL while encoding, so threads use every core.
+    """
+    
+    def __init__(self, workers=None, fourcc='auto', remove_spools=False):
+        from concurrent.futures import ThreadPoolExecutor
+        
+        self.fourcc = fourcc
+        self.remove_spools = remove_spools
+        self.planner = CodecPlanner()
+        self.pool = ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1,
+                                       thread_name_prefix='transcode')
+        self.jobs = []  # Futures, in submission order
+    
+    def submit(self, spool_path):
+        future = self.pool.submit(transcode_spool, spool_path, self.fourcc,
+                                  remove_spool=self.remove_spools, planner=self.planner)
+        future.add_done_callback(lambda future: self.report(spool_path, future))
+        self.jobs.append(future)
+        return future
+    
+    def report(self, spool_path, future):
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"Could not transcode {spool_path}: {e}")
+            return
+        print(f"Transcoded {os.path.basename(spool_path)} -> {result['filepath']} "
+              f"({result['frames']} frames, {result['codec']}, {result['seconds']:.1f}s)")
+    
+    def wait(self):
+        """Block until every submitted spool is done; returns the successful summaries"""
+        results = []
+        for future in list(self.jobs):
+            try:
+                results.append(future.result())
+            except Exception:
+                pass  # Already reported
+        self.jobs = []
+        return results
+    
+    def shutdown(self):
+        self.pool.shutdown(wait=True)
+
+def pace_until(next_frame_time, interval):
+    """Sleep until next_frame_time and return the deadline for the following frame"""
+    now = time.monotonic()
+    if next_frame_time > now:
+        time.sleep(next_frame_time - now)
+        return next_frame_time + interval
+    # Fell behind; restart the schedule from now instead of bursting
+    return now + interval
+
+def encode_frames(ring, writer, writer_info, camera_index, frame_index=None):
+    """Drain a frame ring into a video writer, one output frame per queued frame"""
+    while True:
+        slot_index = ring.get()
+        if slot_index is None:
+            break  # Closed and drained
+        
+        try:
+            write_start = time.perf_counter()
+            writer.write(ring.frame(slot_index))
+            ring.encode_latency.observe(time.perf_counter() - write_start)
+            ring.frame_latency.observe(time.monotonic() - ring.timestamps[slot_index])
+            writer_info['frames_written'] += 1
+            if frame_index is not None:
+                frame_index.add(ring.timestamps[slot_index], writer)
+        except Exception as e:
+            print(f"Error writing frame for camera {camera_index}: {e}")
+        finally:
+            ring.release(slot_index)
+
+def encode_frames_constant_rate(ring, writer, writer_info, camera_index, frame_index=None):
+    """Write a ring's frames onto a fixed-rate output timeline by their capture timestamps
+    
+    Output frame n presents at start_time + n / fps and shows the newest frame captured
+    before that instant, so frames are duplicated when the camera falls behind and
+    skipped when it runs ahead, and the file length matches wall-clock duration.
+    """
+    interval = writer_info['frame_interval']
+    held = None          # Slot of the newest frame, kept out of the ring until superseded
+    held_written = False
+    
+    def write_held_until(presentation_time):
+        nonlocal held_written
+        start_time = writer_info['start_time']
+        while start_time + writer_info['frames_written'] * interval < presentation_time:
+            try:
+                write_start = time.perf_counter()
+                writer.write(ring.frame(held))
+                ring.encode_latency.observe(time.perf_counter() - write_start)
+                if not held_written:
+                    ring.frame_latency.observe(time.monotonic() - ring.timestamps[held])
+                if frame_index is not None:
+                    frame_index.add(ring.timestamps[held], writer)
+            except Exception as e:
+                print(f"Error writing frame for camera {camera_index}: {e}")
+            if held_written:
+                writer_info['frames_duplicated'] += 1
+            held_written = True
+            writer_info['frames_written'] += 1
+    
+    while True:
+        slot_index = ring.get()
+        if slot_index is None:
+            break  # Closed and drained
+        
+        capture_time = ring.timestamps[slot_index]
+        stop_time = writer_info['stop_time']
+        if stop_time is not None and capture_time >= stop_time:
+            ring.release(slot_index)
+            continue
+        
+        if held is None:
+            # The first frame also covers the gap back to the timeline origin
+            held = slot_index
+        write_held_until(capture_time)
+        if held != slot_index:
+            if not held_written:
+                writer_info['frames_skipped'] += 1
+            ring.release(held)
+            held = slot_index
+            held_written = False
+    
+    # Pad the tail so the file ends exactly at stop time
+    if held is not None:
+        write_held_until(writer_info['stop_time'] or time.monotonic())
+        ring.release(held)
+
+class SharedCounters:
+    """dict-style view of named float64 fields in shared memory"""
+    
+    FIELDS = ('start_time', 'stop_time', 'frame_interval', 'frames_written', 'frames_duplicated',
+              'frames_skipped', 'frames_queued', 'frames_dropped', 'backlog_dropped', 'high_water',
+              'write_sequence', 'read_sequence', 'closed', 'opened')
+    
+    def __init__(self, values):
+        self.values = values
+    
+    def __getitem__(self, key):
+        value = self.values[self.FIELDS.index(key)]
+        if key in ('start_time', 'stop_time'):
+            return None if np.isnan(value) else float(value)
+        return value
+    
+    def __setitem__(self, key, value):
+        self.values[self.FIELDS.index(key)] = np.nan if value is None else value
+
+class SharedFrameRing:
+    """FrameRing counterpart in shared memory for an encoder running in another process
+    
+    Single producer (the capture thread) and single consumer (the encoder process). Each
+    side only ever writes its own sequence counter, so there is no cross-process lock for a
+    crashed peer to leave held; semaphores are only wake-up hints. Frames are never pickled.
+    
+    'drop_oldest' cannot evict from the producer side without a lock, so the producer drops
+    incoming frames when full and the consumer skips the older half of a full backlog.
+    """
+    
+    def __init__(self, capacity, slot_shape, overflow='drop_oldest', ready_sem=None, free_sem=None,
+                 data_name=None, control_name=None):
+        from multiprocessing import shared_memory
+        
+        create = data_name is None
+        self.capacity = capacity
+        self.overflow = overflow
+        self.ready_sem = ready_sem  # Released by the producer per frame
+        self.free_sem = free_sem    # Released by the consumer per freed slot
+        self.owner = create
+        self.consumer_alive = None  # Set by the producer side to detect a dead encoder
+        
+        slot_bytes = int(np.prod(slot_shape))
+        histogram_offset = 8 * (2 * capacity + len(SharedCounters.FIELDS))
+        control_bytes = histogram_offset + 8 * 2 * LatencyHistogram.SIZE
+        self.data_shm = shared_memory.SharedMemory(name=data_name, create=create,
+                                                   size=capacity * slot_bytes if create else 0)
+        self.control_shm = shared_memory.SharedMemory(name=control_name, create=create,
+                                                      size=control_bytes if create else 0)
+        
+        buf = self.control_shm.buf
+        self.lengths = np.ndarray((capacity,), np.int64, buf, 0)  # -1 for decoded frames
+        self.timestamps = np.ndarray((capacity,), np.float64, buf, 8 * capacity)
+        self.counters = SharedCounters(np.ndarray((len(SharedCounters.FIELDS),), np.float64, buf,
+                                                  16 * capacity))
+        self.encode_latency = LatencyHistogram(np.ndarray((LatencyHistogram.SIZE,), np.float64, buf,
+                                                          histogram_offset))
+        self.frame_latency = LatencyHistogram(np.ndarray((LatencyHistogram.SIZE,), np.float64, buf,
+                                                         histogram_offset + 8 * LatencyHistogram.SIZE))
+        self.detach_lock = threading.Lock()  # Readers in other threads never see a closed mapping
+        self.slots = [np.ndarray(slot_shape, np.uint8, self.data_shm.buf, i * slot_bytes)
+                      for i in range(capacity)]
+        
+        # Consumer-local bookkeeping
+        self.next_read = 0
+        self.released = set()
+        
+        if create:
+            self.counters.values[:] = 0
+            self.encode_latency.values[:] = 0
+            self.frame_latency.values[:] = 0
+            self.counters['start_time'] = None
+            self.counters['stop_time'] = None
+    
+    @property
+    def frames_dropped(self):
+        return int(self.counters['frames_dropped'] + self.counters['backlog_dropped'])
+    
+    @property
+    def frames_queued(self):
+        return int(self.counters['frames_queued'])
+    
+    @property
+    def high_water(self):
+        return int(self.counters['high_water'])
+    
+    @property
+    def depth(self):
+        return int(self.counters['write_sequence'] - self.counters['read_sequence'])
+    
+    @property
+    def closed(self):
+        return bool(self.counters['closed'])
+    
+    def stats(self):
+        """Queue and encoder counters for metrics, safe to call while the ring is detached"""
+        with self.detach_lock:
+            return {'frames_queued': self.frames_queued, 'frames_dropped': self.frames_dropped,
+                    'depth': self.depth, 'high_water': self.high_water,
+                    'frames_written': int(self.counters['frames_written']),
+                    'frames_duplicated': int(self.counters['frames_duplicated']),
+                    'frames_skipped': int(self.counters['frames_skipped'])}
+    
+    def put(self, frame, timestamp, block=False):
+        """Copy a frame into the next shared slot (producer side); block=True waits for space"""
+        counters = self.counters
+        if counters['closed']:
+            return False
+        
+        write_sequence = int(counters['write_sequence'])
+        # A blocking put leaves one slot spare so a drop_oldest consumer never sees a full backlog
+        limit = self.capacity - 1 if block else self.capacity
+        while write_sequence - counters['read_sequence'] >= limit:
+            if not (block or self.overflow == 'block') or counters['closed']:
+                counters['frames_dropped'] += 1
+                return False
+            if self.consumer_alive is not None and not self.consumer_alive():
+                return False
+            self.free_sem.acquire(timeout=0.5)
+        
+        slot_index = write_sequence % self.capacity
+        slot = self.slots[slot_index]
+        if frame.ndim == 1:
+            if frame.size > slot.size:
+                counters['frames_dropped'] += 1
+                return False
+            slot[:frame.size] = frame
+            self.lengths[slot_index] = frame.size
+        else:
+            np.copyto(slot, frame)
+            self.lengths[slot_index] = -1
+        self.timestamps[slot_index] = timestamp
+        
+        # Publish only after the slot is fully written
+        counters['write_sequence'] = write_sequence + 1
+        counters['frames_queued'] += 1
+        counters['high_water'] = max(counters['high_water'], self.depth)
+        self.ready_sem.release()
+        return True
+    
+    def get(self, timeout=None):
+        """Wait for the oldest unread slot (consumer side); None once closed and drained"""
+        counters = self.counters
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            write_sequence = int(counters['write_sequence'])
+            if write_sequence > self.next_read:
+                if (self.overflow == 'drop_oldest' and not self.released and
+                        write_sequence - self.next_read >= self.capacity):
+                    # Backlog is full; keep the newer half
+                    skip = (write_sequence - self.next_read) // 2
+                    self.next_read += skip
+                    counters['read_sequence'] = self.next_read
+                    counters['backlog_dropped'] += skip
+                    for _ in range(skip):
+                        self.free_sem.release()
+                slot_index = self.next_read % self.capacity
+                self.next_read += 1
+                return slot_index
+            
+            if counters['closed']:
+                return None
+            wait = 0.5 if deadline is None else min(0.5, deadline - time.monotonic())
+            if wait <= 0:
+                return None
+            self.ready_sem.acquire(timeout=wait)
+    
+    def frame(self, slot_index):
+        length = self.lengths[slot_index]
+        slot = self.slots[slot_index]
+        return slot if length < 0 else slot[:length]
+    
+    def release(self, slot_index):
+        """Free a slot (consumer side); slots are handed back to the producer in order"""
+        self.released.add(slot_index)
+        read_sequence = int(self.counters['read_sequence'])
+        while read_sequence % self.capacity in self.released and read_sequence < self.next_read:
+            self.released.discard(read_sequence % self.capacity)
+            read_sequence += 1
+            self.free_sem.release()
+        self.counters['read_sequence'] = read_sequence
+    
+    def close(self):
+        self.counters['closed'] = 1
+        self.ready_sem.release()
+    
+    def detach(self):
+        """Drop the array views and close (and, for the creator, unlink) the shared memory"""
+        with self.detach_lock, self.encode_latency.lock, self.frame_latency.lock:
+            self.lengths = self.timestamps = None
+            # Keep final values readable
+            self.counters = SharedCounters(np.array(self.counters.values))
+            self.encode_latency.values = np.array(self.encode_latency.values)
+            self.frame_latency.values = np.array(self.frame_latency.values)
+            self.slots = None
+        self.data_shm.close()
+        self.control_shm.close()
+        if self.owner:
+            self.data_shm.unlink()
+            self.control_shm.unlink()
+
+def encoder_process_main(camera_index, data_name, control_name, capacity, slot_shape, overflow,
+                         ready_sem, free_sem, filepath, fourcc, fps, frame_size, compressed, timing,
+                         segment_seconds=0, segment_bytes=0, started=None):
+    """Entry point of an encoder process: owns one camera's writer and drains its shared ring"""
+    ring = SharedFrameRing(capacity, slot_shape, overflow, ready_sem, free_sem,
+                           data_name=data_name, control_name=control_name)
+    writer = open_recording_writer(filepath, fourcc, fps, frame_size, compressed,
+                                   segment_seconds, segment_bytes, started)
+    ring.counters['opened'] = 1 if writer.isOpened() else -1
+    frame_index = FrameIndex()
+    
+    try:
+        if writer.isOpened():
+            if timing == 'cfr':
+                encode_frames_constant_rate(ring, writer, ring.counters, camera_index, frame_index)
+            else:
+                encode_frames(ring, writer, ring.counters, camera_index, frame_index)
+    finally:
+        writer.release()
+        ring.detach()
+        if len(frame_index):
+            frame_index.save(frame_index_path(filepath))
+
+class ProcessEncoder:
+    """One camera's writer running in its own process, fed through a SharedFrameRing
+    
+    Stands in for both the writer and the encode thread in a writer_info dict.
+    """
+    
+    def __init__(self, camera_index, filepath, fourcc, fps, frame_size, compressed, timing,
+                 capacity, overflow, on_crash=None, segment_seconds=0, segment_bytes=0, started=None):
+        import multiprocessing
+        
+        # Spawn rather than fork: the parent has capture threads and possibly Tk running
+        context = multiprocessing.get_context('spawn')
+        width, height = frame_size
+        slot_shape = (width * height,) if compressed else (height, width, 3)
+        
+        self.camera_index = camera_index
+        self.on_crash = on_crash
+        self.ring = SharedFrameRing(capacity, slot_shape, overflow,
+                                    context.Semaphore(0), context.Semaphore(0))
+        self.ring.counters['frame_interval'] = 1.0 / fps
+        self.process = context.Process(
+            target=encoder_process_main, name=f"encoder-camera-{camera_index}", daemon=True,
+            args=(camera_index, self.ring.data_shm.name, self.ring.control_shm.name, capacity,
+                  slot_shape, overflow, self.ring.ready_sem, self.ring.free_sem,
+                  filepath, fourcc, fps, frame_size, compressed, timing,
+                  segment_seconds, segment_bytes, started))
+        self.process.start()
+        self.ring.consumer_alive = self.process.is_alive
+        
+        self.watchdog = threading.Thread(target=self.watch, daemon=True)
+        self.watchdog.start()
+    
+    def isOpened(self, timeout=20):
+        """Wait for the child to report whether its writer opened"""
+        deadline = time.monotonic() + timeout
+        while not self.ring.counters['opened'] and self.process.is_alive():
+            if time.monotonic() > deadline:
+                break
+            time.sleep(0.05)
+        return self.ring.counters['opened'] == 1
+    
+    def watch(self):
+        """Report an encoder process that dies while frames are still expected"""
+        self.process.join()
+        if not self.ring.closed:
+            print(f"Encoder process for camera {self.camera_index} exited unexpectedly "
+                  f"(exit code {self.process.exitcode})")
+            self.ring.close()  # Capture stops queueing instead of waiting on a dead consumer
+            if self.on_crash:
+                self.on_crash(self.camera_index)
+    
+    def set_times(self, start_time=None, stop_time=None):
+        if start_time is not None:
+            self.ring.counters['start_time'] = start_time
+        if stop_time is not None:
+            self.ring.counters['stop_time'] = stop_time
+    
+    def join(self, timeout=None):
+        """Wait for the child to drain; kill it if it does not finish in time"""
+        self.process.join(timeout)
+        if self.process.is_alive():
+            print(f"Encoder process for camera {self.camera_index} did not finish in time; terminating")
+            self.process.terminate()
+            self.process.join(2)
+    
+    def is_alive(self):
+        return self.process.is_alive()
+    
+    def release(self, writer_info=None):
+        """Copy the child's counters into writer_info and free the shared memory"""
+        self.watchdog.join(timeout=1)
+        if writer_info is not None:
+            for key in ('frames_written', 'frames_duplicated', 'frames_skipped'):
+                writer_info[key] = int(self.ring.counters[key])
+        if self.ring.slots is not None:
+            self.ring.detach()
+
+class CameraWorker:
+    """One camera's source and capture thread, with an explicit lifecycle
+    
+    stopped -> starting -> running -> stopping -> stopped. stop() only sets the stop event;
+    the capture thread releases the source itself once its current read returns, so a
+    source is never released under a read in progress, and join() waits for that with a
+    timeout. A stopped worker is kept and restarted with the buffers it already has.
+    """
+    
+    __slots__ = ('camera_index', 'source', 'sync_group', 'state', 'thread', 'stop_event',
+                 'stopped', 'lock', 'preroll', 'on_exit', 'starts')
+    
+    TRANSITIONS = {
+        'stopped': ('starting',),
+        'starting': ('running', 'stopping'),
+        'running': ('stopping',),
+        'stopping': ('stopped',)
+    }
+    
+    def __init__(self, camera_index):
+        self.camera_index = camera_index
+        self.source = None
+        self.sync_group = None
+        self.state = 'stopped'
+        self.thread = None
+        self.stop_event = threading.Event()  # Set to ask the capture loop to finish
+        self.stopped = threading.Event()     # Set once the thread has released the source
+        self.stopped.set()
+        self.lock = threading.Lock()
+        self.preroll = None  # PreRollBuffer, kept across restarts when the settings allow
+        self.on_exit = None  # Called on the capture thread after the source is released
+        self.starts = 0
+    
+    @property
+    def active(self):
+        return self.state in ('starting', 'running')
+    
+    def transition(self, state):
+        """Move to state if the current state allows it; returns whether it moved"""
+        with self.lock:
+            if state not in self.TRANSITIONS[self.state]:
+                return False
+            self.state = state
+            return True
+    
+    def start(self, source, target, args, sync_group=None, on_exit=None):
+        """Run target(*args) as the capture loop on a new thread"""
+        if not self.transition('starting'):
+            raise Exception(f"Camera {self.camera_index} is {self.state}")
+        self.source = source
+        self.sync_group = sync_group
+        self.on_exit = on_exit
+        self.starts += 1
+        self.stop_event.clear()
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, args=(target, args),
+                                       name=f"camera-{self.camera_index}", daemon=True)
+        self.thread.start()
+    
+    def run(self, target, args):
+        try:
+            if self.transition('running'):
+                target(*args)
+        except Exception as e:
+            print(f"Camera {self.camera_index} capture error: {e}")
+        finally:
+            self.transition('stopping')  # Already there unless the loop ended by itself
+            try:
+                self.source.release()
+            except Exception as e:
+                print(f"Error releasing camera {self.camera_index}: {e}")
+            try:
+                if self.on_exit:
+                    self.on_exit(self)
+            except Exception as e:
+                print(f"Error retiring camera {self.camera_index}: {e}")
+            finally:
+                self.transition('stopped')
+                self.stopped.set()
+    
+    def stop(self):
+        """Ask the capture loop to finish; returns at once"""
+        self.transition('stopping')
+        self.stop_event.set()
+    
+    def join(self, timeout):
+        """Wait until the capture thread has let go of the source; False on timeout"""
+        if self.thread is threading.current_thread():
+            return True  # Stopped from its own error callback; it finishes on return
+        return self.stopped.wait(timeout)
+
+class RecorderEngine:
+    """Capture and recording engine shared by the GUI and headless mode"""
+    
+    def __init__(self, on_frame=None, on_camera_error=None, on_recording_error=None):
+        self.cameras = []         # [camera_info dict]
+        self.active_cameras = {}  # {camera_index: CameraWorker} until its capture thread has exited
+        self.idle_workers = {}    # {camera_index: stopped CameraWorker}, restarted with its buffers
+        self.stop_timeout = 2.0   # Seconds stop_camera waits for a capture thread to finish
+        self.recording = False
+        self.video_writers = {}   # {camera_index: {'writer': cv2.VideoWriter, 'ring': FrameRing, 'thread': thread, ...}}
+        self.recording_start_time = None
+        self.lock = threading.Lock()
+        
+        # Camera detection
+        self.detecting = False
+        self.probe_pool = None     # ThreadPoolExecutor, created on first detection
+        self.probe_workers = 8
+        self.probe_timeout = 3.0   # Seconds before a hung device is given up on
+        self.probe_cache = {}      # {(device_index, *sysfs identity): camera_info, or None for non-capture nodes}
+        
+        # Capture modes: requests override the automatic choice from each camera's 'modes'
+        self.capture_mode = None   # {'width', 'height', 'fps', 'fourcc'}, any subset, for every camera
+        self.camera_modes = {}     # {camera_index: mode request} overriding capture_mode
+        self.low_latency = False   # Keep a single frame in the driver's queue
+        self.camera_profiles = {}  # {camera_index: {'requested', 'granted'}} from the last open
+        
+        # Capture/encode decoupling
+        self.record_queue_size = 30           # Frame slots per camera between capture and encode
+        self.record_overflow = 'drop_oldest'  # One of FrameRing.OVERFLOW_POLICIES
+        self.capture_throttle = 0             # Optional sleep between reads, in seconds
+        
+        # 'cfr' maps frames onto a constant-rate timeline by capture time (dropping or
+        # duplicating as needed); 'gated' writes a frame whenever frame_interval has passed
+        self.record_timing = 'cfr'
+        # Codec for decoded frames, or 'auto' to pick one per resolution by benchmark within
+        # the budgets below; passthrough always writes MJPEG
+        self.record_fourcc = 'auto'
+        self.codec_cpu_budget = 0.5   # Fraction of one core each camera's encoder may use
+        self.codec_disk_budget = 0    # MB/s per camera, 0 for no limit
+        self.codec_planner = CodecPlanner()
+        self.save_directory = None
+        self.timeline_start = None  # Monotonic origin shared by all writers of a recording
+        
+        # 'thread' encodes in this process; 'process' gives every camera its own encoder
+        # process fed through shared memory, so encoding escapes the GIL
+        self.encoder_backend = 'thread'
+        
+        # 'raw' copies frames into memory-mapped spools sized for spool_seconds instead of
+        # encoding them; spool_transcoder, when set, turns each finished spool into an AVI
+        self.record_format = 'video'
+        self.spool_seconds = 120
+        self.spool_transcoder = None
+        
+        # Record the camera's MJPEG stream as-is instead of decoding and re-encoding
+        self.mjpeg_passthrough = False
+        
+        # Segment rotation; 0 disables a limit, both 0 records a single file per camera
+        self.segment_seconds = 0
+        self.segment_bytes = 0
+        
+        # Pre-roll: seconds of JPEG history kept per running camera and written ahead of a recording
+        self.preroll_seconds = 0
+        self.preroll_quality = 85
+        self.prerolls = {}  # {camera_index: PreRollBuffer}
+        
+        # Motion-triggered recording: each camera's writer opens on activity, padded by its
+        # pre-roll, and closes once the scene has been still for motion_post_seconds
+        self.motion_trigger = False
+        self.motion_threshold = 25    # Grey-level change that counts a pixel as moving
+        self.motion_min_area = 0.005  # Fraction of watched pixels that must move
+        self.motion_masks = {}        # {camera_index: 2-D array, nonzero where motion is watched}
+        self.motion_pre_seconds = 2
+        self.motion_post_seconds = 5
+        self.motion_detectors = {}    # {camera_index: MotionDetector} while armed
+        self.motion_opening = set()   # Cameras whose event writer is being opened
+        
+        # Writers retired mid-recording (finished motion events, load-shedding switches)
+        self.closed_files = []        # Their saved_files entries, once closed
+        self.closing_threads = []     # Threads closing them
+        
+        # Load shedding order: 'low' cameras lose recording rate first, then 'normal';
+        # 'high' cameras always record at full rate
+        self.camera_priorities = {}   # {camera_index: 'high' | 'normal' | 'low'}
+        
+        # Mosaic: one file tiling every camera instead of a file per camera
+        self.mosaic = False
+        self.mosaic_tile_height = 360
+        self.mosaic_fps = 15
+        
+        # Synchronized capture
+        self.sync_capture = False   # Start recordings as one lock-step SyncGroup
+        self.sync_group = None
+        self.sync_skew_start = 0    # First frame set of the current recording
+        
+        # Capture-side metrics, kept across restarts so counters only ever grow
+        self.capture_metrics = {}  # {camera_index: {'frames_captured': int, 'read_latency': LatencyHistogram}}
+        
+        # Preview hand-off, one latest-frame slot per camera
+        self.preview_mailboxes = {}  # {camera_index: FrameMailbox}
+        
+        # Callbacks, invoked from capture threads
+        self.on_frame = on_frame                # on_frame(camera_index, frame), must not block
+        self.on_camera_error = on_camera_error  # on_camera_error(camera_index)
+        self.on_recording_error = on_recording_error  # on_recording_error(camera_index, message)
+    
+    def list_video_devices(self):
+        """Return the device indices worth probing"""
+        # First, check /dev/video* devices (Linux specific)
+        video_devices = list_video_nodes()
+        
+        # If no video devices found, fall back to testing indices 0-5
+        if not video_devices:
+            video_devices = list(range(6))
+        return video_devices
+    
+    def probe_camera(self, i):
+        """Open one device and return its camera_info, or None if it cannot deliver frames"""
+        # Use a more careful approach to avoid segfaults
+        cap = None
+        try:
+            # Set backend explicitly to avoid issues
+            cap = cv2.VideoCapture(i, cv2.CAP_V4L2)  # Use V4L2 backend on Linux
+            
+            # Give it time to initialize
+            time.sleep(0.1)
+            
+            # Test if camera actually works by trying to read a frame
+            if cap.isOpened():
+                ret, frame = cap.read()
+                if ret and frame is not None:
+                    # Get camera properties
+                    width = cap.get(cv2.CAP_PROP_FRAME_WIDTH)
+                    height = cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
+                    fps = cap.get(cv2.CAP_PROP_FPS)
+                    
+                    print(f"Found working camera at index {i}")
+                    return {
+                        'index': i,
+                        'source': 'v4l2',
+                        'width': int(width) if width > 0 else 640,
+                        'height': int(height) if height > 0 else 480,
+                        'fps': int(fps) if fps > 0 else 30,
+                        'modes': list_v4l2_modes(i)  # Everything the device advertises
+                    }
+                print(f"Camera {i} opened but couldn't read frame")
+            else:
+                print(f"Camera {i} failed to open")
+            return None
+        
+        finally:
+            # Always release the camera
+            if cap is not None:
+                try:
+                    cap.release()
+                except:
+                    pass
+    
+    def detect_cameras_async(self, on_result=None, on_done=None, device_indices=None, refresh=False):
+        """Probe devices concurrently without blocking the caller
+        
+        on_result(device_index, camera_info_or_None) fires as each probe finishes and
+        on_done(cameras) once all have finished or timed out, both from a worker thread.
+        With device_indices only those devices are probed and the other cameras are kept.
+        refresh probes again nodes whose cached result is None. Running cameras are never
+        reopened. Returns False if a detection is already running.
+        """
+        with self.lock:
+            if self.detecting:
+                return False
+            self.detecting = True
+            if device_indices is None:
+                self.cameras = [cam for cam in self.cameras if self.is_camera_active(cam['index'])]
+        
+        thread = threading.Thread(target=self.run_detection,
+                                  args=(on_result, on_done, device_indices, refresh), daemon=True)
+        thread.start()
+        return True
+    
+    def detect_cameras(self):
+        """Probe devices and return the working ones as camera_info dicts"""
+        done = threading.Event()
+        if not self.detect_cameras_async(on_done=lambda cameras: done.set()):
+            raise Exception("Camera detection is already running")
+        done.wait()
+        return self.cameras
+    
+    def run_detection(self, on_result, on_done, device_indices=None, refresh=False):
+        """Fan device probes out to the worker pool and collect results as they arrive"""
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+        
+        try:
+            if self.probe_pool is None:
+                self.probe_pool = ThreadPoolExecutor(max_workers=self.probe_workers,
+                                                     thread_name_prefix='camera-probe')
+            
+            pending = {}  # {future: (device_index, cache_key)}
+            started = {}  # {device_index: monotonic start time}
+            
+            def timed_probe(i):
+                started[i] = time.monotonic()
+                return self.probe_camera(i)
+            
+            if device_indices is None:
+                device_indices = self.list_video_devices()
+            for i in device_indices:
+                if self.is_camera_active(i):
+                    # Streaming already; probing would fail on the busy device
+                    self.report_probe(i, self.get_camera_info(i), on_result)
+                    continue
+                identity = read_sysfs_identity(i)
+                cache_key = (i,) + identity if identity else None
+                if cache_key is not None and cache_key in self.probe_cache and not (
+                        refresh and self.probe_cache[cache_key] is None):
+                    # Same physical device on the same node; reuse the last probe
+                    self.report_probe(i, self.probe_cache[cache_key], on_result)
+                    continue
+                pending[self.probe_pool.submit(timed_probe, i)] = (i, cache_key)
+            
+            while pending:
+                done, _ = wait(pending, timeout=0.05, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i, cache_key = pending.pop(future)
+                    try:
+                        camera_info = future.result()
+                    except Exception as e:
+                        print(f"Error testing camera {i}: {e}")
+                        camera_info = None
+                    # A failure may only mean busy or still starting up; remember just the
+                    # nodes that can never capture
+                    if cache_key is not None and (camera_info is not None or v4l2_capture_capable(i) is False):
+                        self.probe_cache[cache_key] = camera_info
+                    self.report_probe(i, camera_info, on_result)
+                
+                # Give up on devices that hang; the stuck worker releases them when it returns
+                now = time.monotonic()
+                for future, (i, cache_key) in list(pending.items()):
+                    if i in started and now - started[i] > self.probe_timeout:
+                        print(f"Camera {i} probe timed out after {self.probe_timeout}s")
+                        del pending[future]
+                        self.report_probe(i, None, on_result)
+        
+        except Exception as e:
+            print(f"Camera detection error: {e}")
+        
+        finally:
+            with self.lock:
+                self.detecting = False
+            if on_done:
+                on_done(self.cameras)
+    
+    def report_probe(self, device_index, camera_info, on_result):
+        if camera_info is not None:
+            self.add_camera(dict(camera_info))
+        if on_result:
+            on_result(device_index, camera_info)
+    
+    def add_camera(self, camera_info):
+        """Register a camera without probing it (files, synthetic sources, known devices)"""
+        camera_info.setdefault('source', 'v4l2')
+        # Probe results, the device watcher and the GUI all update the list; each swaps in
+        # a complete new list under the lock so readers never see a half-built one
+        with self.lock:
+            cameras = [cam for cam in self.cameras if cam['index'] != camera_info['index']]
+            cameras.append(camera_info)
+            cameras.sort(key=lambda cam: cam['index'])
+            self.cameras = cameras
+    
+    def remove_camera(self, camera_index):
+        """Forget a camera that went away; its recording is closed, the others run on"""
+        with self.lock:
+            writer_info = self.video_writers.pop(camera_index, None)
+        if writer_info is not None:
+            self.retire_writer(camera_index, writer_info, time.monotonic())
+        self.stop_camera(camera_index)
+        worker = self.idle_workers.pop(camera_index, None)
+        if worker is not None and worker.preroll is not None:
+            worker.preroll.close()
+        with self.lock:
+            self.cameras = [cam for cam in self.cameras if cam['index'] != camera_index]
+        self.camera_profiles.pop(camera_index, None)
+    
+    def join_recording(self, camera_index):
+        """Start recording a camera that appeared mid-session; returns True if it joined
+        
+        Its file begins when it joins. Mosaic and motion-triggered sessions keep their layout
+        and detectors, so new cameras only join plain recordings.
+        """
+        if not self.recording or self.mosaic or self.motion_trigger or camera_index in self.video_writers:
+            return False
+        self.start_camera(camera_index)
+        writer_info = self.open_writer(camera_index, self.save_directory, datetime.now(), register=False)
+        with self.lock:
+            current = self.recording
+            now = time.monotonic()
+            if current:
+                self.video_writers[camera_index] = writer_info
+                self.begin_writing(camera_index, writer_info, now, False)
+        if not current:
+            # The recording stopped while the file was opening
+            self.detach_writer(writer_info, now)
+            self.close_writers({camera_index: writer_info})
+        return current
+    
+    def get_camera_info(self, camera_index):
+        for cam in self.cameras:
+            if cam['index'] == camera_index:
+                return cam
+        # Unknown cameras are treated as plain V4L2 devices
+        return {'index': camera_index, 'source': 'v4l2'}
+    
+    def is_camera_active(self, camera_index):
+        worker = self.active_cameras.get(camera_index)
+        return worker is not None and worker.active
+    
+    def wait_camera_stopped(self, camera_index):
+        """Wait for a stopping camera's thread to release its device; raises on timeout
+        
+        A capture loop that ended by itself parks its worker before the thread finishes,
+        so the parked worker is joined too.
+        """
+        with self.lock:
+            workers = [self.active_cameras.get(camera_index), self.idle_workers.get(camera_index)]
+        for worker in workers:
+            if worker is not None and not worker.join(self.stop_timeout):
+                raise Exception(f"Camera {camera_index} is still shutting down")
+    
+    def open_source(self, camera_index):
+        """Open a camera's frame source and check it delivers frames; raises on failure"""
+        camera_info = self.get_camera_info(camera_index)
+        source_class = FRAME_SOURCES.get(camera_info['source'])
+        if source_class is None:
+            raise Exception(f"Unknown frame source '{camera_info['source']}' for camera {camera_index}")
+        
+        if self.mjpeg_passthrough and 'passthrough' not in camera_info:
+            camera_info = dict(camera_info, passthrough=True)
+        mode = self.camera_modes.get(camera_index, self.capture_mode)
+        if mode:
+            camera_info = dict(camera_info, mode=mode)
+        if self.low_latency and 'low_latency' not in camera_info:
+            camera_info = dict(camera_info, low_latency=True)
+        
+        source = source_class(camera_info)
+        if not source.open():
+            source.release()
+            raise Exception(f"Failed to open camera {camera_index}")
+        if getattr(source, 'profile', None):
+            self.camera_profiles[camera_index] = source.profile
+        
+        # Test that we can actually read frames
+        ret, frame = source.read()
+        if not ret or frame is None:
+            source.release()
+            raise Exception(f"Camera {camera_index} opened but cannot read frames")
+        return source
+    
+    def start_camera(self, camera_index):
+        """Start a specific camera; raises on failure"""
+        if self.is_camera_active(camera_index):
+            return  # Already running
+        
+        self.wait_camera_stopped(camera_index)
+        source = self.open_source(camera_index)
+        self.launch_camera(camera_index, source, self.update_camera_feed, (camera_index,))
+    
+    def launch_camera(self, camera_index, source, target, args, sync_group=None):
+        """Hand an opened source to the camera's worker; on failure the source is released"""
+        with self.lock:
+            idle = self.idle_workers.pop(camera_index, None)
+            previous = self.active_cameras.get(camera_index)
+            worker = idle or CameraWorker(camera_index)
+            self.active_cameras[camera_index] = worker
+        try:
+            worker.source = source
+            self.preview_mailboxes.setdefault(camera_index, FrameMailbox())
+            self.capture_metrics.setdefault(camera_index, {'frames_captured': 0,
+                                                           'read_latency': LatencyHistogram()})
+            self.create_preroll(camera_index, source)
+            if self.record_fourcc == 'auto' and not source.compressed:
+                # Benchmark (or load cached results) now rather than when recording starts
+                width, height, fps = source.get_properties()
+                threading.Thread(target=self.plan_codec, args=(width, height, fps), daemon=True).start()
+            
+            worker.start(source, target, args, sync_group, on_exit=self.retire_camera)
+        except Exception:
+            source.release()
+            with self.lock:
+                if previous is None:
+                    self.active_cameras.pop(camera_index, None)
+                else:
+                    self.active_cameras[camera_index] = previous
+                if worker.preroll is not None and self.prerolls.get(camera_index) is worker.preroll:
+                    del self.prerolls[camera_index]
+                if idle is not None:
+                    self.idle_workers[camera_index] = idle
+            if worker.preroll is not None:
+                if idle is None:
+                    worker.preroll.close()  # A new worker that never ran keeps nothing
+                else:
+                    worker.preroll.reset()
+            raise
+    
+    def retire_camera(self, worker):
+        """Capture thread exit: detach the camera and park its worker for the next start"""
+        camera_index = worker.camera_index
+        preroll = None
+        with self.lock:
+            if self.active_cameras.get(camera_index) is worker:
+                del self.active_cameras[camera_index]
+                if worker.preroll is not None and self.prerolls.get(camera_index) is worker.preroll:
+                    preroll = self.prerolls.pop(camera_index)
+                self.idle_workers[camera_index] = worker
+        if preroll is not None:
+            preroll.reset()
+    
+    def create_preroll(self, camera_index, source):
+        """Attach a pre-roll buffer long enough for plain pre-roll or motion pre-trigger padding
+        
+        A restarted camera gets its previous buffer back when the settings are unchanged.
+        """
+        seconds = max(self.preroll_seconds, self.motion_pre_seconds if self.motion_trigger else 0)
+        if seconds > 0 and camera_index not in self.prerolls:
+            fps = source.get_properties()[2]
+            worker = self.active_cameras[camera_index]
+            if worker.preroll is None or not worker.preroll.fits(seconds, fps, source.compressed,
+                                                                 self.preroll_quality):
+                if worker.preroll is not None:
+                    worker.preroll.close()
+                worker.preroll = PreRollBuffer(seconds, fps, source.compressed, self.preroll_quality)
+            self.prerolls[camera_index] = worker.preroll
+    
+    def start_synchronized(self, camera_indices):
+        """Start cameras as one lock-step group; running cameras are restarted into it"""
+        self.stop_cameras(camera_indices)
+        for camera_index in camera_indices:
+            self.wait_camera_stopped(camera_index)
+        
+        sources = {}
+        try:
+            for camera_index in camera_indices:
+                sources[camera_index] = self.open_source(camera_index)
+        except Exception:
+            for source in sources.values():
+                source.release()
+            raise
+        
+        group = self.sync_group = SyncGroup(sources)
+        for camera_index, source in sources.items():
+            self.launch_camera(camera_index, source, self.sync_camera_feed,
+                               (camera_index, group), sync_group=group)
+    
+    def is_synchronized(self, camera_indices):
+        group = self.sync_group
+        return (group is not None and group.members == set(camera_indices)
+                and all(self.is_camera_active(idx) for idx in camera_indices))
+    
+    def stop_camera(self, camera_index):
+        """Stop a specific camera and wait for its capture thread to release the source"""
+        self.stop_cameras([camera_index])
+    
+    def stop_cameras(self, camera_indices):
+        """Signal every camera first, then join them, so they shut down in parallel"""
+        self.join_workers(self.signal_stop(camera_indices))
+    
+    def stop_camera_async(self, camera_index, on_done):
+        """Signal a camera to stop at once and join its capture thread in the background
+        
+        on_done(camera_index) is called from that thread.
+        """
+        workers = self.signal_stop([camera_index])
+        
+        def join():
+            self.join_workers(workers)
+            on_done(camera_index)
+        
+        thread = threading.Thread(target=join, daemon=True)
+        thread.start()
+        return thread
+    
+    def signal_stop(self, camera_indices):
+        """Ask the cameras' capture loops to finish; returns their workers"""
+        workers = [worker for worker in (self.active_cameras.get(i) for i in camera_indices)
+                   if worker is not None]
+        for worker in workers:
+            worker.stop()
+        return workers
+    
+    def join_workers(self, workers):
+        for worker in workers:
+            if not worker.join(self.stop_timeout):
+                print(f"Camera {worker.camera_index} did not stop within {self.stop_timeout:g}s; "
+                      f"its source is released when the pending read returns")
+    
+    def stop_all_cameras(self):
+        """Stop recording and all active cameras"""
+        if self.recording:
+            self.stop_recording()
+        
+        self.stop_cameras(list(self.active_cameras.keys()))
+    
+    def start_recording(self, save_directory):
+        """Start recording every known camera into save_directory; raises on failure"""
+        if self.recording:
+            raise Exception("Recording is already in progress")
+        
+        self.recording = True
+        self.recording_start_time = datetime.now()
+        self.video_writers = {}
+        self.save_directory = save_directory
+        self.closed_files = []
+        self.closing_threads = []
+        
+        if self.sync_capture:
+            camera_indices = [cam['index'] for cam in self.cameras]
+            if not self.is_synchronized(camera_indices):
+                try:
+                    self.start_synchronized(camera_indices)
+                except Exception as e:
+                    self.recording = False
+                    raise Exception(f"Failed to start synchronized capture: {str(e)}")
+                
+                # Wait a moment for cameras to initialize
+                time.sleep(0.5)
+        
+        if self.mosaic:
+            return self.start_mosaic(save_directory)
+        
+        if self.motion_trigger:
+            return self.arm_motion()
+        
+        # With pre-roll the recording begins at the oldest buffered frame
+        preroll_start = min((t for t in (preroll.origin() for preroll in self.prerolls.values())
+                             if t is not None), default=None)
+        if preroll_start is not None:
+            self.recording_start_time -= timedelta(seconds=time.monotonic() - preroll_start)
+        
+        # Start all cameras and set up recording
+        for cam in self.cameras:
+            camera_index = cam['index']
+            
+            try:
+                # Start camera if not already active
+                if not self.is_camera_active(camera_index):
+                    self.start_camera(camera_index)
+                    
+                    # Wait a moment for camera to initialize
+                    time.sleep(0.5)
+                
+                self.open_writer(camera_index, save_directory)
+            
+            except Exception as e:
+                self.stop_recording()
+                raise Exception(f"Failed to start recording for camera {camera_index}: {str(e)}")
+        
+        # One shared timeline origin so every camera's file covers the same span
+        start_time = self.timeline_start = preroll_start or time.monotonic()
+        for camera_index, writer_info in self.video_writers.items():
+            self.begin_writing(camera_index, writer_info, start_time, preroll_start is not None)
+        if self.sync_group is not None:
+            self.sync_skew_start = len(self.sync_group.skews)
+        
+        return len(self.video_writers)
+    
+    def plan_codec(self, width, height, fps):
+        """fourcc for recording decoded frames at this size and rate"""
+        if self.record_fourcc != 'auto':
+            return self.record_fourcc
+        self.codec_planner.cpu_budget = self.codec_cpu_budget
+        self.codec_planner.disk_budget_mb = self.codec_disk_budget
+        return self.codec_planner.choose(width, height, fps)
+    
+    def start_mosaic(self, save_directory):
+        """Record every camera as one tiled stream; returns the number of cameras"""
+        camera_indices = [cam['index'] for cam in self.cameras]
+        try:
+            for camera_index in camera_indices:
+                if not self.is_camera_active(camera_index):
+                    self.start_camera(camera_index)
+                    time.sleep(0.5)
+            
+            compositor = MosaicCompositor(self, camera_indices, self.mosaic_tile_height, self.mosaic_fps)
+            timestamp = self.recording_start_time.strftime("%Y%m%d_%H%M%S")
+            filepath = os.path.join(save_directory, f"mosaic_{timestamp}.avi")
+            writer_info = self.start_writer('mosaic', filepath, *compositor.size, self.mosaic_fps,
+                                            False, self.recording_start_time)
+        except Exception as e:
+            self.stop_recording()
+            raise Exception(f"Failed to start mosaic recording: {str(e)}")
+        
+        writer_info['compositor'] = compositor
+        start_time = self.timeline_start = time.monotonic()
+        self.begin_writing('mosaic', writer_info, start_time, False)
+        compositor.start(writer_info)
+        return len(camera_indices)
+    
+    def begin_writing(self, camera_index, writer_info, start_time, flush_preroll):
+        """Set a writer's timeline origin and start feeding it, buffered pre-roll first"""
+        writer_info['start_time'] = start_time
+        if isinstance(writer_info['writer'], ProcessEncoder):
+            writer_info['writer'].set_times(start_time=start_time)
+        
+        preroll = self.prerolls.get(camera_index)
+        if preroll is not None and flush_preroll:
+            threading.Thread(target=self.flush_preroll, args=(camera_index, writer_info, preroll),
+                             daemon=True).start()
+        else:
+            writer_info['live'] = True
+    
+    def open_writer(self, camera_index, save_directory, started=None, fps_divisor=1, register=True):
+        """Create the video writer, frame ring and encode thread for one camera
+        
+        With fps_divisor > 1 only every n-th captured frame is recorded, at 1/n of the rate.
+        """
+        # Get camera properties
+        source = self.active_cameras[camera_index].source
+        width, height, fps = source.get_properties()
+        
+        # Set up video writer
+        started = started or self.recording_start_time
+        timestamp = started.strftime("%Y%m%d_%H%M%S")
+        filename = f"camera_{camera_index}_{timestamp}.avi"
+        if fps_divisor > 1:
+            filename = f"camera_{camera_index}_{timestamp}_{fps / fps_divisor:g}fps.avi"
+        filepath = os.path.join(save_directory, filename)
+        return self.start_writer(camera_index, filepath, width, height, fps / fps_divisor,
+                                 source.compressed, started, fps_divisor, register)
+    
+    def start_writer(self, camera_index, filepath, width, height, fps, compressed, started,
+                     frame_stride=1, register=True):
+        """Create a video writer, frame ring and encode thread; camera_index may be 'mosaic'"""
+        raw = self.record_format == 'raw'
+        fourcc = 'raw' if raw else 'MJPG' if compressed else self.plan_codec(width, height, fps)
+        if raw:
+            # The spool is ring and writer at once; capture copies straight into it
+            filepath = os.path.splitext(filepath)[0] + '.spool'
+            writer = ring = FrameSpool(filepath, width, height, fps, compressed,
+                                       int(self.spool_seconds * fps) + 1)
+        elif self.encoder_backend == 'process':
+            writer = ProcessEncoder(camera_index, filepath, fourcc, fps, (width, height),
+                                    compressed, self.record_timing,
+                                    self.record_queue_size, self.record_overflow,
+                                    on_crash=self.encoder_crashed,
+                                    segment_seconds=self.segment_seconds,
+                                    segment_bytes=self.segment_bytes,
+                                    started=started)
+            ring = writer.ring
+        else:
+            writer = open_recording_writer(filepath, fourcc, fps, (width, height), compressed,
+                                           self.segment_seconds, self.segment_bytes, started)
+            if compressed:
+                # JPEG payloads go straight into the file; slots are sized for compressed frames
+                slot_shape = (width * height,)
+            else:
+                slot_shape = (height, width, 3)
+            ring = FrameRing(self.record_queue_size, slot_shape, overflow=self.record_overflow)
+        
+        if not writer.isOpened():
+            if isinstance(writer, ProcessEncoder):
+                writer.ring.close()
+                writer.join(timeout=2)
+                writer.release()
+            raise Exception(f"Failed to create video writer for camera {camera_index}")
+        
+        writer_info = {
+            'writer': writer,
+            'filepath': filepath,
+            'segmented': bool(self.segment_seconds or self.segment_bytes) and not raw,
+            'codec': fourcc,
+            'timing': 'raw' if raw else self.record_timing,
+            'fps': fps,
+            'frames_written': 0,
+            'frames_captured': 0,
+            'frames_duplicated': 0,
+            'frames_skipped': 0,     # Superseded before their output slot came up
+            'first_capture_time': None,
+            'last_capture_time': None,
+            'start_time': None,      # Monotonic timeline origin, set once all writers are open
+            'stop_time': None,
+            'last_write_time': 0,
+            'frame_interval': 1.0 / fps,  # Time between frames
+            'live': False,           # Capture queues directly once any pre-roll has been flushed
+            'frames_prerolled': 0,
+            'frame_stride': frame_stride,  # Record every n-th captured frame
+            'started': started,
+            'ring': ring,
+            'thread': None,
+            # Per-frame capture times; spools carry their own and encoder processes keep theirs
+            'frame_index': None if raw or isinstance(writer, ProcessEncoder) else FrameIndex()
+        }
+        
+        if isinstance(writer, ProcessEncoder):
+            # The encoder process is already draining the ring
+            writer_info['thread'] = writer
+        elif raw:
+            pass  # Nothing to drain
+        else:
+            # Dedicated encode thread so writer stalls never delay the capture read
+            writer_info['thread'] = threading.Thread(target=self.encode_camera_frames,
+                                                     args=(camera_index, writer_info), daemon=True)
+            writer_info['thread'].start()
+        if register:
+            self.video_writers[camera_index] = writer_info
+        return writer_info
+    
+    def encoder_crashed(self, camera_index):
+        """ProcessEncoder watchdog callback"""
+        if self.on_recording_error:
+            self.on_recording_error(camera_index, f"Encoder process for camera {camera_index} crashed; "
+                                                  "its recording stopped early")
+    
+    def stop_recording(self):
+        """Stop recording; returns (saved_files, recording_duration)"""
+        return self.finalize_recording(*self.end_recording())
+    
+    def stop_recording_async(self, on_done):
+        """Stop recording at once and finalize the files on a background thread
+        
+        on_done(saved_files, recording_duration) is called from that thread.
+        """
+        pending = self.end_recording()
+        
+        def finalize():
+            on_done(*self.finalize_recording(*pending))
+        
+        thread = threading.Thread(target=finalize, daemon=True)
+        thread.start()
+        return thread
+    
+    def end_recording(self):
+        """Mark the stop instant and detach the writers from capture"""
+        with self.lock:
+            self.recording = False
+            video_writers = self.video_writers
+            self.video_writers = {}
+        stop_time = time.monotonic()
+        recording_duration = timedelta(seconds=stop_time - self.timeline_start) if self.timeline_start else None
+        self.timeline_start = None
+        self.motion_detectors = {}
+        
+        for writer_info in video_writers.values():
+            self.detach_writer(writer_info, stop_time)
+        return (video_writers, recording_duration, self.recording_start_time, self.sync_group,
+                self.sync_skew_start, self.closed_files, self.closing_threads)
+    
+    def detach_writer(self, writer_info, stop_time):
+        """End a writer's timeline at stop_time and stop queueing frames to it"""
+        writer_info['stop_time'] = stop_time
+        if 'compositor' in writer_info:
+            writer_info['compositor'].stop()
+        if isinstance(writer_info['writer'], ProcessEncoder):
+            writer_info['writer'].set_times(stop_time=stop_time)
+        writer_info['ring'].close()
+    
+    def finalize_recording(self, video_writers, recording_duration, recording_start_time, sync_group,
+                           sync_skew_start, closed_files=(), closing_threads=()):
+        """Drain and close the writers detached by end_recording; returns (saved_files, recording_duration)"""
+        # Files retired earlier in the session come first, in the order they ended
+        for thread in closing_threads:
+            thread.join()
+        saved_files = list(closed_files) + self.close_writers(video_writers)
+        
+        if saved_files:
+            self.write_session_info(saved_files, recording_duration, recording_start_time,
+                                    sync_group, sync_skew_start)
+        return saved_files, recording_duration
+    
+    def close_writers(self, video_writers):
+        """Drain and release detached writers; returns saved_files entries for the usable files"""
+        saved_files = []
+        for camera_index, writer_info in video_writers.items():
+            try:
+                # Let the encode thread drain what is already queued
+                if writer_info['thread'] is not None:
+                    writer_info['thread'].join(timeout=10)
+                if isinstance(writer_info['writer'], ProcessEncoder):
+                    writer_info['writer'].release(writer_info)
+                elif writer_info['thread'] is not None and writer_info['thread'].is_alive():
+                    print(f"Encoder for camera {camera_index} did not finish in time")
+                    continue
+                else:
+                    writer_info['writer'].release()
+                if writer_info['frame_index'] is not None and len(writer_info['frame_index']):
+                    writer_info['frame_index'].save(frame_index_path(writer_info['filepath']))
+                
+                if writer_info['segmented']:
+                    segments = self.read_segment_manifest(writer_info['filepath'])
+                    filepath = segments[0]['filepath'] if segments else writer_info['filepath']
+                else:
+                    segments = None
+                    filepath = writer_info['filepath']
+                
+                # Check if file was actually created and has content
+                if os.path.exists(filepath) and os.path.getsize(filepath) > 1024:
+                    saved_files.append({
+                        'camera': camera_index,
+                        'filepath': filepath,
+                        'frames': writer_info['frames_written'],
+                        'dropped': writer_info['ring'].frames_dropped + writer_info['frames_skipped'],
+                        'duplicated': writer_info['frames_duplicated'],
+                        'codec': writer_info['codec'],
+                        'timing': writer_info['timing'],
+                        'declared_fps': writer_info['fps'],
+                        'achieved_fps': achieved_frame_rate(writer_info),
+                        'duration': writer_info['frames_written'] / writer_info['fps'],
+                        'started': writer_info['started'].isoformat()
+                    })
+                    if writer_info['frames_prerolled']:
+                        saved_files[-1]['preroll_frames'] = writer_info['frames_prerolled']
+                    if camera_index in self.camera_profiles:
+                        saved_files[-1]['mode'] = self.camera_profiles[camera_index]['granted']
+                    if segments:
+                        saved_files[-1]['manifest'] = manifest_path(writer_info['filepath'])
+                        saved_files[-1]['segments'] = [os.path.basename(segment['filepath']) for segment in segments]
+                    elif len(getattr(writer_info['writer'], 'parts', ())) > 1:
+                        saved_files[-1]['parts'] = [os.path.basename(p) for p in writer_info['writer'].parts]
+                    if os.path.exists(frame_index_path(writer_info['filepath'])):
+                        saved_files[-1]['frame_index'] = frame_index_path(writer_info['filepath'])
+                    if writer_info['timing'] == 'raw' and self.spool_transcoder is not None:
+                        self.spool_transcoder.submit(filepath)
+                        saved_files[-1]['transcoding_to'] = os.path.splitext(filepath)[0] + '.avi'
+                else:
+                    # Remove empty or invalid files
+                    if os.path.exists(filepath):
+                        os.remove(filepath)
+            
+            except Exception as e:
+                print(f"Error closing video writer for camera {camera_index}: {e}")
+        return saved_files
+    
+    def read_segment_manifest(self, filepath):
+        """Segments listed in a recording's manifest, with full paths"""
+        import json
+        
+        try:
+            with open(manifest_path(filepath)) as f:
+                segments = json.load(f)['segments']
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Could not read segment manifest for {filepath}: {e}")
+            return []
+        directory = os.path.dirname(filepath)
+        return [dict(segment, filepath=os.path.join(directory, segment['filepath']))
+                for segment in segments if segment['frames']]
+    
+    def write_session_info(self, saved_files, recording_duration, recording_start_time,
+                           sync_group=None, sync_skew_start=0):
+        """Save per-camera timing results next to the recordings"""
+        import json
+        
+        timestamp = recording_start_time.strftime("%Y%m%d_%H%M%S")
+        info_path = os.path.join(os.path.dirname(saved_files[0]['filepath']), f"session_{timestamp}.json")
+        cameras = []
+        for info in saved_files:
+            info = dict(info, filepath=os.path.basename(info['filepath']))
+            if 'manifest' in info:
+                info['manifest'] = os.path.basename(info['manifest'])
+            for key in ('frame_index', 'transcoding_to'):
+                if key in info:
+                    info[key] = os.path.basename(info[key])
+            cameras.append(info)
+        session_info = {
+            'started': recording_start_time.isoformat(),
+            'duration': recording_duration.total_seconds() if recording_duration else None,
+            'cameras': cameras
+        }
+        if sync_group is not None and sync_group.members >= {info['camera'] for info in saved_files}:
+            session_info['sync_skew'] = sync_group.skew_stats(sync_skew_start)
+            print(f"Inter-camera skew: {session_info['sync_skew']}")
+        
+        try:
+            with open(info_path, 'w') as f:
+                json.dump(session_info, f, indent=2)
+        except OSError as e:
+            print(f"Could not write session info: {e}")
+    
+    def update_camera_feed(self, camera_index):
+        """Capture loop for a specific camera"""
+        worker = self.active_cameras[camera_index]
+        source = worker.source
+        mailbox = self.preview_mailboxes[camera_index]
+        metrics = self.capture_metrics[camera_index]
+        
+        while not worker.stop_event.is_set():
+            
+            read_start = time.monotonic()
+            ret, frame = source.read()
+            if worker.stop_event.is_set():
+                break  # Stopped during the read; nothing more goes out
+            if ret:
+                capture_time = time.monotonic()
+                metrics['read_latency'].observe(capture_time - read_start)
+                metrics['frames_captured'] += 1
+                self.deliver_frame(camera_index, frame, capture_time, mailbox)
+                
+                # Small delay to prevent overwhelming the system
+                if self.capture_throttle and worker.stop_event.wait(self.capture_throttle):
+                    break
+            
+            else:
+                # Handle camera error
+                if self.on_camera_error:
+                    self.on_camera_error(camera_index)
+                break
+    
+    def sync_camera_feed(self, camera_index, group):
+        """Lock-step capture loop for one member of a SyncGroup"""
+        worker = self.active_cameras[camera_index]
+        source = worker.source
+        mailbox = self.preview_mailboxes[camera_index]
+        metrics = self.capture_metrics[camera_index]
+        
+        try:
+            while not worker.stop_event.is_set():
+                # Everyone grabs at once...
+                group.ready.wait(group.timeout)
+                grab_start = time.monotonic()
+                ret = source.grab()
+                group.grab_times[camera_index] = time.monotonic()
+                read_time = group.grab_times[camera_index] - grab_start
+                if not ret:
+                    raise Exception("grab failed")
+                group.grabbed.wait(group.timeout)
+                
+                # ...then decodes in parallel, stamping the set's shared time
+                capture_time = group.set_time
+                retrieve_start = time.monotonic()
+                ret, frame = source.retrieve()
+                if not ret:
+                    raise Exception("retrieve failed")
+                # Read latency excludes time spent waiting at the barriers
+                metrics['read_latency'].observe(read_time + time.monotonic() - retrieve_start)
+                metrics['frames_captured'] += 1
+                self.deliver_frame(camera_index, frame, capture_time, mailbox)
+        
+        except threading.BrokenBarrierError:
+            if not worker.stop_event.is_set():
+                print(f"Synchronized capture lost lock-step on camera {camera_index}")
+                if self.on_camera_error:
+                    self.on_camera_error(camera_index)
+        
+        except Exception as e:
+            if not worker.stop_event.is_set():
+                print(f"Camera {camera_index} capture error: {e}")
+                group.abort()
+                if self.on_camera_error:
+                    self.on_camera_error(camera_index)
+        
+        finally:
+            # Peers stop waiting for this camera at the barriers
+            group.leave(camera_index)
+    
+    def deliver_frame(self, camera_index, frame, capture_time, mailbox):
+        """Route a captured frame to the recorder and the preview"""
+        if self.motion_detectors:
+            self.check_motion(camera_index, frame, capture_time)
+        
+        writer_info = self.video_writers.get(camera_index) if self.recording else None
+        preroll = self.prerolls.get(camera_index)
+        if preroll is not None:
+            # Until its pre-roll is flushed a recording camera keeps filling the buffer
+            with preroll.handoff:
+                live = writer_info is not None and writer_info['live']
+                if not live:
+                    preroll.push(frame, capture_time)
+        else:
+            live = writer_info is not None and writer_info['live']
+        
+        if live:
+            try:
+                self.queue_recording_frame(writer_info, frame, capture_time)
+            except Exception as e:
+                print(f"Error queueing frame for camera {camera_index}: {e}")
+        
+        # Hand the newest frame to the preview; the renderer picks it up at its own rate
+        mailbox.post(frame, capture_time)
+        
+        if self.on_frame:
+            self.on_frame(camera_index, frame)
+    
+    def arm_motion(self):
+        """Start a motion-triggered session; cameras run but writers only open on activity"""
+        self.timeline_start = time.monotonic()
+        self.motion_opening = set()
+        
+        detectors = {}
+        for cam in self.cameras:
+            camera_index = cam['index']
+            try:
+                if not self.is_camera_active(camera_index):
+                    self.start_camera(camera_index)
+            except Exception as e:
+                self.recording = False
+                raise Exception(f"Failed to start camera {camera_index}: {str(e)}")
+            
+            # Cameras started before motion mode was enabled still need pre-trigger padding
+            self.create_preroll(camera_index, self.active_cameras[camera_index].source)
+            detectors[camera_index] = MotionDetector(self.motion_threshold, self.motion_min_area,
+                                                     self.motion_masks.get(camera_index))
+        self.motion_detectors = detectors
+        return len(detectors)
+    
+    def check_motion(self, camera_index, frame, capture_time):
+        """Open or close a camera's event recording as activity starts and ends"""
+        detector = self.motion_detectors.get(camera_index)
+        if detector is None:
+            return
+        
+        moving = detector.update(frame, capture_time)
+        writer_info = self.video_writers.get(camera_index)
+        if writer_info is None:
+            if moving and camera_index not in self.motion_opening:
+                # Opening a writer can take a while; frames keep going to the pre-roll meanwhile
+                self.motion_opening.add(camera_index)
+                threading.Thread(target=self.start_motion_event, args=(camera_index,),
+                                 daemon=True).start()
+        elif writer_info['live'] and detector.idle_for(capture_time) > self.motion_post_seconds:
+            self.end_motion_event(camera_index, capture_time)
+    
+    def start_motion_event(self, camera_index):
+        """Open an event recording starting at the oldest pre-roll frame"""
+        try:
+            preroll = self.prerolls.get(camera_index)
+            origin = preroll.origin() if preroll is not None else None
+            now = time.monotonic()
+            start_time = origin or now
+            started = datetime.now() - timedelta(seconds=now - start_time)
+            
+            writer_info = self.open_writer(camera_index, self.save_directory, started)
+            with self.lock:
+                if self.recording and self.video_writers.get(camera_index) is writer_info:
+                    self.begin_writing(camera_index, writer_info, start_time, origin is not None)
+                    print(f"Camera {camera_index}: motion event started")
+        
+        except Exception as e:
+            print(f"Could not start motion event for camera {camera_index}: {e}")
+            if self.on_recording_error:
+                self.on_recording_error(camera_index, f"Could not start motion recording for "
+                                                      f"camera {camera_index}: {e}")
+        
+        finally:
+            self.motion_opening.discard(camera_index)
+    
+    def end_motion_event(self, camera_index, stop_time):
+        """Detach a camera's event writer and close it in the background"""
+        with self.lock:
+            writer_info = self.video_writers.pop(camera_index, None)
+        if writer_info is None:
+            return
+        self.retire_writer(camera_index, writer_info, stop_time)
+        print(f"Camera {camera_index}: motion event ended")
+    
+    def retire_writer(self, camera_index, writer_info, stop_time):
+        """Detach a writer that is no longer registered and close it in the background"""
+        self.detach_writer(writer_info, stop_time)
+        closed_files = self.closed_files
+        thread = threading.Thread(target=lambda: closed_files.extend(self.close_writers({camera_index: writer_info})),
+                                  daemon=True)
+        self.closing_threads.append(thread)
+        thread.start()
+    
+    def set_recording_rate(self, camera_index, fps_divisor):
+        """Continue a camera's recording in a new file at 1/fps_divisor of its frame rate
+        
+        Returns True if the switch happened. The old file ends where the new one begins.
+        """
+        writer_info = self.video_writers.get(camera_index)
+        if writer_info is None or not writer_info['live'] or writer_info['frame_stride'] == fps_divisor:
+            return False
+        
+        # Open before swapping so capture keeps feeding the old writer meanwhile
+        replacement = self.open_writer(camera_index, self.save_directory, datetime.now(),
+                                       fps_divisor, register=False)
+        with self.lock:
+            current = self.recording and self.video_writers.get(camera_index) is writer_info
+            now = time.monotonic()
+            if current:
+                self.video_writers[camera_index] = replacement
+                self.begin_writing(camera_index, replacement, now, False)
+        if not current:
+            # The recording stopped or moved on while the new file was opening
+            self.detach_writer(replacement, now)
+            self.close_writers({camera_index: replacement})
+            return False
+        self.retire_writer(camera_index, writer_info, now)
+        return True
+    
+    def queue_recording_frame(self, writer_info, frame, capture_time, block=False):
+        """Queue frame for the encode thread (with timing control)"""
+        if writer_info['first_capture_time'] is None:
+            writer_info['first_capture_time'] = capture_time
+        writer_info['last_capture_time'] = capture_time
+        writer_info['frames_captured'] += 1
+        
+        if writer_info['timing'] == 'raw':
+            # Copied into the spool here; frames are placed on the timeline when transcoding
+            if writer_info['frames_captured'] % writer_info['frame_stride'] == 0:
+                if writer_info['ring'].put(frame, capture_time):
+                    writer_info['frames_written'] += 1
+        
+        elif writer_info['timing'] == 'cfr':
+            # Every frame (or every n-th when shedding load) goes to the encoder, which
+            # places it by timestamp
+            if writer_info['frames_captured'] % writer_info['frame_stride'] == 0:
+                writer_info['ring'].put(frame, capture_time, block)
+        
+        # Only queue frame if enough time has passed (frame rate limiting)
+        elif (capture_time - writer_info['last_write_time']) >= writer_info['frame_interval']:
+            writer_info['ring'].put(frame, capture_time, block)
+            writer_info['last_write_time'] = capture_time
+    
+    def flush_preroll(self, camera_index, writer_info, preroll):
+        """Queue a camera's buffered history ahead of its live frames, then switch it to live"""
+        while writer_info['stop_time'] is None:
+            item = preroll.pop_oldest()
+            if item is None:
+                with preroll.handoff:
+                    preroll.wait_idle()
+                    if not preroll.count:
+                        writer_info['live'] = True
+                        break
+                continue
+            
+            payload, capture_time = item
+            if capture_time < writer_info['start_time']:
+                continue
+            frame = payload if preroll.compressed else decode_jpeg(payload)
+            if frame is None:
+                continue
+            try:
+                # Blocking: the backlog is far larger than the ring, and none of it may be dropped
+                self.queue_recording_frame(writer_info, frame, capture_time, block=True)
+                writer_info['frames_prerolled'] += 1
+            except Exception as e:
+                print(f"Error queueing pre-roll frame for camera {camera_index}: {e}")
+        print(f"Camera {camera_index}: {writer_info['frames_prerolled']} pre-roll frames queued")
+    
+    def take_preview_frame(self, camera_index):
+        """Return the newest unrendered (frame, timestamp) for a camera, or None"""
+        mailbox = self.preview_mailboxes.get(camera_index)
+        return mailbox.take() if mailbox else None
+    
+    def preview_metrics(self):
+        """Per-camera preview coalescing metrics"""
+        return {camera_index: mailbox.get_metrics()
+                for camera_index, mailbox in self.preview_mailboxes.items()}
+    
+    def encode_camera_frames(self, camera_index, writer_info):
+        """Drain a camera's frame ring into its video writer"""
+        if writer_info['timing'] == 'cfr':
+            encode_frames_constant_rate(writer_info['ring'], writer_info['writer'], writer_info, camera_index,
+                                        writer_info['frame_index'])
+        else:
+            encode_frames(writer_info['ring'], writer_info['writer'], writer_info, camera_index,
+                          writer_info['frame_index'])
+
+def recording_label(info):
+    """Name of a saved_files entry for summaries"""
+    return "Mosaic" if info['camera'] == 'mosaic' else f"Camera {info['camera']}"
+
+def recording_bytes(filepath):
+    """Bytes on disk for a recording, counting its _partN/_segNNN files"""
+    import glob
+    
+    root, ext = os.path.splitext(filepath)
+    total = 0
+    for path in glob.glob(glob.escape(root) + '*' + ext):
+        try:
+            total += os.path.getsize(path)
+        except OSError:
+            pass
+    return total
+
+class MetricsCollector:
+    """Per-camera snapshots of an engine's counters, with rates since the previous snapshot"""
+    
+    def __init__(self, engine):
+        self.engine = engine
+        self.previous = {}  # {(camera_index, counter): (value, monotonic time)}
+    
+    def rate(self, camera_index, counter, value, now):
+        """Per-second increase of a counter since the last snapshot; None on the first one"""
+        previous = self.previous.get((camera_index, counter))
+        self.previous[(camera_index, counter)] = (value, now)
+        if previous is None or now <= previous[1]:
+            return None
+        # A counter that went backwards belongs to a new recording
+        base = previous[0] if value >= previous[0] else 0
+        return (value - base) / (now - previous[1])
+    
+    def collect(self):
+        engine = self.engine
+        now = time.monotonic()
+        cameras = {}
+        for camera_index, capture in list(engine.capture_metrics.items()):
+            mailbox = engine.preview_mailboxes.get(camera_index)
+            frames_rendered = mailbox.frames_taken if mailbox else 0
+            camera = {
+                'active': engine.is_camera_active(camera_index),
+                'frames_captured': capture['frames_captured'],
+                'capture_fps': self.rate(camera_index, 'frames_captured', capture['frames_captured'], now),
+                'read_latency': capture['read_latency'].snapshot(),
+                'frames_rendered': frames_rendered,
+                'preview_fps': self.rate(camera_index, 'frames_rendered', frames_rendered, now),
+                'recording': False
+            }
+            profile = engine.camera_profiles.get(camera_index)
+            if profile is not None:
+                camera['mode'] = profile['granted']
+            writer_info = engine.video_writers.get(camera_index)
+            if writer_info is not None:
+                camera.update(self.collect_recording(camera_index, writer_info, now))
+            cameras[str(camera_index)] = camera
+        
+        return {'time': time.time(), 'recording': engine.recording, 'cameras': cameras}
+    
+    def collect_recording(self, camera_index, writer_info, now):
+        ring = writer_info['ring']
+        stats = ring.stats()
+        # An encoder process keeps its counters in shared memory rather than writer_info
+        counts = stats if isinstance(writer_info['writer'], ProcessEncoder) else writer_info
+        frames_written = int(counts['frames_written'])
+        bytes_written = recording_bytes(writer_info['filepath'])
+        return {
+            'recording': True,
+            'frames_written': frames_written,
+            'write_fps': self.rate(camera_index, 'frames_written', frames_written, now),
+            'frames_dropped': stats['frames_dropped'] + int(counts['frames_skipped']),
+            'frames_duplicated': int(counts['frames_duplicated']),
+            'queue_depth': stats['depth'],
+            'queue_high_water': stats['high_water'],
+            'queue_capacity': ring.capacity,
+            'bytes_written': bytes_written,
+            'write_bytes_per_second': self.rate(camera_index, 'bytes_written', bytes_written, now),
+            'encode_latency': ring.encode_latency.snapshot(),
+            'frame_latency': ring.frame_latency.snapshot()
+        }
+
+# (snapshot key, Prometheus name, type, help) for the per-camera values
+PROMETHEUS_METRICS = (
+    ('active', 'recorder_camera_active', 'gauge', "1 while the camera is capturing"),
+    ('recording', 'recorder_camera_recording', 'gauge', "1 while the camera has an open writer"),
+    ('frames_captured', 'recorder_frames_captured_total', 'counter', "Frames read from the camera"),
+    ('capture_fps', 'recorder_capture_fps', 'gauge', "Capture rate over the last interval"),
+    ('frames_rendered', 'recorder_preview_frames_total', 'counter', "Frames shown in the preview"),
+    ('preview_fps', 'recorder_preview_fps', 'gauge', "Preview rate over the last interval"),
+    ('frames_written', 'recorder_frames_written_total', 'counter', "Frames written to the current recording"),
+    ('write_fps', 'recorder_write_fps', 'gauge', "Output frame rate over the last interval"),
+    ('frames_dropped', 'recorder_frames_dropped_total', 'counter', "Captured frames that never reached the file"),
+    ('frames_duplicated', 'recorder_frames_duplicated_total', 'counter', "Output frames repeated to hold the frame rate"),
+    ('queue_depth', 'recorder_queue_depth', 'gauge', "Frames waiting for the encoder"),
+    ('queue_high_water', 'recorder_queue_high_water', 'gauge', "Deepest the encoder queue has been"),
+    ('bytes_written', 'recorder_bytes_written_total', 'counter', "Bytes on disk for the current recording"),
+    ('write_bytes_per_second', 'recorder_write_bytes_per_second', 'gauge', "Disk write rate over the last interval"),
+)
+
+PROMETHEUS_HISTOGRAMS = (
+    ('read_latency', 'recorder_read_latency_seconds', "Time spent in each camera read"),
+    ('encode_latency', 'recorder_encode_latency_seconds', "Time spent writing each output frame"),
+    ('frame_latency', 'recorder_frame_latency_seconds', "Time from capture until a frame is written"),
+)
+
+def format_prometheus(snapshot):
+    """Render a MetricsCollector snapshot in the Prometheus text exposition format"""
+    lines = []
+    cameras = sorted(snapshot['cameras'].items(), key=lambda item: int(item[0]))
+    
+    for key, name, metric_type, help_text in PROMETHEUS_METRICS:
+        samples = [(camera_index, camera[key]) for camera_index, camera in cameras
+                   if camera.get(key) is not None]
+        if not samples:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for camera_index, value in samples:
+            lines.append(f'{name}{{camera="{camera_index}"}} {float(value):g}')
+    
+    for key, name, help_text in PROMETHEUS_HISTOGRAMS:
+        samples = [(camera_index, camera[key]) for camera_index, camera in cameras if key in camera]
+        if not samples:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for camera_index, histogram in samples:
+            for bound, count in histogram['buckets'].items():
+                lines.append(f'{name}_bucket{{camera="{camera_index}",le="{bound}"}} {count}')
+            lines.append(f'{name}_sum{{camera="{camera_index}"}} {histogram["sum"]:g}')
+            lines.append(f'{name}_count{{camera="{camera_index}"}} {histogram["count"]}')
+    
+    return "\n".join(lines) + "\n"
+
+class MetricsExporter:
+    """Collects metrics on a timer and publishes them
+    
+    Outputs, all optional: appended JSON lines, a Prometheus text file rewritten in place,
+    and a localhost HTTP endpoint serving /metrics (Prometheus) and /metrics.json.
+    """
+    
+    def __init__(self, engine, interval=1.0):
+        self.collector = MetricsCollector(engine)
+        self.interval = interval
+        self.latest = None
+        self.jsonl_file = None
+        self.prometheus_path = None
+        self.server = None
+        self.thread = None
+        self.stop_event = threading.Event()
+    
+    def start(self, jsonl_path=None, prometheus_path=None, http_port=None):
+        if jsonl_path:
+            self.jsonl_file = open(jsonl_path, 'a')
+        self.prometheus_path = prometheus_path
+        self.publish()
+        if http_port:
+            self.start_http(http_port)
+        
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+    
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.publish()
+            except Exception as e:
+                print(f"Metrics export error: {e}")
+    
+    def publish(self):
+        import json
+        
+        snapshot = self.latest = self.collector.collect()
+        if self.jsonl_file is not None:
+            self.jsonl_file.write(json.dumps(snapshot) + "\n")
+            self.jsonl_file.flush()
+        if self.prometheus_path:
+            temp_path = self.prometheus_path + '.tmp'
+            with open(temp_path, 'w') as f:
+                f.write(format_prometheus(snapshot))
+            os.replace(temp_path, self.prometheus_path)  # Scrapers never see a partial file
+    
+    def start_http(self, port):
+        """Serve the latest snapshot on 127.0.0.1:port"""
+        import json
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        
+        exporter = self
+        
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                snapshot = exporter.latest
+                if self.path in ('/', '/metrics'):
+                    body = format_prometheus(snapshot).encode()
+                    content_type = 'text/plain; version=0.0.4'
+                elif self.path == '/metrics.json':
+                    body = json.dumps(snapshot).encode()
+                    content_type = 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass  # Scrapes every few seconds would flood stdout
+        
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), MetricsHandler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        print(f"Serving metrics on http://127.0.0.1:{self.server.server_address[1]}/metrics")
+    
+    def stop(self):
+        """Publish a final snapshot and close every output"""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+            try:
+                self.publish()
+            except Exception as e:
+                print(f"Metrics export error: {e}")
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        if self.jsonl_file is not None:
+            self.jsonl_file.close()
+            self.jsonl_file = None
+
+class LiveViewServer:
+    """Serves each camera's newest frame over HTTP so others can watch without the GUI
+    
+    /camera/N.mjpg is a multipart/x-mixed-replace MJPEG stream, /camera/N.jpg a single
+    snapshot and / a page showing every stream. A frame is JPEG-encoded at most once
+    however many clients watch it; passthrough cameras' payloads are served as they are.
+    Streams refresh on a fixed tick. A client is sent the newest frame once its previous
+    write completes, so slow clients skip frames, and one whose socket stalls for
+    SEND_TIMEOUT seconds is disconnected. Capture only posts to its mailbox and never
+    waits on a client.
+    """
+    
+    SEND_TIMEOUT = 5
+    BOUNDARY = 'frame'
+    
+    def __init__(self, engine, port, fps=15, quality=80, max_clients=16):
+        self.engine = engine
+        self.port = port
+        self.fps = fps
+        self.quality = quality
+        self.max_clients = max_clients
+        self.frames = {}        # {camera_index: (mailbox sequence, JPEG bytes)}
+        self.encode_locks = {}  # {camera_index: Lock}, so each frame is encoded once
+        self.watchers = {}      # {camera_index: open streams}
+        self.new_frame = threading.Condition()
+        self.server = None
+        self.thread = None
+        self.stop_event = threading.Event()
+        
+        # Counters
+        self.frames_encoded = 0
+        self.frames_sent = 0
+        self.clients_dropped = 0
+    
+    def start(self):
+        """Serve on 127.0.0.1:port and start the stream tick"""
+        from http.server import ThreadingHTTPServer
+        
+        self.server = ThreadingHTTPServer(('127.0.0.1', self.port), self.handler_class())
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        print(f"Serving live view on http://127.0.0.1:{self.server.server_address[1]}/")
+    
+    def stop(self):
+        self.stop_event.set()
+        with self.new_frame:
+            self.new_frame.notify_all()  # Streams waiting for a frame return
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+            print(f"Live view: {self.frames_encoded} frames encoded, {self.frames_sent} sent, "
+                  f"{self.clients_dropped} slow clients dropped")
+    
+    def run(self):
+        """Refresh the frames that streams are watching, then wake the streams"""
+        interval = 1.0 / self.fps
+        while not self.stop_event.wait(interval):
+            with self.new_frame:
+                watched = [camera_index for camera_index, count in self.watchers.items() if count]
+            for camera_index in watched:
+                try:
+                    self.latest_jpeg(camera_index)
+                except Exception as e:
+                    print(f"Live view encode error for camera {camera_index}: {e}")
+            with self.new_frame:
+                self.new_frame.notify_all()
+    
+    def latest_jpeg(self, camera_index):
+        """JPEG of the camera's newest frame, encoding it only if nobody has yet"""
+        mailbox = self.engine.preview_mailboxes.get(camera_index)
+        if mailbox is None:
+            return None
+        frame, timestamp, sequence = mailbox.peek()
+        if frame is None:
+            return None
+        
+        with self.encode_locks.setdefault(camera_index, threading.Lock()):
+            cached = self.frames.get(camera_index)
+            if cached is not None and cached[0] == sequence:
+                return cached[1]
+            if frame.ndim == 1:
+                jpeg = frame.tobytes()  # Passthrough payload, already a JPEG
+            else:
+                ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+                if not ok:
+                    return None
+                jpeg = buffer.tobytes()
+                self.frames_encoded += 1
+            self.frames[camera_index] = (sequence, jpeg)
+            return jpeg
+    
+    def add_watcher(self, camera_index):
+        """Count a new stream; False when the server is full"""
+        with self.new_frame:
+            if sum(self.watchers.values()) >= self.max_clients:
+                return False
+            self.watchers[camera_index] = self.watchers.get(camera_index, 0) + 1
+            return True
+    
+    def remove_watcher(self, camera_index):
+        with self.new_frame:
+            self.watchers[camera_index] -= 1
+    
+    def wait_frame(self, camera_index, sequence):
+        """Block until the tick publishes a frame newer than sequence; None once stopped"""
+        with self.new_frame:
+            self.new_frame.wait_for(lambda: self.stop_event.is_set()
+                                    or self.frames.get(camera_index, (sequence,))[0] != sequence)
+            if self.stop_event.is_set():
+                return None
+            return self.frames[camera_index]
+    
+    def index_page(self):
+        images = "".join(f'<figure><img src="/camera/{camera_index}.mjpg" width="480">'
+                         f'<figcaption>Camera {camera_index}</figcaption></figure>'
+                         for camera_index in sorted(self.engine.preview_mailboxes))
+        return (f'<!DOCTYPE html><html><head><title>Live view</title></head>'
+                f'<body style="background:#1e1e1e;color:#fff;font-family:sans-serif">{images}</body></html>')
+    
+    def handler_class(self):
+        import re
+        import socket
+        from http.server import BaseHTTPRequestHandler
+        
+        live_view = self
+        
+        class LiveViewHandler(BaseHTTPRequestHandler):
+            timeout = live_view.SEND_TIMEOUT  # Applies to every send on the connection
+            
+            def do_GET(self):
+                path = self.path.split('?')[0]
+                if path == '/':
+                    self.send_body(live_view.index_page().encode(), 'text/html; charset=utf-8')
+                    return
+                match = re.fullmatch(r'/camera/(\d+)\.(jpg|mjpg)', path)
+                if match is None or int(match.group(1)) not in live_view.engine.preview_mailboxes:
+                    self.send_error(404)
+                    return
+                
+                camera_index = int(match.group(1))
+                if match.group(2) == 'jpg':
+                    jpeg = live_view.latest_jpeg(camera_index)
+                    if jpeg is None:
+                        self.send_error(503, "No frame yet")
+                    else:
+                        self.send_body(jpeg, 'image/jpeg')
+                    return
+                
+                if not live_view.add_watcher(camera_index):
+                    self.send_error(503, "Too many viewers")
+                    return
+                try:
+                    self.stream(camera_index)
+                except socket.timeout:
+                    live_view.clients_dropped += 1
+                    print(f"Live view: dropped a stalled client of camera {camera_index}")
+                except OSError:
+                    pass  # Client went away
+                finally:
+                    live_view.remove_watcher(camera_index)
+            
+            def stream(self, camera_index):
+                self.send_response(200)
+                self.send_header('Content-Type', f'multipart/x-mixed-replace; boundary={live_view.BOUNDARY}')
+                self.send_header('Cache-Control', 'no-cache')
+                self.end_headers()
+                self.close_connection = True
+                
+                sequence = None
+                while True:
+                    latest = live_view.wait_frame(camera_index, sequence)
+                    if latest is None:
+                        return
+                    sequence, jpeg = latest
+                    self.wfile.write(f"--{live_view.BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                                     f"Content-Length: {len(jpeg)}\r\n\r\n".encode() + jpeg + b"\r\n")
+                    live_view.frames_sent += 1
+            
+            def send_body(self, body, content_type):
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('Cache-Control', 'no-cache')
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass  # One line per snapshot poll would flood stdout
+        
+        return LiveViewHandler
+
+class DeviceWatcher:
+    """Notices cameras being plugged in or pulled out without disturbing the others
+    
+    /dev/videoN nodes and their sysfs identities are compared with the previous scan,
+    woken by inotify on /dev where available and every interval seconds regardless.
+    Cameras whose node vanished or now belongs to another device are removed from the
+    engine, closing only their recordings. New nodes, and only those, are probed; found
+    cameras are added and, when a recording is running, join it. A capture node whose
+    probe fails is probed again after RETRY_DELAYS, since cameras can take a few seconds
+    to come up. on_added(camera_info) and on_removed(camera_index) are called from the
+    watcher's threads.
+    """
+    
+    SETTLE_SECONDS = 0.5       # Let udev finish setting up a new node before probing it
+    RETRY_DELAYS = (1.0, 3.0)  # Seconds before each further probe of a node that failed
+    
+    def __init__(self, engine, on_added=None, on_removed=None, interval=2.0):
+        self.engine = engine
+        self.on_added = on_added
+        self.on_removed = on_removed
+        self.interval = interval
+        self.known = {}    # {device_index: sysfs identity} of nodes with a settled probe result
+        self.probing = {}  # {device_index: (sysfs identity, monotonic probe start)}
+        self.retries = {}  # {device_index: (sysfs identity, failed probes, monotonic time of next probe)}
+        self.lock = threading.Lock()  # check() and probe results arrive on different threads
+        self.thread = None
+        self.stop_event = threading.Event()
+    
+    def start(self):
+        self.known = self.scan()
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+            self.thread = None
+    
+    def scan(self):
+        return {i: read_sysfs_identity(i) for i in list_video_nodes()}
+    
+    def run(self):
+        import select
+        
+        fd = open_dev_inotify()
+        try:
+            while not self.stop_event.is_set():
+                if fd is not None:
+                    readable, _, _ = select.select([fd], [], [], self.interval)
+                    if readable:
+                        try:
+                            while os.read(fd, 4096):
+                                pass  # Drain; the scan works out what changed
+                        except BlockingIOError:
+                            pass
+                        if self.stop_event.wait(self.SETTLE_SECONDS):
+                            break
+                elif self.stop_event.wait(self.interval):
+                    break
+                
+                try:
+                    self.check()
+                except Exception as e:
+                    print(f"Device watcher error: {e}")
+        finally:
+            if fd is not None:
+                os.close(fd)
+    
+    def check(self):
+        """Diff the nodes against the last scan and act on what changed"""
+        nodes = self.scan()
+        registered = {cam['index'] for cam in self.engine.cameras}
+        with self.lock:
+            gone = [i for i, identity in self.known.items() if nodes.get(i) != identity]
+            for i in gone:
+                del self.known[i]
+            # A node that vanished or changed device starts over
+            for pending in (self.probing, self.retries):
+                for i in [i for i, entry in pending.items() if nodes.get(i) != entry[0]]:
+                    del pending[i]
+        for i in gone:
+            if i in registered:
+                print(f"Camera {i} was unplugged")
+                self.engine.remove_camera(i)
+                if self.on_removed:
+                    self.on_removed(i)
+        
+        now = time.monotonic()
+        with self.lock:
+            # A probe whose result never came back is given up on
+            for i in [i for i, (identity, started) in self.probing.items()
+                      if now - started > self.engine.probe_timeout + self.interval]:
+                del self.probing[i]
+            changed = [i for i, identity in nodes.items()
+                       if self.known.get(i) != identity and i not in self.probing
+                       and not (i in self.retries and self.retries[i][2] > now)
+                       and not self.engine.is_camera_active(i)]
+            for i in changed:
+                self.probing[i] = (nodes[i], now)
+        # Nodes are only recorded in known once on_probed has a definite answer; while a
+        # full detection is running they are simply tried again on the next scan
+        if changed and not self.engine.detect_cameras_async(on_result=self.on_probed,
+                                                            device_indices=changed):
+            with self.lock:
+                for i in changed:
+                    self.probing.pop(i, None)
+    
+    def on_probed(self, device_index, camera_info):
+        with self.lock:
+            identity = self.probing.pop(device_index, (None,))[0]
+            if identity is None:
+                return  # Unplugged or replaced while it was being probed
+            if camera_info is None and v4l2_capture_capable(device_index) is not False:
+                # Maybe not ready yet; a node that cannot capture needs no second look
+                failures = self.retries.get(device_index, (identity, 0))[1] + 1
+                if failures <= len(self.RETRY_DELAYS):
+                    delay = self.RETRY_DELAYS[failures - 1]
+                    self.retries[device_index] = (identity, failures, time.monotonic() + delay)
+                    print(f"Camera {device_index} is not ready; probing again in {delay:g}s")
+                    return
+                print(f"Camera {device_index} still failed after {failures} probes; use Refresh to try again")
+            self.retries.pop(device_index, None)
+            self.known[device_index] = identity
+        if camera_info is None:
+            return
+        print(f"Camera {device_index} was plugged in")
+        try:
+            if self.engine.join_recording(device_index):
+                print(f"Camera {device_index} joined the recording")
+        except Exception as e:
+            print(f"Camera {device_index} could not join the recording: {e}")
+        if self.on_added:
+            self.on_added(camera_info)
+
+class LoadShedder:
+    """Degrades preview, then low-priority recordings, while capture or encode falls behind
+    
+    Once a second the engine's queues, drop counts and capture rates are checked. On
+    overload one step of the ladder is taken: halve the preview rate, halve the preview
+    resolution, then halve the recording rate of each shed-able camera, 'low' priority
+    first. 'high' priority cameras are never touched. Steps are undone in reverse order
+    after the host has been healthy for RECOVER_SECONDS. Every change is logged with a
+    timestamp to stdout and, optionally, as JSON lines to a file.
+    """
+    
+    SETTLE_SECONDS = 3       # Wait after a step before judging whether another is needed
+    RECOVER_SECONDS = 10     # Healthy time before undoing a step
+    QUEUE_FILL = 0.5         # Encoder queue fraction that counts as falling behind
+    DROP_FRACTION = 0.1      # Dropped frames per captured frame that counts as falling behind
+    CAPTURE_FRACTION = 0.85  # Capture rate below this fraction of the camera's rate is lagging
+    SHED_ORDER = ('low', 'normal')
+    
+    def __init__(self, engine, renderer=None, interval=1.0, log_path=None):
+        self.engine = engine
+        self.renderer = renderer
+        self.interval = interval
+        self.log_path = log_path
+        self.collector = MetricsCollector(engine)
+        self.applied = []        # Steps taken, most recent last: (action, camera_index, undo value)
+        self.last_change = 0.0
+        self.healthy_since = None
+        self.events = []
+        self.thread = None
+        self.stop_event = threading.Event()
+    
+    def start(self):
+        self.stop_event.clear()
+        self.collector.collect()  # Baseline for the first rates
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+    
+    def stop(self, restore=True):
+        """Stop watching, by default undoing every step still in effect"""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+            self.thread = None
+        while restore and self.applied:
+            self.undo("shedding disabled")
+    
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"Load shedding error: {e}")
+    
+    def tick(self):
+        now = time.monotonic()
+        # Recording steps lapse when their recording ends
+        self.applied = [step for step in self.applied
+                        if step[0] != 'record_fps' or step[1] in self.engine.video_writers]
+        
+        reason = self.overload_reason(self.collector.collect())
+        if reason is not None:
+            self.healthy_since = None
+            if now - self.last_change >= self.SETTLE_SECONDS:
+                self.degrade(reason)
+                self.last_change = now
+        elif self.healthy_since is None:
+            self.healthy_since = now
+        elif self.applied and now - max(self.healthy_since, self.last_change) >= self.RECOVER_SECONDS:
+            self.undo(f"healthy for {self.RECOVER_SECONDS}s")
+            self.last_change = now
+    
+    def overload_reason(self, snapshot):
+        """Why the host counts as behind, or None while it keeps up"""
+        for key, camera in snapshot['cameras'].items():
+            camera_index = int(key)
+            active = self.engine.active_cameras.get(camera_index)
+            if not camera['active'] or active is None:
+                continue
+            
+            fps = active.source.get_properties()[2]
+            if fps > 0 and camera['capture_fps'] is not None and camera['capture_fps'] < fps * self.CAPTURE_FRACTION:
+                return f"camera {camera_index} capturing {camera['capture_fps']:.1f} of {fps} fps"
+            if not camera['recording']:
+                continue
+            
+            if camera['queue_depth'] >= camera['queue_capacity'] * self.QUEUE_FILL:
+                return f"camera {camera_index} encoder queue {camera['queue_depth']}/{camera['queue_capacity']}"
+            dropped = self.collector.rate(camera_index, 'frames_dropped', camera['frames_dropped'], time.monotonic())
+            if dropped and camera['capture_fps'] and dropped > camera['capture_fps'] * self.DROP_FRACTION:
+                return f"camera {camera_index} dropping {dropped:.1f} frames/s"
+        return None
+    
+    def ladder(self):
+        """Steps in shedding order; recording steps cover the cameras recording right now"""
+        steps = []
+        if self.renderer is not None:
+            steps += [('preview_fps', None), ('preview_scale', None)]
+        priorities = self.engine.camera_priorities
+        for priority in self.SHED_ORDER:
+            steps += [('record_fps', camera_index) for camera_index in sorted(self.engine.video_writers, key=str)
+                      if camera_index != 'mosaic' and priorities.get(camera_index, 'normal') == priority]
+        return steps
+    
+    def degrade(self, reason):
+        taken = {step[:2] for step in self.applied}
+        for action, camera_index in self.ladder():
+            if (action, camera_index) in taken:
+                continue
+            if action == 'preview_fps':
+                undo_value = self.renderer.fps
+                self.renderer.fps = undo_value / 2
+                detail = f"preview {undo_value:g} -> {self.renderer.fps:g} fps"
+            elif action == 'preview_scale':
+                undo_value = self.renderer.scale
+                self.renderer.scale = undo_value / 2
+                detail = f"preview scale {undo_value:g} -> {self.renderer.scale:g}"
+            else:
+                if not self.engine.set_recording_rate(camera_index, 2):
+                    continue
+                undo_value = 1
+                detail = f"camera {camera_index} recording at half rate"
+            self.applied.append((action, camera_index, undo_value))
+            self.log('degrade', detail, reason)
+            return
+        if not self.events or self.events[-1]['event'] != 'exhausted':
+            self.log('exhausted', "nothing left to shed", reason)
+    
+    def undo(self, reason):
+        action, camera_index, undo_value = self.applied.pop()
+        if action == 'preview_fps':
+            self.renderer.fps = undo_value
+            detail = f"preview back to {undo_value:g} fps"
+        elif action == 'preview_scale':
+            self.renderer.scale = undo_value
+            detail = f"preview scale back to {undo_value:g}"
+        else:
+            self.engine.set_recording_rate(camera_index, undo_value)
+            detail = f"camera {camera_index} recording at full rate"
+        self.log('recover', detail, reason)
+    
+    def log(self, kind, detail, reason):
+        import json
+        
+        event = {'time': datetime.now().isoformat(timespec='milliseconds'), 'event': kind,
+                 'action': detail, 'reason': reason, 'level': len(self.applied)}
+        self.events.append(event)
+        print(f"[{event['time']}] Load shedding {kind}: {detail} ({reason})")
+        if self.log_path:
+            try:
+                with open(self.log_path, 'a') as f:
+                    f.write(json.dumps(event) + "\n")
+            except OSError as e:
+                print(f"Could not write load shedding log: {e}")
 
 class DarkCameraGUI:
-    def __init__(self, root):
+    def __init__(self, root, metrics_outputs=None, cameras=None, live_view=None, review=None):
         self.root = root
         self.root.title("Multi-Camera Monitor")
         self.root.geometry("1200x800")
         self.root.configure(bg='#1e1e1e')
         
         # Variables
-        self.cameras = []
-        self.active_cameras = {}  # {camera_index: {'cap': cv2.VideoCapture, 'thread': thread, 'active': bool}}
+        self.engine = RecorderEngine(on_camera_error=self.on_camera_error,
+                                     on_recording_error=self.on_recording_error)
         self.camera_labels = {}   # {camera_index: label_widget}
-        self.recording = False
-        self.video_writers = {}   # {camera_index: cv2.VideoWriter}
-        self.recording_start_time = None
+        self.camera_tiles = {}    # {camera_index: tile frame in the grid}
+        self.control_rows = {}    # {camera_index: start/stop row in the control panel}
+        self.grid_columns = 0
+        self.preview_images = {}  # {camera_index: tk.PhotoImage}, reused for every frame
+        self.preview_fps = 15     # Fixed rate the UI timer renders the newest frames at
+        self.preview_renderer = PreviewRenderer(self.engine, fps=self.preview_fps)
+        self.preview_renderer.start()
+        self.metrics_labels = {}  # {camera_index: label_widget} under each tile
+        self.metrics = MetricsExporter(self.engine)
+        self.metrics.start(**(metrics_outputs or {}))
+        self.load_shedder = LoadShedder(self.engine, self.preview_renderer)
+        self.live_view = None
+        if live_view:
+            self.live_view = LiveViewServer(self.engine, **live_view)
+            self.live_view.start()
+        self.preset_cameras = cameras  # camera_info dicts used instead of probing (files, synthetic)
+        self.device_watcher = DeviceWatcher(
+            self.engine,
+            on_added=lambda camera_info: self.root.after(0, self.on_device_change, camera_info['index'], True),
+            on_removed=lambda camera_index: self.root.after(0, self.on_device_change, camera_index, False))
+        self.review = None          # ReviewPlayer while a recorded session is open
+        self.review_scrubbing = False
+        self.review_session = review  # Session to open once the window is up
+        
+        # Startup timings, monotonic
+        self.first_paint_time = None
+        self.first_frame_time = None
         
         # Configure dark theme
         self.configure_dark_theme()
@@ -27,8 +4730,12 @@ class DarkCameraGUI:
         # Create GUI elements
         self.create_widgets()
         
-        # Detect cameras on startup
-        self.detect_cameras()
+        # Discovery and the heavy imports wait until the window is on screen
+        self.root.bind('<Map>', self.on_first_map, add='+')
+        
+        # Single UI timer for every preview tile
+        self.root.after(int(1000 / self.preview_fps), self.preview_tick)
+        self.root.after(int(self.metrics.interval * 1000), self.metrics_tick)
     
     def configure_dark_theme(self):
         """Configure dark theme for ttk widgets"""
@@ -107,6 +4814,10 @@ class DarkCameraGUI:
                                command=self.detect_cameras, style='Custom.TButton')
         refresh_btn.pack(pady=10, padx=15, fill=tk.X)
         
+        review_btn = ttk.Button(control_frame, text="🎞 Review Recording...",
+                              command=self.choose_review_session, style='Custom.TButton')
+        review_btn.pack(pady=(0, 10), padx=15, fill=tk.X)
+        
         # Global controls
         tk.Label(control_frame, text="Global Controls:", 
                bg='#1e1e1e', fg='#ffffff', 
@@ -120,6 +4831,74 @@ class DarkCameraGUI:
                                 command=self.stop_recording_all, style='Stop.TButton')
         stop_all_btn.pack(pady=2, padx=15, fill=tk.X)
         
+        self.sync_var = tk.BooleanVar(value=self.engine.sync_capture)
+        sync_check = tk.Checkbutton(control_frame, text="Synchronized capture",
+                                    variable=self.sync_var, command=self.toggle_sync_capture,
+                                    bg='#1e1e1e', fg='#ffffff', selectcolor='#2d2d2d',
+                                    activebackground='#1e1e1e', activeforeground='#ffffff')
+        sync_check.pack(anchor=tk.W, pady=(5, 0), padx=15)
+        
+        self.passthrough_var = tk.BooleanVar(value=self.engine.mjpeg_passthrough)
+        passthrough_check = tk.Checkbutton(control_frame, text="MJPEG passthrough",
+                                           variable=self.passthrough_var,
+                                           command=self.toggle_mjpeg_passthrough,
+                                           bg='#1e1e1e', fg='#ffffff', selectcolor='#2d2d2d',
+                                           activebackground='#1e1e1e', activeforeground='#ffffff')
+        passthrough_check.pack(anchor=tk.W, padx=15)
+        
+        self.low_latency_var = tk.BooleanVar(value=self.engine.low_latency)
+        low_latency_check = tk.Checkbutton(control_frame, text="Low-latency capture",
+                                           variable=self.low_latency_var,
+                                           command=self.toggle_low_latency,
+                                           bg='#1e1e1e', fg='#ffffff', selectcolor='#2d2d2d',
+                                           activebackground='#1e1e1e', activeforeground='#ffffff')
+        low_latency_check.pack(anchor=tk.W, padx=15)
+        
+        self.motion_var = tk.BooleanVar(value=self.engine.motion_trigger)
+        motion_check = tk.Checkbutton(control_frame, text="Record on motion only",
+                                      variable=self.motion_var,
+                                      command=self.toggle_motion_trigger,
+                                      bg='#1e1e1e', fg='#ffffff', selectcolor='#2d2d2d',
+                                      activebackground='#1e1e1e', activeforeground='#ffffff')
+        motion_check.pack(anchor=tk.W, padx=15)
+        
+        self.mosaic_var = tk.BooleanVar(value=self.engine.mosaic)
+        mosaic_check = tk.Checkbutton(control_frame, text="Record as one mosaic",
+                                      variable=self.mosaic_var,
+                                      command=self.toggle_mosaic,
+                                      bg='#1e1e1e', fg='#ffffff', selectcolor='#2d2d2d',
+                                      activebackground='#1e1e1e', activeforeground='#ffffff')
+        mosaic_check.pack(anchor=tk.W, padx=15)
+        
+        self.raw_var = tk.BooleanVar(value=self.engine.record_format == 'raw')
+        raw_check = tk.Checkbutton(control_frame, text="Raw capture, transcode afterwards",
+                                   variable=self.raw_var,
+                                   command=self.toggle_raw_capture,
+                                   bg='#1e1e1e', fg='#ffffff', selectcolor='#2d2d2d',
+                                   activebackground='#1e1e1e', activeforeground='#ffffff')
+        raw_check.pack(anchor=tk.W, padx=15)
+        
+        self.shed_var = tk.BooleanVar(value=False)
+        shed_check = tk.Checkbutton(control_frame, text="Shed load when behind",
+                                    variable=self.shed_var,
+                                    command=self.toggle_load_shedding,
+                                    bg='#1e1e1e', fg='#ffffff', selectcolor='#2d2d2d',
+                                    activebackground='#1e1e1e', activeforeground='#ffffff')
+        shed_check.pack(anchor=tk.W, padx=15)
+        
+        preroll_frame = tk.Frame(control_frame, bg='#1e1e1e')
+        preroll_frame.pack(anchor=tk.W, pady=(5, 0), padx=15)
+        tk.Label(preroll_frame, text="Pre-roll (s):",
+               bg='#1e1e1e', fg='#ffffff').pack(side=tk.LEFT)
+        self.preroll_var = tk.StringVar(value=str(self.engine.preroll_seconds))
+        preroll_spin = tk.Spinbox(preroll_frame, from_=0, to=60, width=4,
+                                  textvariable=self.preroll_var, command=self.set_preroll_seconds,
+                                  bg='#2d2d2d', fg='#ffffff', buttonbackground='#3d3d3d',
+                                  insertbackground='#ffffff')
+        preroll_spin.bind('<FocusOut>', lambda e: self.set_preroll_seconds())
+        preroll_spin.bind('<Return>', lambda e: self.set_preroll_seconds())
+        preroll_spin.pack(side=tk.LEFT, padx=(5, 0))
+        
         # Individual camera controls
         tk.Label(control_frame, text="Individual Controls:", 
                bg='#1e1e1e', fg='#ffffff',
@@ -134,6 +4913,28 @@ class DarkCameraGUI:
                                  font=('Arial', 10, 'bold'))
         grid_frame.pack(fill=tk.BOTH, expand=True)
         
+        # Playback controls, shown only while reviewing
+        self.review_bar = tk.Frame(grid_frame, bg='#1e1e1e')
+        self.review_play_btn = ttk.Button(self.review_bar, text="▶", width=3,
+                                          command=self.toggle_review_playback, style='Start.TButton')
+        ttk.Button(self.review_bar, text="⏮", width=3, command=lambda: self.step_review(-1),
+                   style='Custom.TButton').pack(side=tk.LEFT, padx=(0, 2))
+        self.review_play_btn.pack(side=tk.LEFT, padx=2)
+        ttk.Button(self.review_bar, text="⏭", width=3, command=lambda: self.step_review(1),
+                   style='Custom.TButton').pack(side=tk.LEFT, padx=2)
+        ttk.Button(self.review_bar, text="✖ Exit Review", command=self.close_review,
+                   style='Stop.TButton').pack(side=tk.RIGHT, padx=(5, 0))
+        self.review_time_var = tk.StringVar()
+        tk.Label(self.review_bar, textvariable=self.review_time_var, width=24,
+                 bg='#1e1e1e', fg='#ffffff', font=('Consolas', 10)).pack(side=tk.RIGHT, padx=5)
+        self.review_scale = tk.Scale(self.review_bar, orient=tk.HORIZONTAL, showvalue=False,
+                                     from_=0, to=1, resolution=0.01, command=self.on_review_scrub,
+                                     bg='#1e1e1e', troughcolor='#2d2d2d', highlightthickness=0,
+                                     activebackground='#00aa44')
+        self.review_scale.bind('<ButtonPress-1>', lambda e: setattr(self, 'review_scrubbing', True))
+        self.review_scale.bind('<ButtonRelease-1>', lambda e: setattr(self, 'review_scrubbing', False))
+        self.review_scale.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        
         # Create camera grid container
         self.camera_grid = tk.Frame(grid_frame, bg='#1e1e1e')
         self.camera_grid.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -150,89 +4951,78 @@ class DarkCameraGUI:
                               font=('Arial', 9), anchor=tk.W, padx=10)
         status_label.pack(fill=tk.BOTH, expand=True)
     
+    def on_first_map(self, event):
+        """Start deferred startup work once the window has been mapped"""
+        if self.first_paint_time is not None:
+            return  # Every widget's <Map> reaches this binding
+        self.first_paint_time = time.monotonic()
+        threading.Thread(target=preload_modules, daemon=True).start()
+        self.root.after(0, self.detect_cameras)
+        if self.review_session:
+            self.root.after(0, self.open_review, self.review_session)
+    
     def detect_cameras(self):
         """Detect available cameras and populate the GUI"""
-        self.cameras = []
-        self.camera_listbox.delete(0, tk.END)
-        
-        self.status_var.set("🔍 Detecting cameras...")
-        self.root.update()
-        
-        # More robust camera detection for Linux
-        import os
-        import glob
-        
-        # First, check /dev/video* devices (Linux specific)
-        video_devices = []
-        if os.name == 'posix':  # Linux/Unix
-            video_devices = sorted([int(d.split('video')[1]) for d in glob.glob('/dev/video*') 
-                                  if d.split('video')[1].isdigit()])
-        
-        # If no video devices found, fall back to testing indices 0-5
-        if not video_devices:
-            video_devices = list(range(6))
+        if self.preset_cameras is not None:
+            # Files and synthetic sources need no probing
+            for camera_info in self.preset_cameras:
+                self.engine.add_camera(dict(camera_info))
+            self.refresh_camera_list()
+            self.on_detection_done()
+            return
         
-        # Test each potential camera index
-        for i in video_devices:
-            try:
-                # Use a more careful approach to avoid segfaults
-                cap = None
-                try:
-                    # Set backend explicitly to avoid issues
-                    cap = cv2.VideoCapture(i, cv2.CAP_V4L2)  # Use V4L2 backend on Linux
-                    
-                    # Give it time to initialize
-                    import time
-                    time.sleep(0.1)
-                    
-                    # Test if camera actually works by trying to read a frame
-                    if cap.isOpened():
-                        ret, frame = cap.read()
-                        if ret and frame is not None:
-                            # Get camera properties
-                            width = cap.get(cv2.CAP_PROP_FRAME_WIDTH)
-                            height = cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
-                            fps = cap.get(cv2.CAP_PROP_FPS)
-                            
-                            camera_info = {
-                                'index': i,
-                                'width': int(width) if width > 0 else 640,
-                                'height': int(height) if height > 0 else 480,
-                                'fps': int(fps) if fps > 0 else 30
-                            }
-                            
-                            self.cameras.append(camera_info)
-                            
-                            # Add to listbox with nice formatting
-                            info_text = f"📷 Camera {i:2d} │ {int(width):4d}×{int(height):4d} │ {fps if fps > 0 else 'N/A':>3} FPS"
-                            self.camera_listbox.insert(tk.END, info_text)
-                            
-                            print(f"Found working camera at index {i}")
-                        else:
-                            print(f"Camera {i} opened but couldn't read frame")
-                    else:
-                        print(f"Camera {i} failed to open")
-                        
-                except Exception as e:
-                    print(f"Error testing camera {i}: {e}")
-                    
-                finally:
-                    # Always release the camera
-                    if cap is not None:
-                        try:
-                            cap.release()
-                        except:
-                            pass
-                        
-            except Exception as e:
-                print(f"Critical error with camera {i}: {e}")
-                continue
+        started = self.engine.detect_cameras_async(
+            on_result=lambda i, cam: self.root.after(0, self.on_camera_probed, i, cam),
+            on_done=lambda cameras: self.root.after(0, self.on_detection_done),
+            refresh=True)
+        if not started:
+            return  # Already detecting
         
-        if self.cameras:
-            self.status_var.set(f"✅ Found {len(self.cameras)} working camera(s)")
+        self.camera_listbox.delete(0, tk.END)
+        self.status_var.set("🔍 Detecting cameras...")
+    
+    def on_camera_probed(self, device_index, camera_info):
+        """Show each probe result as soon as it arrives, adding found cameras to the grid"""
+        self.refresh_camera_list()
+        if camera_info is not None:
             self.create_individual_controls()
+            if self.review is None:
+                self.setup_camera_grid()
+        
+        self.status_var.set(f"🔍 Detecting cameras... checked /dev/video{device_index}, "
+                            f"{len(self.engine.cameras)} found so far")
+    
+    def on_device_change(self, camera_index, added):
+        """Add or remove one camera's tile and controls; the other cameras are untouched"""
+        self.refresh_camera_list()
+        self.create_individual_controls()
+        if self.review is None:
             self.setup_camera_grid()
+        if added:
+            self.status_var.set(f"🔌 Camera {camera_index} connected")
         else:
+            self.status_var.set(f"🔌 Camera {camera_index} disconnected")
+    
+    def refresh_camera_list(self):
+        self.camera_listbox.delete(0, tk.END)
+        for cam in self.engine.cameras:
+            # Add to listbox with nice formatting
+            info_text = f"📷 Camera {cam['index']:2d} │ {cam['width']:4d}×{cam['height']:4d} │ {cam['fps']:>3} FPS"
+            if cam.get('modes'):
+                info_text += f" │ {len(cam['modes'])} modes"
+            self.camera_listbox.insert(tk.END, info_text)
+    
+    def on_detection_done(self):
+        """Build controls and the grid once every probe has finished"""
+        if self.preset_cameras is None and self.device_watcher.thread is None:
+            self.device_watcher.start()  # From now on cameras come and go one at a time
+        if self.review is not None:
+            self.create_individual_controls()  # The grid is showing the recording under review
+        elif self.engine.cameras:
+            self.status_var.set(f"✅ Found {len(self.engine.cameras)} working camera(s)")
+            self.create_individual_controls()
+            self.setup_camera_grid()
+        elif self.review_session is None:
             self.status_var.set("❌ No working cameras detected")
             messagebox.showwarning("No Cameras", 
                                  "No working cameras were detected.\n\n" +
@@ -242,14 +5032,17 @@ class DarkCameraGUI:
                                  "• Have proper permissions (/dev/video* readable)")
     
     def create_individual_controls(self):
-        """Create individual start/stop buttons for each camera"""
-        # Clear existing controls
-        for widget in self.individual_frame.winfo_children():
-            widget.destroy()
+        """Create start/stop buttons for new cameras and drop those of cameras that went away"""
+        camera_indices = [cam['index'] for cam in self.engine.cameras]
+        for camera_index in list(self.control_rows):
+            if camera_index not in camera_indices:
+                self.control_rows.pop(camera_index).destroy()
         
-        for cam in self.cameras:
+        for cam in self.engine.cameras:
+            if cam['index'] in self.control_rows:
+                continue
             cam_frame = tk.Frame(self.individual_frame, bg='#1e1e1e')
-            cam_frame.pack(fill=tk.X, pady=2)
+            self.control_rows[cam['index']] = cam_frame
             
             # Camera label
             cam_label = tk.Label(cam_frame, text=f"Camera {cam['index']}:", 
@@ -267,83 +5060,88 @@ class DarkCameraGUI:
                                 command=lambda idx=cam['index']: self.stop_camera(idx),
                                 style='Stop.TButton')
             stop_btn.pack(side=tk.LEFT, padx=2)
+            
+            # Load shedding priority
+            priority_var = tk.StringVar(value=self.engine.camera_priorities.get(cam['index'], 'normal'))
+            priority_box = ttk.Combobox(cam_frame, textvariable=priority_var, width=7,
+                                        values=('high', 'normal', 'low'), state='readonly')
+            priority_box.bind('<<ComboboxSelected>>',
+                              lambda event, idx=cam['index'], var=priority_var:
+                              self.set_camera_priority(idx, var.get()))
+            priority_box.pack(side=tk.LEFT, padx=(5, 2))
+        
+        # Repack in camera order; existing rows are moved, not rebuilt
+        for camera_index in camera_indices:
+            self.control_rows[camera_index].pack_forget()
+            self.control_rows[camera_index].pack(fill=tk.X, pady=2)
     
-    def setup_camera_grid(self):
-        """Setup the camera display grid"""
-        # Clear existing camera displays
-        for widget in self.camera_grid.winfo_children():
-            widget.destroy()
-        self.camera_labels = {}
+    def setup_camera_grid(self, cameras=None):
+        """Add tiles for new cameras, remove those of cameras that went away, and lay them out
         
-        num_cameras = len(self.cameras)
-        if num_cameras == 0:
-            return
+        Tiles of cameras that stay are only moved, so their previews keep running.
+        cameras defaults to the engine's; review mode passes one entry per recording.
+        """
+        cameras = self.engine.cameras if cameras is None else cameras
+        camera_indices = [cam['index'] for cam in cameras]
+        for camera_index in list(self.camera_tiles):
+            if camera_index not in camera_indices:
+                self.camera_tiles.pop(camera_index).destroy()
+                self.preview_renderer.remove_tile(camera_index)
+                self.camera_labels.pop(camera_index, None)
+                self.preview_images.pop(camera_index, None)
+                self.metrics_labels.pop(camera_index, None)
         
-        # Always arrange cameras horizontally in a single row
-        rows = 1
-        cols = num_cameras
+        for cam in cameras:
+            if cam['index'] not in self.camera_tiles:
+                self.camera_tiles[cam['index']] = self.create_camera_tile(cam)
         
-        # Configure grid weights for horizontal layout
+        # Always arrange cameras horizontally in a single row, each column getting equal width
         self.camera_grid.rowconfigure(0, weight=1)  # Single row takes full height
-        for j in range(cols):
-            self.camera_grid.columnconfigure(j, weight=1)  # Each column gets equal width
+        for col, camera_index in enumerate(camera_indices):
+            self.camera_grid.columnconfigure(col, weight=1)
+            self.camera_tiles[camera_index].grid(row=0, column=col, padx=5, pady=5, sticky='nsew')
+        for col in range(len(camera_indices), self.grid_columns):
+            self.camera_grid.columnconfigure(col, weight=0)  # Columns left by removed cameras
+        self.grid_columns = len(camera_indices)
+    
+    def create_camera_tile(self, cam):
+        """Build one camera's tile: title, video area and metrics line"""
+        cam_frame = tk.Frame(self.camera_grid, bg='#2d2d2d', relief=tk.RAISED, bd=2)
+        # Camera title
+        title_label = tk.Label(cam_frame, text=cam.get('title', f"📷 Camera {cam['index']}"), 
+                             bg='#2d2d2d', fg='#00ff88', 
+                             font=('Arial', 12, 'bold'))
+        title_label.pack(pady=5)
         
-        # Create camera display slots horizontally
-        for idx, cam in enumerate(self.cameras):
-            row = 0  # Always first row
-            col = idx  # Column equals camera index
-            
-            # Camera frame
-            cam_frame = tk.Frame(self.camera_grid, bg='#2d2d2d', relief=tk.RAISED, bd=2)
-            cam_frame.grid(row=row, column=col, padx=5, pady=5, sticky='nsew')
-            
-            # Camera title
-            title_label = tk.Label(cam_frame, text=f"📷 Camera {cam['index']}", 
-                                 bg='#2d2d2d', fg='#00ff88', 
-                                 font=('Arial', 12, 'bold'))
-            title_label.pack(pady=5)
-            
-            # Video display area - make it fill the available space
-            video_label = tk.Label(cam_frame, text="Camera Offline", 
-                                 bg='#1a1a1a', fg='#666666',
-                                 font=('Arial', 14))
-            video_label.pack(expand=True, fill=tk.BOTH, padx=5, pady=(0, 5))
-            
-            self.camera_labels[cam['index']] = video_label
+        # Live metrics, packed first so the video never squeezes them out
+        metrics_label = tk.Label(cam_frame, text="", justify=tk.LEFT,
+                                 bg='#2d2d2d', fg='#aaaaaa', font=('Consolas', 9))
+        metrics_label.pack(side=tk.BOTTOM, anchor=tk.W, padx=5, pady=(0, 5))
+        self.metrics_labels[cam['index']] = metrics_label
+        
+        # Video display area - make it fill the available space
+        video_label = tk.Label(cam_frame, text=cam.get('placeholder', "Camera Offline"), 
+                             bg='#1a1a1a', fg='#666666',
+                             font=('Arial', 14))
+        video_label.pack(expand=True, fill=tk.BOTH, padx=5, pady=(0, 5))
+        
+        # Cache geometry; the renderer never asks Tk for sizes
+        video_label.bind('<Configure>',
+                         lambda event, idx=cam['index']: self.preview_renderer.set_widget_size(
+                             idx, event.width, event.height))
+        
+        self.camera_labels[cam['index']] = video_label
+        return cam_frame
     
     def start_camera(self, camera_index):
         """Start a specific camera"""
-        if camera_index in self.active_cameras and self.active_cameras[camera_index]['active']:
+        if self.engine.is_camera_active(camera_index):
             return  # Already running
+        if self.review is not None:
+            self.close_review()  # The grid goes back to live tiles
         
         try:
-            # Use V4L2 backend explicitly on Linux for better compatibility
-            if os.name == 'posix':
-                cap = cv2.VideoCapture(camera_index, cv2.CAP_V4L2)
-            else:
-                cap = cv2.VideoCapture(camera_index)
-                
-            if not cap.isOpened():
-                raise Exception(f"Failed to open camera {camera_index}")
-            
-            # Test that we can actually read frames
-            ret, frame = cap.read()
-            if not ret or frame is None:
-                cap.release()
-                raise Exception(f"Camera {camera_index} opened but cannot read frames")
-            
-            self.active_cameras[camera_index] = {
-                'cap': cap,
-                'active': True,
-                'thread': None
-            }
-            
-            # Start video thread
-            thread = threading.Thread(target=self.update_camera_feed, 
-                                    args=(camera_index,), daemon=True)
-            thread.start()
-            self.active_cameras[camera_index]['thread'] = thread
-            
+            self.engine.start_camera(camera_index)
             self.status_var.set(f"▶️ Camera {camera_index} started")
             
         except Exception as e:
@@ -352,31 +5150,38 @@ class DarkCameraGUI:
     
     def stop_camera(self, camera_index):
         """Stop a specific camera"""
-        if camera_index not in self.active_cameras:
+        if camera_index not in self.engine.active_cameras:
             return
         
-        self.active_cameras[camera_index]['active'] = False
-        
-        if self.active_cameras[camera_index]['cap']:
-            self.active_cameras[camera_index]['cap'].release()
-        
-        # Clear display
+        # The capture thread is joined in the background so a slow camera cannot freeze the window
+        self.engine.stop_camera_async(
+            camera_index, lambda idx: self.root.after(0, self.on_camera_stopped, idx))
+    
+    def on_camera_stopped(self, camera_index):
+        """A stopped camera's capture thread has let go of its source"""
+        if self.engine.is_camera_active(camera_index) or self.review is not None:
+            return  # Restarted meanwhile, or the tile now shows a recording under review
+        self.clear_camera_display(camera_index)
+        self.status_var.set(f"⏹️ Camera {camera_index} stopped")
+    
+    def clear_camera_display(self, camera_index):
         if camera_index in self.camera_labels:
             self.camera_labels[camera_index].configure(image="", text="Camera Offline")
-        
-        del self.active_cameras[camera_index]
-        self.status_var.set(f"⏹️ Camera {camera_index} stopped")
+        self.preview_images.pop(camera_index, None)
     
     def start_recording_all(self):
         """Start recording with all available cameras"""
-        if self.recording:
+        if self.engine.recording:
             messagebox.showwarning("Already Recording", "Recording is already in progress!")
             return
             
-        if not self.cameras:
+        if not self.engine.cameras:
             messagebox.showerror("No Cameras", "No cameras detected. Please refresh cameras first.")
             return
         
+        if self.review is not None:
+            self.close_review()
+        
         # Ask user where to save recordings
         save_directory = filedialog.askdirectory(
             title="Select Directory to Save Recordings",
@@ -386,90 +5191,39 @@ class DarkCameraGUI:
         if not save_directory:
             return  # User cancelled
         
-        self.recording = True
-        self.recording_start_time = datetime.now()
-        self.video_writers = {}
+        try:
+            camera_count = self.engine.start_recording(save_directory)
+        except Exception as e:
+            messagebox.showerror("Recording Error", str(e))
+            return
         
-        # Start all cameras and set up recording
-        for cam in self.cameras:
-            camera_index = cam['index']
-            
-            try:
-                # Start camera if not already active
-                if camera_index not in self.active_cameras or not self.active_cameras[camera_index]['active']:
-                    self.start_camera(camera_index)
-                
-                # Wait a moment for camera to initialize
-                self.root.after(500)
-                
-                # Set up video writer
-                timestamp = self.recording_start_time.strftime("%Y%m%d_%H%M%S")
-                filename = f"camera_{camera_index}_{timestamp}.avi"
-                filepath = os.path.join(save_directory, filename)
-                
-                # Get camera properties
-                cap = self.active_cameras[camera_index]['cap']
-                width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                fps = int(cap.get(cv2.CAP_PROP_FPS)) if cap.get(cv2.CAP_PROP_FPS) > 0 else 20
-                
-                # Create video writer
-                fourcc = cv2.VideoWriter_fourcc(*'XVID')
-                writer = cv2.VideoWriter(filepath, fourcc, fps, (width, height))
-                
-                if writer.isOpened():
-                    self.video_writers[camera_index] = {
-                        'writer': writer,
-                        'filepath': filepath,
-                        'frames_written': 0,
-                        'last_write_time': 0,
-                        'frame_interval': 1.0 / fps  # Time between frames
-                    }
-                else:
-                    raise Exception(f"Failed to create video writer for camera {camera_index}")
-                    
-            except Exception as e:
-                messagebox.showerror("Recording Error", f"Failed to start recording for camera {camera_index}: {str(e)}")
-                self.stop_recording_all()
-                return
+        if self.engine.motion_trigger:
+            self.status_var.set(f"👁️ Watching {camera_count} cameras for motion, saving to: "
+                                f"{os.path.basename(save_directory)}")
+            messagebox.showinfo("Motion Recording Armed",
+                               f"{camera_count} cameras will record whenever motion is detected.\n"
+                               f"Saving to: {save_directory}")
+            return
         
-        self.status_var.set(f"🔴 Recording {len(self.video_writers)} cameras to: {os.path.basename(save_directory)}")
+        self.status_var.set(f"🔴 Recording {camera_count} cameras to: {os.path.basename(save_directory)}")
         messagebox.showinfo("Recording Started", 
-                           f"Recording started for {len(self.video_writers)} cameras.\n"
+                           f"Recording started for {camera_count} cameras.\n"
                            f"Saving to: {save_directory}")
     
     def stop_recording_all(self):
         """Stop recording all cameras and save files"""
-        if not self.recording:
+        if not self.engine.recording:
             messagebox.showwarning("Not Recording", "No recording in progress!")
             return
         
-        self.recording = False
-        recording_duration = datetime.now() - self.recording_start_time if self.recording_start_time else None
-        
-        # Close all video writers and collect info
-        saved_files = []
-        for camera_index, writer_info in self.video_writers.items():
-            try:
-                writer_info['writer'].release()
-                
-                # Check if file was actually created and has content
-                if os.path.exists(writer_info['filepath']) and os.path.getsize(writer_info['filepath']) > 1024:
-                    saved_files.append({
-                        'camera': camera_index,
-                        'filepath': writer_info['filepath'],
-                        'frames': writer_info['frames_written']
-                    })
-                else:
-                    # Remove empty or invalid files
-                    if os.path.exists(writer_info['filepath']):
-                        os.remove(writer_info['filepath'])
-                    
-            except Exception as e:
-                print(f"Error closing video writer for camera {camera_index}: {e}")
-        
-        self.video_writers = {}
-        
+        # Writers drain and close on a background thread so the window stays responsive
+        self.status_var.set("💾 Finalizing recordings...")
+        self.engine.stop_recording_async(
+            lambda saved_files, recording_duration: self.root.after(
+                0, self.show_recording_summary, saved_files, recording_duration))
+    
+    def show_recording_summary(self, saved_files, recording_duration):
+        """Report the finalized files of a stopped recording"""
         # Show summary dialog
         if saved_files:
             duration_str = ""
@@ -478,7 +5232,10 @@ class DarkCameraGUI:
                 minutes, seconds = divmod(total_seconds, 60)
                 duration_str = f"Duration: {minutes}m {seconds}s\n"
             
-            file_list = "\n".join([f"• Camera {info['camera']}: {os.path.basename(info['filepath'])} ({info['frames']} frames)" 
+            file_list = "\n".join([f"• {recording_label(info)}: {os.path.basename(info['filepath'])} "
+                                   f"{self.segment_note(info)}"
+                                   f"({info['frames']} frames, {info['dropped']} dropped, "
+                                   f"{info['duplicated']} duplicated, {info['achieved_fps']:.1f} FPS captured)"
                                   for info in saved_files])
             
             message = f"Recording stopped successfully!\n\n{duration_str}Files saved:\n{file_list}\n\nLocation: {os.path.dirname(saved_files[0]['filepath'])}"
@@ -499,118 +5256,249 @@ class DarkCameraGUI:
                         subprocess.run(["xdg-open", folder_path])
                 except Exception as e:
                     print(f"Could not open folder: {e}")
+        elif self.engine.motion_trigger:
+            messagebox.showinfo("Recording Complete", "No motion was detected; nothing was recorded.")
         else:
             messagebox.showerror("Recording Failed", "No video files were successfully created.")
         
         self.status_var.set("⏹️ Recording stopped")
     
+    def segment_note(self, info):
+        """Summary suffix for a recording split into segments"""
+        extra = len(info.get('segments', ())) - 1
+        return f"+ {extra} more segment{'s' if extra > 1 else ''} " if extra > 0 else ""
+    
+    def toggle_sync_capture(self):
+        """Synchronized capture takes effect at the next recording start"""
+        self.engine.sync_capture = self.sync_var.get()
+    
+    def toggle_mjpeg_passthrough(self):
+        """Passthrough takes effect for cameras started after the change"""
+        self.engine.mjpeg_passthrough = self.passthrough_var.get()
+    
+    def toggle_low_latency(self):
+        """A one-frame driver queue takes effect for cameras started after the change"""
+        self.engine.low_latency = self.low_latency_var.get()
+    
+    def toggle_motion_trigger(self):
+        """Motion triggering takes effect at the next recording start"""
+        self.engine.motion_trigger = self.motion_var.get()
+    
+    def toggle_mosaic(self):
+        """Mosaic mode takes effect at the next recording start, and overrides motion triggering"""
+        self.engine.mosaic = self.mosaic_var.get()
+    
+    def toggle_raw_capture(self):
+        """Raw capture takes effect at the next recording start; spools transcode as they close"""
+        if self.raw_var.get():
+            self.engine.record_format = 'raw'
+            if self.engine.spool_transcoder is None:
+                self.engine.spool_transcoder = SpoolTranscoder()
+        else:
+            self.engine.record_format = 'video'
+    
+    def toggle_load_shedding(self):
+        """Start or stop the load shedder; stopping restores full quality"""
+        if self.shed_var.get():
+            self.load_shedder.start()
+        else:
+            self.load_shedder.stop()
+    
+    def set_camera_priority(self, camera_index, priority):
+        """Shedding priority; applies from the shedder's next step"""
+        self.engine.camera_priorities[camera_index] = priority
+    
+    def set_preroll_seconds(self):
+        """Pre-roll takes effect for cameras started after the change"""
+        try:
+            self.engine.preroll_seconds = max(0.0, float(self.preroll_var.get()))
+        except ValueError:
+            self.preroll_var.set(str(self.engine.preroll_seconds))
+    
     def start_all_cameras(self):
         """Start all available cameras (without recording)"""
-        for cam in self.cameras:
-            self.start_camera(cam['index'])
+        if self.review is not None:
+            self.close_review()
+        if self.engine.sync_capture:
+            try:
+                self.engine.start_synchronized([cam['index'] for cam in self.engine.cameras])
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to start synchronized capture: {str(e)}")
+                return
+        else:
+            for cam in self.engine.cameras:
+                self.start_camera(cam['index'])
         self.status_var.set("▶️ All cameras started")
     
     def stop_all_cameras(self):
         """Stop all active cameras"""
         # Stop recording if active
-        if self.recording:
+        if self.engine.recording:
             self.stop_recording_all()
             
-        camera_indices = list(self.active_cameras.keys())
+        camera_indices = list(self.engine.active_cameras.keys())
         for camera_index in camera_indices:
             self.stop_camera(camera_index)
         self.status_var.set("⏹️ All cameras stopped")
     
-    def update_camera_feed(self, camera_index):
-        """Update video feed for a specific camera"""
-        cap = self.active_cameras[camera_index]['cap']
+    def on_camera_error(self, camera_index):
+        """Engine callback from a capture thread"""
+        self.root.after(0, self.handle_camera_error, camera_index)
+    
+    def on_recording_error(self, camera_index, message):
+        """Engine callback from an encoder watchdog thread"""
+        self.root.after(0, messagebox.showerror, "Recording Error", message)
+    
+    def preview_tick(self):
+        """Swap each tile's newest pre-rendered frame into its PhotoImage, then reschedule"""
+        if self.review is not None:
+            self.review_tick()
+        for camera_index in list(self.camera_labels.keys()):
+            ppm_data = self.preview_renderer.take_ready(camera_index)
+            if ppm_data is not None:
+                self.update_display_frame(camera_index, ppm_data)
         
-        while (camera_index in self.active_cameras and 
-               self.active_cameras[camera_index]['active']):
-            
-            ret, frame = cap.read()
-            if ret:
-                current_time = threading.current_thread().ident
-                
-                # Write frame to video file if recording (with timing control)
-                if self.recording and camera_index in self.video_writers:
-                    try:
-                        writer_info = self.video_writers[camera_index]
-                        current_timestamp = cv2.getTickCount() / cv2.getTickFrequency()
-                        
-                        # Only write frame if enough time has passed (frame rate limiting)
-                        if (current_timestamp - writer_info['last_write_time']) >= writer_info['frame_interval']:
-                            writer_info['writer'].write(frame)
-                            writer_info['frames_written'] += 1
-                            writer_info['last_write_time'] = current_timestamp
-                            
-                            # Optional: Add slight delay to prevent overwhelming the writer
-                            if writer_info['frames_written'] % 30 == 0:  # Every 30 frames
-                                threading.Event().wait(0.01)  # 10ms pause
-                                
-                    except Exception as e:
-                        print(f"Error writing frame for camera {camera_index}: {e}")
-                
-                # Update display frame in main thread to get current widget size
-                self.root.after(0, self.update_display_frame, camera_index, frame.copy())
-                    
-                # Small delay to prevent overwhelming the system
-                threading.Event().wait(0.033)  # ~30 FPS limit for display
-                    
-            else:
-                # Handle camera error
-                self.root.after(0, self.handle_camera_error, camera_index)
-                break
+        self.root.after(int(1000 / self.preview_fps), self.preview_tick)
+    
+    def metrics_tick(self):
+        """Show the exporter's latest snapshot under each tile, then reschedule"""
+        snapshot = self.metrics.latest
+        if snapshot is not None and self.review is None:
+            for camera_index, label in self.metrics_labels.items():
+                camera = snapshot['cameras'].get(str(camera_index))
+                label.configure(text=self.format_camera_metrics(camera) if camera else "")
+        
+        self.root.after(int(self.metrics.interval * 1000), self.metrics_tick)
+    
+    def choose_review_session(self):
+        """Ask for a session file and open it for review"""
+        if self.engine.recording:
+            messagebox.showwarning("Recording", "Stop recording before reviewing a session.")
+            return
+        session_path = filedialog.askopenfilename(
+            title="Select Recorded Session",
+            initialdir=os.path.expanduser("~/Desktop"),
+            filetypes=[("Recorded sessions", "session_*.json"), ("All files", "*")])
+        if session_path:
+            self.open_review(session_path)
+    
+    def open_review(self, session_path):
+        """Replace the live tiles with one tile per recording of a session, played in lockstep"""
+        try:
+            player = ReviewPlayer(session_path)
+        except Exception as e:
+            messagebox.showerror("Review Error", f"Cannot open {session_path}: {e}")
+            return
+        if self.review is not None:
+            self.close_review(restore_grid=False)
+        if self.engine.active_cameras:
+            self.stop_all_cameras()
+        
+        self.setup_camera_grid([])  # Drop the live tiles
+        self.review = player
+        self.preview_renderer.take_frame = player.take_frame
+        self.setup_camera_grid([{'index': number, 'title': f"🎞 {track['label']}", 'placeholder': "Loading..."}
+                                for number, track in enumerate(player.tracks)])
+        player.start()
+        
+        self.review_scale.configure(to=max(player.end_time - player.start_time, 0.01))
+        self.review_scale.set(0)
+        self.review_bar.pack(fill=tk.X, padx=10, pady=(10, 0), before=self.camera_grid)
+        self.root.bind('<space>', lambda e: self.toggle_review_playback())
+        self.root.bind('<Left>', lambda e: self.step_review(-1))
+        self.root.bind('<Right>', lambda e: self.step_review(1))
+        self.status_var.set(f"🎞 Reviewing {os.path.basename(session_path)}: "
+                            f"{len(player.tracks)} recording(s), {player.end_time - player.start_time:.1f} s")
+    
+    def close_review(self, restore_grid=True):
+        """Stop the decoders and bring back the live camera tiles"""
+        if self.review is None:
+            return
+        self.review.stop()
+        self.review = None
+        self.preview_renderer.take_frame = self.engine.take_preview_frame
+        for sequence in ('<space>', '<Left>', '<Right>'):
+            self.root.unbind(sequence)
+        self.review_bar.pack_forget()
+        self.setup_camera_grid([])
+        if restore_grid:
+            self.setup_camera_grid()
+            self.status_var.set("⏹️ Review closed")
+    
+    def toggle_review_playback(self):
+        if self.review is None:
+            return
+        if self.review.playing:
+            self.review.pause()
+        else:
+            self.review.play()
+    
+    def step_review(self, direction):
+        if self.review is not None:
+            self.review.step(direction)
+    
+    def on_review_scrub(self, value):
+        """Slider callback; programmatic moves from review_tick are ignored"""
+        if self.review is not None and self.review_scrubbing:
+            self.review.seek(self.review.start_time + float(value))
+    
+    def review_tick(self):
+        """Advance the review position, ask the decoders for its frames and update the controls"""
+        player = self.review
+        now = player.update()
+        offset = now - player.start_time
+        if not self.review_scrubbing:
+            self.review_scale.set(offset)
+        self.review_play_btn.configure(text="⏸" if player.playing else "▶")
+        self.review_time_var.set(f"{datetime.fromtimestamp(now).strftime('%H:%M:%S.%f')[:-3]}  +{offset:.2f} s")
+        for number, track in enumerate(player.tracks):
+            label = self.metrics_labels.get(number)
+            if label is None:
+                continue
+            frame_number = track['frame']
+            label.configure(text="🎞 before start" if frame_number is None
+                            else f"🎞 frame {frame_number + 1}/{len(track['times'])}")
+    
+    def format_camera_metrics(self, camera):
+        """Two-line tile summary of one camera's metrics"""
+        def ms(value):
+            return "-" if value is None else f"{value:g} ms"
+        
+        def fps(value):
+            return "-" if value is None else f"{value:.1f}"
+        
+        if not camera['active']:
+            return ""
+        text = (f"📊 {fps(camera['capture_fps'])} fps · read p99 {ms(camera['read_latency']['p99_ms'])}"
+                f" · preview {fps(camera['preview_fps'])} fps")
+        if 'mode' in camera:
+            text += f" · 🎛 {format_mode(camera['mode'])}"
+        if camera['recording']:
+            text += (f"\n💾 {camera['frames_written']} written · {camera['frames_dropped']} dropped"
+                     f" · {camera['frames_duplicated']} dup · queue {camera['queue_depth']}/{camera['queue_capacity']}"
+                     f" · enc p99 {ms(camera['encode_latency']['p99_ms'])}"
+                     f" · {camera['bytes_written'] / 1e6:.1f} MB")
+        return text
     
-    def update_display_frame(self, camera_index, frame):
-        """Update display frame with current widget dimensions"""
+    def update_display_frame(self, camera_index, ppm_data):
+        """Show PPM data prepared by the preview renderer"""
         if camera_index not in self.camera_labels:
             return
-            
-        label_widget = self.camera_labels[camera_index]
         
         try:
-            # Force update to get current dimensions
-            label_widget.update_idletasks()
-            widget_width = label_widget.winfo_width()
-            widget_height = label_widget.winfo_height()
-            
-            # Skip if widget is too small or not properly initialized
-            if widget_width <= 10 or widget_height <= 10:
-                return
-                
-            # Calculate aspect ratio to maintain proportions
-            original_height, original_width = frame.shape[:2]
-            aspect_ratio = original_width / original_height
-            
-            # Calculate new dimensions while maintaining aspect ratio
-            if widget_width / widget_height > aspect_ratio:
-                # Window is wider than video aspect ratio
-                new_height = widget_height
-                new_width = int(widget_height * aspect_ratio)
+            photo = self.preview_images.get(camera_index)
+            if photo is not None and (photo.width(), photo.height()) == ppm_size(ppm_data):
+                # Same geometry: load the new pixels into the existing image
+                photo.configure(data=ppm_data, format='PPM')
             else:
-                # Window is taller than video aspect ratio
-                new_width = widget_width
-                new_height = int(widget_width / aspect_ratio)
-            
-            # Ensure minimum size
-            new_width = max(new_width, 100)
-            new_height = max(new_height, 75)
-            
-            # Resize frame to calculated dimensions
-            display_frame = cv2.resize(frame, (new_width, new_height))
-            
-            # Convert BGR to RGB
-            frame_rgb = cv2.cvtColor(display_frame, cv2.COLOR_BGR2RGB)
-            
-            # Convert to tkinter PhotoImage
-            height, width, channels = frame_rgb.shape
-            ppm_header = f'P6\n{width} {height}\n255\n'.encode()
-            ppm_data = ppm_header + frame_rgb.tobytes()
-            photo = tk.PhotoImage(data=ppm_data, format='PPM')
+                photo = tk.PhotoImage(data=ppm_data, format='PPM')
+                self.preview_images[camera_index] = photo
+                
+                # Update label
+                self.update_camera_label(camera_index, photo)
             
-            # Update label
-            self.update_camera_label(camera_index, photo)
+            if self.first_frame_time is None:
+                self.first_frame_time = time.monotonic()
             
         except Exception as e:
             print(f"Error updating display for camera {camera_index}: {e}")
@@ -619,7 +5507,7 @@ class DarkCameraGUI:
         """Update camera label with new frame"""
         if camera_index in self.camera_labels:
             # Add recording indicator if recording
-            if self.recording and camera_index in self.video_writers:
+            if self.engine.recording and camera_index in self.engine.video_writers:
                 # You could add a red dot or text overlay here if desired
                 pass
             
@@ -629,20 +5517,922 @@ class DarkCameraGUI:
     def handle_camera_error(self, camera_index):
         """Handle camera errors"""
         self.stop_camera(camera_index)
+        self.clear_camera_display(camera_index)  # Its thread may have exited before stop_camera ran
+        camera_info = self.engine.get_camera_info(camera_index)
+        if (camera_info['source'] == 'v4l2' and os.path.isdir('/sys/class/video4linux')
+                and camera_index not in list_video_nodes()):
+            # Unplugged; the device watcher removes its tile
+            self.status_var.set(f"🔌 Camera {camera_index} disconnected")
+            return
         messagebox.showerror("Camera Error", f"Lost connection to camera {camera_index}")
     
     def on_closing(self):
         """Handle window closing"""
-        if self.recording:
-            self.stop_recording_all()
-        self.stop_all_cameras()
+        if self.engine.recording:
+            # Finish the files before the process exits
+            self.show_recording_summary(*self.engine.stop_recording())
+        self.load_shedder.stop()
+        self.device_watcher.stop()
+        if self.review is not None:
+            self.review.stop()
+        self.engine.stop_all_cameras()  # Joined here: capture threads must not outlive the window
+        self.preview_renderer.stop()
+        self.metrics.stop()
+        if self.live_view is not None:
+            self.live_view.stop()
         self.root.destroy()
 
+def camera_infos(args):
+    """camera_info dicts for the cameras named on the command line"""
+    width, height = (int(v) for v in args.size.lower().split('x'))
+    files = args.files.split(',') if args.files else []
+    if args.cameras:
+        camera_indices = [int(v) for v in args.cameras.split(',')]
+    else:
+        camera_indices = list(range(len(files))) if files else [0]
+    
+    cameras = []
+    for position, camera_index in enumerate(camera_indices):
+        camera_info = {'index': camera_index, 'source': args.source,
+                       'width': width, 'height': height, 'fps': args.fps}
+        if args.source == 'file':
+            camera_info['path'] = files[position]
+        cameras.append(camera_info)
+    return cameras
+
+def list_modes(args):
+    """Print what each camera advertises and the mode that would be chosen"""
+    if args.cameras:
+        device_indices = [int(v) for v in args.cameras.split(',')]
+    else:
+        device_indices = RecorderEngine().list_video_devices()
+    request = parse_mode(args.mode) if args.mode else None
+    for device_index in device_indices:
+        modes = list_v4l2_modes(device_index)
+        if not modes:
+            continue
+        print(f"Camera {device_index}:")
+        for mode in modes:
+            rates = ", ".join(f"{rate:g}" for rate in mode['fps'])
+            print(f"  {mode['fourcc']} {mode['width']}x{mode['height']} @ {rates}")
+        print(f"  chosen: {format_mode(choose_mode(modes, request, args.passthrough))}")
+
+def run_headless(args):
+    """Record from the command line without Tk"""
+    engine = RecorderEngine(on_camera_error=lambda idx: print(f"Lost connection to camera {idx}"),
+                            on_recording_error=lambda idx, message: print(message))
+    engine.record_overflow = args.overflow
+    engine.record_timing = args.timing
+    engine.sync_capture = args.sync
+    engine.mjpeg_passthrough = args.passthrough
+    engine.capture_mode = parse_mode(args.mode) if args.mode else None
+    engine.low_latency = args.low_latency
+    engine.encoder_backend = args.encoder
+    engine.record_fourcc = args.codec
+    engine.codec_cpu_budget = args.codec_cpu
+    engine.codec_disk_budget = args.codec_disk_mb
+    engine.segment_seconds = args.segment_seconds
+    engine.segment_bytes = int(args.segment_mb * (1 << 20))
+    engine.preroll_seconds = args.preroll
+    engine.motion_trigger = args.motion
+    engine.motion_threshold = args.motion_threshold
+    engine.motion_min_area = args.motion_area
+    engine.motion_pre_seconds = args.motion_pre
+    engine.motion_post_seconds = args.motion_post
+    engine.mosaic = args.mosaic
+    engine.mosaic_tile_height = args.mosaic_height
+    engine.mosaic_fps = args.mosaic_fps
+    transcoder = apply_spool_args(engine, args)
+    
+    camera_indices = []
+    for camera_info in camera_infos(args):
+        engine.add_camera(camera_info)
+        camera_indices.append(camera_info['index'])
+    
+    if args.motion_mask:
+        mask = cv2.imread(args.motion_mask, cv2.IMREAD_GRAYSCALE)
+        if mask is None:
+            print(f"Could not read motion mask {args.motion_mask}")
+            return 1
+        engine.motion_masks = {camera_index: mask for camera_index in camera_indices}
+    
+    os.makedirs(args.out, exist_ok=True)
+    metrics = None
+    if metrics_outputs(args):
+        metrics = MetricsExporter(engine, args.metrics_interval)
+        metrics.start(**metrics_outputs(args))
+    for item in filter(None, args.priority.split(',')):
+        camera_index, priority = item.split('=')
+        engine.camera_priorities[int(camera_index)] = priority
+    live_view = None
+    if live_view_options(args):
+        live_view = LiveViewServer(engine, **live_view_options(args))
+        live_view.start()
+    
+    if args.live_only:
+        # Watch only: run the cameras for the live view and record nothing
+        for camera_index in camera_indices:
+            engine.start_camera(camera_index)
+        print(f"Streaming {len(camera_indices)} cameras"
+              + (f" for {args.duration}s" if args.duration else " (Ctrl+C to stop)"))
+        try:
+            threading.Event().wait(args.duration if args.duration else None)
+        except KeyboardInterrupt:
+            pass
+        engine.stop_all_cameras()
+        if live_view is not None:
+            live_view.stop()
+        if metrics is not None:
+            metrics.stop()
+        return 0
+    
+    if args.preroll:
+        # Run the cameras first so the recording opens with a full pre-roll
+        if args.sync:
+            engine.start_synchronized(camera_indices)
+        else:
+            for camera_index in camera_indices:
+                engine.start_camera(camera_index)
+        print(f"Buffering {args.preroll}s of pre-roll")
+        time.sleep(args.preroll)
+    
+    try:
+        camera_count = engine.start_recording(args.out)
+    except Exception as e:
+        print(f"Recording error: {e}")
+        engine.stop_all_cameras()
+        if live_view is not None:
+            live_view.stop()
+        if metrics is not None:
+            metrics.stop()
+        return 1
+    
+    print(f"Recording {camera_count} cameras to {args.out}"
+          + (f" for {args.duration}s" if args.duration else " (Ctrl+C to stop)"))
+    shedder = None
+    if args.shed:
+        shedder = LoadShedder(engine, log_path=args.shed_log or None)
+        shedder.start()
+    watcher = None
+    if args.hotplug:
+        watcher = DeviceWatcher(engine)
+        watcher.start()
+    try:
+        threading.Event().wait(args.duration if args.duration else None)
+    except KeyboardInterrupt:
+        pass
+    
+    if watcher is not None:
+        watcher.stop()
+    if shedder is not None:
+        shedder.stop(restore=False)  # Reduced-rate files simply end with the recording
+    if metrics is not None:
+        metrics.stop()  # Last snapshot still sees the open writers
+    saved_files, recording_duration = engine.stop_recording()
+    engine.stop_all_cameras()
+    if live_view is not None:
+        live_view.stop()
+    
+    for info in saved_files:
+        print(f"{recording_label(info)}: {info['filepath']} ({info['frames']} frames, {info['dropped']} dropped, "
+              f"{info['duplicated']} duplicated, {info['achieved_fps']:.1f} FPS captured, {info['duration']:.1f}s)")
+        if 'segments' in info:
+            print(f"  {len(info['segments'])} segments, manifest {info['manifest']}")
+    if recording_duration:
+        print(f"Duration: {recording_duration.total_seconds():.1f}s")
+    if transcoder is not None:
+        print("Waiting for spools to be transcoded")
+        transcoder.wait()
+        transcoder.shutdown()
+    return 0 if saved_files else 1
+
+def apply_spool_args(engine, args):
+    """Raw spool settings from the command line; returns the transcoder, if any"""
+    if not args.raw:
+        return None
+    engine.record_format = 'raw'
+    if args.spool_seconds:
+        engine.spool_seconds = args.spool_seconds
+    elif args.duration:
+        # Sized for the session, with room for pre-roll and a slow stop
+        engine.spool_seconds = args.duration + args.preroll + 10
+    if args.transcode:
+        engine.spool_transcoder = SpoolTranscoder(args.transcode_workers or None, args.codec,
+                                                  remove_spools=args.remove_spools)
+    return engine.spool_transcoder
+
+def run_locate(args):
+    """Print the frame each recording of a session shows at a wall-clock time"""
+    session_path, when = args.locate
+    try:
+        wall_time = float(when)
+    except ValueError:
+        wall_time = datetime.fromisoformat(when)
+    hits = SessionIndex(session_path).locate(wall_time)
+    for hit in hits:
+        offset = f", keyframe at byte {hit['offset']}" if hit['offset'] >= 0 else ""
+        print(f"{recording_label(hit)}: {hit['filepath']} frame {hit['frame']} "
+              f"(file {hit['file']}{offset}, captured {hit['capture_time']})")
+    return 0 if hits else 1
+
+def run_review_check(args, seeks=20, seek_timeout=1.0):
+    """Play a session headless, then scrub to random times; exit non-zero if a seek is slow
+    
+    Prints how fast every recording decoded in lockstep and how long each seek took until
+    all recordings had their frame for the new position.
+    """
+    import random
+    player = ReviewPlayer(args.review_check)
+    player.start()
+    try:
+        player.play()
+        shown = [0] * len(player.tracks)
+        started = time.monotonic()
+        while player.playing and time.monotonic() - started < min(args.duration or 10, 10):
+            player.update()
+            for number in range(len(player.tracks)):
+                if player.take_frame(number) is not None:
+                    shown[number] += 1
+            time.sleep(0.01)
+        elapsed = time.monotonic() - started
+        player.pause()
+        for track, count in zip(player.tracks, shown):
+            print(f"{track['label']}: {count / elapsed:.1f} fps shown during {elapsed:.1f} s of playback")
+        
+        latencies = []
+        for _ in range(seeks):
+            player.seek(random.uniform(player.start_time, player.end_time))
+            seek_started = time.monotonic()
+            for track in player.tracks:
+                if track['frame'] is not None:
+                    track['decoder'].wait_for(track['frame'], seek_timeout * 2)
+            latencies.append(time.monotonic() - seek_started)
+        latencies.sort()
+        print(f"Seek until every recording shows the new position: "
+              f"p50 {latencies[len(latencies) // 2] * 1000:.0f} ms, max {latencies[-1] * 1000:.0f} ms "
+              f"({sum(track['decoder'].seeks for track in player.tracks)} container seeks, "
+              f"{sum(track['decoder'].frames_decoded for track in player.tracks)} frames decoded)")
+        return 0 if latencies[-1] <= seek_timeout else 1
+    finally:
+        player.stop()
+
+def run_transcode(args):
+    """Transcode existing spools on a worker pool; returns the exit status"""
+    transcoder = SpoolTranscoder(args.transcode_workers or None, args.codec, remove_spools=args.remove_spools)
+    for spool_path in args.transcode_spools:
+        transcoder.submit(spool_path)
+    results = transcoder.wait()
+    transcoder.shutdown()
+    return 0 if len(results) == len(args.transcode_spools) else 1
+
+def run_startup_check(args):
+    """Open the GUI and check time to first paint and time to first preview frame
+    
+    Both are measured from when this module started loading, so the frozen build's
+    unpacking is not included. Cameras are started as soon as discovery puts the first
+    ones in the grid. Returns 0 when both targets are met.
+    """
+    import json
+    
+    root = tk.Tk()
+    app = DarkCameraGUI(root, cameras=camera_infos(args) if args.source != 'v4l2' else None)
+    root.protocol("WM_DELETE_WINDOW", app.on_closing)
+    deadline = time.monotonic() + args.startup_timeout
+    started = False
+    
+    def poll():
+        nonlocal started
+        if not started and app.camera_labels:
+            started = True
+            app.start_all_cameras()
+        if app.first_frame_time is None and time.monotonic() < deadline:
+            root.after(5, poll)
+        else:
+            app.on_closing()
+    
+    root.after(0, poll)
+    root.mainloop()
+    
+    def elapsed_ms(t):
+        return None if t is None else round((t - STARTED) * 1000, 1)
+    
+    first_paint = elapsed_ms(app.first_paint_time)
+    first_frame = elapsed_ms(app.first_frame_time)
+    passed = (first_paint is not None and first_paint <= args.ttfp_target
+              and first_frame is not None and first_frame <= args.ttff_target)
+    print(json.dumps({
+        'time_to_first_paint_ms': first_paint,
+        'time_to_first_frame_ms': first_frame,
+        'target_first_paint_ms': args.ttfp_target,
+        'target_first_frame_ms': args.ttff_target,
+        'cameras': len(app.engine.cameras),
+        'passed': passed
+    }, indent=2))
+    return 0 if passed else 1
+
+def benchmark_preview(cameras=4, width=1920, height=1080, frames=60):
+    """Measure Tk main-thread milliseconds per preview frame, old per-frame PPM path vs renderer"""
+    root = tk.Tk()
+    root.geometry("1920x400")
+    labels = []
+    for column in range(cameras):
+        label = tk.Label(root, bg='#1a1a1a')
+        label.grid(row=0, column=column, sticky='nsew')
+        root.columnconfigure(column, weight=1)
+        labels.append(label)
+    root.rowconfigure(0, weight=1)
+    root.update()
+    
+    engine = RecorderEngine()
+    sources = []
+    for camera_index in range(cameras):
+        source = SyntheticSource({'index': camera_index, 'width': width, 'height': height, 'fps': 0})
+        source.open()
+        sources.append(source)
+        engine.preview_mailboxes[camera_index] = FrameMailbox()
+    test_frames = [[source.read()[1] for _ in range(4)] for source in sources]
+    
+    # Before: per-frame geometry query, resize, colour conversion, PPM build and new PhotoImage on the Tk thread
+    main_thread = 0.0
+    for n in range(frames):
+        for camera_index, label in enumerate(labels):
+            frame = test_frames[camera_index][n % 4]
+            start = time.perf_counter()
+            label.update_idletasks()
+            size = fit_preview_size(width, height, label.winfo_width(), label.winfo_height())
+            frame_rgb = cv2.cvtColor(cv2.resize(frame, size), cv2.COLOR_BGR2RGB)
+            ppm_data = f'P6\n{size[0]} {size[1]}\n255\n'.encode() + frame_rgb.tobytes()
+            photo = tk.PhotoImage(data=ppm_data, format='PPM')
+            label.configure(image=photo)
+            label.image = photo
+            main_thread += time.perf_counter() - start
+        root.update()
+    before = main_thread * 1000 / (frames * cameras)
+    
+    # After: workers prepare PPM data, the Tk thread only loads it into a reused PhotoImage
+    renderer = PreviewRenderer(engine, fps=1000)
+    for camera_index, label in enumerate(labels):
+        renderer.set_widget_size(camera_index, label.winfo_width(), label.winfo_height())
+    renderer.start()
+    photos = {}
+    main_thread = 0.0
+    rendered = 0
+    for n in range(frames):
+        for camera_index in range(cameras):
+            engine.preview_mailboxes[camera_index].post(test_frames[camera_index][n % 4], time.monotonic())
+        deadline = time.monotonic() + 1.0
+        pending = set(range(cameras))
+        while pending and time.monotonic() < deadline:
+            for camera_index in list(pending):
+                ppm_data = renderer.take_ready(camera_index)
+                if ppm_data is None:
+                    continue
+                start = time.perf_counter()
+                photo = photos.get(camera_index)
+                if photo is not None and (photo.width(), photo.height()) == ppm_size(ppm_data):
+                    photo.configure(data=ppm_data, format='PPM')
+                else:
+                    photo = photos[camera_index] = tk.PhotoImage(data=ppm_data, format='PPM')
+                    labels[camera_index].configure(image=photo)
+                main_thread += time.perf_counter() - start
+                rendered += 1
+                pending.discard(camera_index)
+            time.sleep(0.001)
+        root.update()
+    renderer.stop()
+    after = main_thread * 1000 / max(rendered, 1)
+    root.destroy()
+    
+    print(f"Preview main-thread cost at {cameras}x{width}x{height}:")
+    print(f"  per-frame PPM path: {before:.2f} ms/frame")
+    print(f"  preview renderer:   {after:.2f} ms/frame")
+    return before, after
+
+def cpu_seconds(native_id=None, pid=None):
+    """User plus system CPU seconds of one of our threads, or of a process; None without /proc"""
+    path = f"/proc/{pid}/stat" if pid else f"/proc/self/task/{native_id}/stat"
+    try:
+        with open(path) as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+    except (OSError, IndexError):
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+def peak_rss_mb():
+    """Peak resident set size of this process and of its largest finished child, in MiB"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None, None
+    import sys
+    
+    scale = 1 << 20 if sys.platform == 'darwin' else 1 << 10  # ru_maxrss is bytes on macOS, KiB elsewhere
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale)
+
+def current_rss_mb():
+    """Resident set size of this process right now, in MiB; None without /proc"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1 << 20)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def open_fd_count():
+    try:
+        return len(os.listdir('/proc/self/fd'))
+    except OSError:
+        return None
+
+def latency_summary(histogram):
+    return {key: histogram[key] for key in ('mean_ms', 'p50_ms', 'p99_ms')}
+
+def run_benchmark(args, default_seconds=10):
+    """Drive capture, recording and preview from synthetic cameras and report one JSON result
+    
+    Measures for --duration seconds; its 0 default ("until Ctrl+C") means default_seconds here.
+    """
+    import json
+    import platform
+    import shutil
+    import tempfile
+    
+    if args.duration < 0:
+        raise SystemExit("--duration must not be negative")
+    duration = args.duration or default_seconds
+    width, height = (int(v) for v in args.size.lower().split('x'))
+    camera_indices = [int(v) for v in args.cameras.split(',')] if args.cameras else [0, 1, 2, 3]
+    engine = RecorderEngine(on_camera_error=lambda idx: print(f"Lost connection to camera {idx}"),
+                            on_recording_error=lambda idx, message: print(message))
+    engine.record_fourcc = args.codec
+    engine.codec_cpu_budget = args.codec_cpu
+    engine.codec_disk_budget = args.codec_disk_mb
+    engine.record_overflow = args.overflow
+    engine.record_timing = args.timing
+    engine.encoder_backend = args.encoder
+    engine.mjpeg_passthrough = args.passthrough
+    apply_spool_args(engine, args)
+    for camera_index in camera_indices:
+        engine.add_camera({'index': camera_index, 'source': 'synthetic',
+                           'width': width, 'height': height, 'fps': args.fps})
+    
+    # Preview the way the GUI does: tiles in one row, a fixed-rate tick swapping in frames
+    preview_fps = 15
+    renderer = PreviewRenderer(engine, fps=preview_fps)
+    for camera_index in camera_indices:
+        renderer.set_widget_size(camera_index, 1200 // len(camera_indices), 600)
+    root = None
+    if tk is not None:
+        try:
+            root = tk.Tk()
+            root.withdraw()
+        except tk.TclError:
+            root = None  # No display; PPM preparation is still measured
+    photos = {}
+    
+    out_dir = tempfile.mkdtemp(prefix='recorder-bench-')
+    renderer.start()
+    try:
+        for camera_index in camera_indices:
+            engine.start_camera(camera_index)
+        time.sleep(1.0)  # Warm-up: sources open, first frames flow
+        engine.start_recording(out_dir)
+        
+        def sample_cpu():
+            cpu = {}
+            for camera_index in camera_indices:
+                capture = engine.active_cameras[camera_index].thread
+                encoder = engine.video_writers[camera_index]['thread']
+                if isinstance(encoder, ProcessEncoder):
+                    encode_cpu = cpu_seconds(pid=encoder.process.pid)
+                elif encoder is None:
+                    encode_cpu = 0.0  # Raw spool: copied on the capture thread
+                else:
+                    encode_cpu = cpu_seconds(encoder.native_id)
+                cpu[camera_index] = (cpu_seconds(capture.native_id), encode_cpu)
+            cpu['preview'] = [cpu_seconds(thread.native_id) for thread in renderer.threads]
+            return cpu
+        
+        captured_start = {camera_index: engine.capture_metrics[camera_index]['frames_captured']
+                          for camera_index in camera_indices}
+        cpu_start = sample_cpu()
+        rendered = dict.fromkeys(camera_indices, 0)
+        tick_seconds = 0.0
+        ticks = 0
+        start = time.monotonic()
+        next_tick = start
+        while time.monotonic() - start < duration:
+            tick_start = time.perf_counter()
+            for camera_index in camera_indices:
+                ppm_data = renderer.take_ready(camera_index)
+                if ppm_data is None:
+                    continue
+                rendered[camera_index] += 1
+                if root is not None:
+                    photo = photos.get(camera_index)
+                    if photo is not None and (photo.width(), photo.height()) == ppm_size(ppm_data):
+                        photo.configure(data=ppm_data, format='PPM')
+                    else:
+                        photos[camera_index] = tk.PhotoImage(data=ppm_data, format='PPM')
+            if root is not None:
+                root.update()
+            tick_seconds += time.perf_counter() - tick_start
+            ticks += 1
+            next_tick = pace_until(next_tick, 1.0 / preview_fps)
+        
+        elapsed = time.monotonic() - start
+        cpu_end = sample_cpu()
+        snapshot = MetricsCollector(engine).collect()
+        saved_files, recording_duration = engine.stop_recording()
+    finally:
+        renderer.stop()
+        engine.stop_all_cameras()
+        if root is not None:
+            root.destroy()
+        shutil.rmtree(out_dir, ignore_errors=True)
+    
+    def cpu_delta(before, after):
+        return None if before is None or after is None else after - before
+    
+    saved = {info['camera']: info for info in saved_files}
+    cameras = {}
+    for camera_index in camera_indices:
+        metrics = snapshot['cameras'][str(camera_index)]
+        capture_cpu = cpu_delta(cpu_start[camera_index][0], cpu_end[camera_index][0])
+        encode_cpu = cpu_delta(cpu_start[camera_index][1], cpu_end[camera_index][1])
+        cpu = None if capture_cpu is None or encode_cpu is None else capture_cpu + encode_cpu
+        info = saved.get(camera_index, {})
+        cameras[str(camera_index)] = {
+            'codec': info.get('codec'),
+            'capture_fps': (metrics['frames_captured'] - captured_start[camera_index]) / elapsed,
+            'write_fps': metrics['frames_written'] / elapsed,
+            'preview_fps': rendered[camera_index] / elapsed,
+            'frames_written': info.get('frames', metrics['frames_written']),
+            'frames_dropped': info.get('dropped', metrics['frames_dropped']),
+            'frames_duplicated': info.get('duplicated', metrics['frames_duplicated']),
+            'queue_high_water': metrics['queue_high_water'],
+            'read_latency': latency_summary(metrics['read_latency']),
+            'encode_latency': latency_summary(metrics['encode_latency']),
+            'end_to_end_latency': latency_summary(metrics['frame_latency']),
+            'capture_cpu_percent': None if capture_cpu is None else 100 * capture_cpu / elapsed,
+            'encode_cpu_percent': None if encode_cpu is None else 100 * encode_cpu / elapsed,
+            'cpu_percent': None if cpu is None else 100 * cpu / elapsed
+        }
+    
+    preview_cpu = [cpu_delta(before, after) for before, after in zip(cpu_start['preview'], cpu_end['preview'])]
+    rss, child_rss = peak_rss_mb()
+    result = {
+        'config': {'cameras': len(camera_indices), 'width': width, 'height': height, 'fps': args.fps,
+                   'codec': 'MJPG' if args.passthrough else args.codec, 'passthrough': args.passthrough,
+                   'timing': args.timing, 'overflow': args.overflow, 'encoder': args.encoder,
+                   'raw': args.raw, 'duration': duration},
+        'environment': {'python': platform.python_version(), 'opencv': cv2.__version__,
+                        'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'elapsed': elapsed,
+        'cameras': cameras,
+        'totals': {
+            'capture_fps': sum(camera['capture_fps'] for camera in cameras.values()),
+            'write_fps': sum(camera['write_fps'] for camera in cameras.values()),
+            'frames_dropped': sum(camera['frames_dropped'] for camera in cameras.values()),
+            'frames_duplicated': sum(camera['frames_duplicated'] for camera in cameras.values()),
+            'preview_tick_ms': tick_seconds * 1000 / ticks if ticks else None,
+            'preview_tk': root is not None,
+            'preview_cpu_percent': (None if None in preview_cpu
+                                    else 100 * sum(preview_cpu) / elapsed),
+            'peak_rss_mb': rss,
+            'peak_child_rss_mb': child_rss if args.encoder == 'process' else None
+        }
+    }
+    
+    output = json.dumps(result, indent=2)
+    print(output)
+    if args.bench_out:
+        with open(args.bench_out, 'w') as f:
+            f.write(output + "\n")
+    return result
+
+def benchmark_motion(width=1920, height=1080, frames=300):
+    """Measure motion detector milliseconds per frame, decoded and MJPEG payload input"""
+    source = SyntheticSource({'index': 0, 'width': width, 'height': height, 'fps': 0})
+    source.open()
+    test_frames = [source.read()[1] for _ in range(10)]
+    payloads = [cv2.imencode('.jpg', frame)[1].reshape(-1) for frame in test_frames]
+    source.release()
+    
+    results = {}
+    for name, inputs in (('decoded', test_frames), ('mjpeg', payloads)):
+        detector = MotionDetector()
+        detector.update(inputs[0], 0.0)
+        start = time.perf_counter()
+        for n in range(frames):
+            detector.update(inputs[n % len(inputs)], n / 30)
+        results[name] = (time.perf_counter() - start) * 1000 / frames
+    
+    print(f"Motion detector cost at {width}x{height}:")
+    print(f"  decoded frames: {results['decoded']:.3f} ms/frame")
+    print(f"  MJPEG payloads: {results['mjpeg']:.3f} ms/frame")
+    return results
+
+def run_lifecycle_stress(args, rss_slack_mb=32):
+    """Start and stop cameras --stress-cycles times under load; exit non-zero on a leak or error
+    
+    The cameras record with pre-roll while a metrics exporter runs and a reader keeps taking
+    preview frames. Each cycle stops a random subset and starts it again; every tenth cycle
+    restarts them all as a synchronized group. Threads, open files and memory after the
+    last cycle are compared with their values halfway through, once allocator pools and
+    recording buffers have settled; growth in the second half is a leak.
+    """
+    import random
+    import shutil
+    import tempfile
+    
+    errors = []
+    engine = RecorderEngine(on_camera_error=lambda idx: errors.append(f"camera {idx} lost"),
+                            on_recording_error=lambda idx, message: errors.append(message))
+    engine.preroll_seconds = args.preroll or 1
+    engine.record_fourcc = 'MJPG' if args.codec == 'auto' else args.codec  # No codec benchmark
+    camera_indices = []
+    for camera_info in camera_infos(args):
+        engine.add_camera(camera_info)
+        camera_indices.append(camera_info['index'])
+    
+    out_dir = tempfile.mkdtemp(prefix='recorder_stress_')
+    metrics = MetricsExporter(engine, interval=0.1)
+    metrics.start()
+    done = threading.Event()
+    
+    def read_previews():
+        while not done.wait(1 / 30):
+            for camera_index in camera_indices:
+                engine.take_preview_frame(camera_index)
+    
+    reader = threading.Thread(target=read_previews, daemon=True)
+    reader.start()
+    
+    def sample():
+        return {'threads': threading.active_count(), 'fds': open_fd_count(), 'rss_mb': current_rss_mb()}
+    
+    restart_times = []
+    prerolls = set()  # ids of every pre-roll buffer handed out
+    baseline = None
+    try:
+        engine.start_recording(out_dir)
+        for cycle in range(args.stress_cycles):
+            if cycle == args.stress_cycles // 2:
+                baseline = sample()
+            started = time.monotonic()
+            if cycle % 10 == 9:
+                engine.start_synchronized(camera_indices)
+            else:
+                victims = random.sample(camera_indices, random.randint(1, len(camera_indices)))
+                engine.stop_cameras(victims)
+                for camera_index in victims:
+                    engine.start_camera(camera_index)
+            restart_times.append(time.monotonic() - started)
+            prerolls.update(id(preroll) for preroll in engine.prerolls.values())
+            time.sleep(random.uniform(0, 0.05))  # Let frames flow between cycles
+        final = sample()
+    finally:
+        engine.stop_recording()
+        engine.stop_all_cameras()
+        done.set()
+        reader.join(timeout=2)
+        metrics.stop()
+        shutil.rmtree(out_dir, ignore_errors=True)
+    
+    leftover = [thread.name for thread in threading.enumerate() if thread.name.startswith('camera-')]
+    restarts = sum(worker.starts for worker in engine.idle_workers.values())
+    restart_times.sort()
+    print(f"{args.stress_cycles} cycles, {restarts} camera starts: "
+          f"restart p50 {restart_times[len(restart_times) // 2] * 1000:.0f} ms, "
+          f"max {restart_times[-1] * 1000:.0f} ms; "
+          f"{len(prerolls)} pre-roll buffers for {len(camera_indices)} cameras")
+    failures = list(errors)
+    if leftover:
+        failures.append(f"capture threads still running after shutdown: {leftover}")
+    if baseline is not None:
+        print(f"Halfway: {baseline}; after last cycle: {final}")
+        if final['threads'] > baseline['threads']:
+            failures.append(f"threads grew from {baseline['threads']} to {final['threads']}")
+        if final['fds'] is not None and final['fds'] > baseline['fds']:
+            failures.append(f"open files grew from {baseline['fds']} to {final['fds']}")
+        if final['rss_mb'] is not None and final['rss_mb'] > baseline['rss_mb'] + rss_slack_mb:
+            failures.append(f"memory grew from {baseline['rss_mb']:.0f} to {final['rss_mb']:.0f} MiB")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+def metrics_outputs(args):
+    """MetricsExporter.start() keyword arguments from the command line"""
+    outputs = {'jsonl_path': args.metrics_jsonl or None,
+               'prometheus_path': args.metrics_prom or None,
+               'http_port': args.metrics_port or None}
+    return {key: value for key, value in outputs.items() if value}
+
+def live_view_options(args):
+    """LiveViewServer keyword arguments from the command line, empty when it is off"""
+    if not args.live_port:
+        return {}
+    return {'port': args.live_port, 'fps': args.live_fps, 'quality': args.live_quality}
+
+def parse_args(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Multi-camera monitor and recorder")
+    parser.add_argument('--headless', action='store_true',
+                        help="record without the GUI")
+    parser.add_argument('--cameras', default='',
+                        help="comma separated camera indices, e.g. 0,2")
+    parser.add_argument('--out', default=os.path.expanduser("~/Desktop"),
+                        help="directory to save recordings to")
+    parser.add_argument('--duration', type=float, default=0,
+                        help="seconds to record, 0 records until Ctrl+C")
+    parser.add_argument('--source', choices=sorted(FRAME_SOURCES), default='v4l2',
+                        help="frame source for every camera")
+    parser.add_argument('--files', default='',
+                        help="comma separated video files for --source file")
+    parser.add_argument('--size', default='640x480',
+                        help="frame size for --source synthetic")
+    parser.add_argument('--fps', type=int, default=30,
+                        help="frame rate for --source synthetic, 0 for unthrottled")
+    parser.add_argument('--overflow', choices=FrameRing.OVERFLOW_POLICIES, default='drop_oldest',
+                        help="what to do when the encoder falls behind")
+    parser.add_argument('--timing', choices=('cfr', 'gated'), default='cfr',
+                        help="cfr places frames by capture time for exact durations; "
+                             "gated writes whenever a frame interval has passed")
+    parser.add_argument('--sync', action='store_true',
+                        help="grab all cameras in lock-step and report inter-camera skew")
+    parser.add_argument('--passthrough', action='store_true',
+                        help="record the cameras' MJPEG stream without decoding or re-encoding")
+    parser.add_argument('--mode', default='',
+                        help="capture mode to request, e.g. 1280x720@30:MJPG (any part may be left out); "
+                             "by default the best advertised mode up to 1080p30 is chosen")
+    parser.add_argument('--low-latency', action='store_true',
+                        help="keep the driver's buffer at one frame so previews show the newest frame")
+    parser.add_argument('--list-modes', action='store_true',
+                        help="print the capture modes each camera advertises and exit")
+    parser.add_argument('--encoder', choices=('thread', 'process'), default='thread',
+                        help="encode in threads, or in one process per camera over shared memory")
+    parser.add_argument('--segment-seconds', type=float, default=0,
+                        help="start a new file every N seconds of output, 0 for no limit")
+    parser.add_argument('--segment-mb', type=float, default=0,
+                        help="start a new file once a segment reaches N MiB, 0 for no limit")
+    parser.add_argument('--preroll', type=float, default=0,
+                        help="seconds of history kept per camera and written ahead of the recording")
+    parser.add_argument('--shed', action='store_true',
+                        help="lower recording rates of low-priority cameras while the host falls behind")
+    parser.add_argument('--priority', default='',
+                        help="load shedding priorities, e.g. 0=high,2=low (others are normal)")
+    parser.add_argument('--shed-log', default='',
+                        help="append load shedding events to this file as JSON lines")
+    parser.add_argument('--mosaic', action='store_true',
+                        help="record all cameras tiled side by side into one file")
+    parser.add_argument('--mosaic-height', type=int, default=360,
+                        help="tile height of the mosaic in pixels")
+    parser.add_argument('--mosaic-fps', type=int, default=15,
+                        help="frame rate of the mosaic recording")
+    parser.add_argument('--motion', action='store_true',
+                        help="only record while there is motion, padded by --motion-pre/--motion-post")
+    parser.add_argument('--motion-threshold', type=int, default=25,
+                        help="grey-level change that counts a pixel as moving")
+    parser.add_argument('--motion-area', type=float, default=0.005,
+                        help="fraction of watched pixels that must move to trigger")
+    parser.add_argument('--motion-mask', default='',
+                        help="grayscale image, white where motion is watched")
+    parser.add_argument('--motion-pre', type=float, default=2,
+                        help="seconds kept before motion starts")
+    parser.add_argument('--motion-post', type=float, default=5,
+                        help="seconds of stillness before a motion recording closes")
+    parser.add_argument('--metrics-interval', type=float, default=1.0,
+                        help="seconds between metrics snapshots")
+    parser.add_argument('--metrics-jsonl', default='',
+                        help="append a JSON metrics snapshot per interval to this file")
+    parser.add_argument('--metrics-prom', default='',
+                        help="keep this file updated with metrics in Prometheus text format")
+    parser.add_argument('--metrics-port', type=int, default=0,
+                        help="serve /metrics and /metrics.json on this localhost port")
+    parser.add_argument('--hotplug', action='store_true',
+                        help="with --headless, record cameras plugged in during the session and "
+                             "close the files of cameras that are unplugged")
+    parser.add_argument('--raw', action='store_true',
+                        help="record raw frames into memory-mapped spool files instead of encoding; "
+                             "see --transcode and --transcode-spools")
+    parser.add_argument('--spool-seconds', type=float, default=0,
+                        help="seconds of frames each spool is preallocated for "
+                             "(default: the --duration plus pre-roll, or 120)")
+    parser.add_argument('--transcode', action='store_true',
+                        help="with --raw, transcode each spool to AVI in the background once it is closed")
+    parser.add_argument('--transcode-spools', nargs='+', default=[], metavar='SPOOL',
+                        help="transcode existing spool files to AVI (using --codec) and exit")
+    parser.add_argument('--transcode-workers', type=int, default=0,
+                        help="transcoding threads, 0 for one per CPU")
+    parser.add_argument('--remove-spools', action='store_true',
+                        help="delete spools once transcoded")
+    parser.add_argument('--locate', nargs=2, metavar=('SESSION_JSON', 'TIME'),
+                        help="print each camera's frame at a wall-clock TIME (ISO or epoch seconds) "
+                             "in a recorded session and exit")
+    parser.add_argument('--review', default='', metavar='SESSION_JSON',
+                        help="open the GUI reviewing a recorded session, its cameras played in lockstep")
+    parser.add_argument('--review-check', default='', metavar='SESSION_JSON',
+                        help="play a recorded session headless for --duration seconds (10 by default and at "
+                             "most), time random seeks and exit non-zero if one takes over a second")
+    parser.add_argument('--live-port', type=int, default=0,
+                        help="serve MJPEG streams and snapshots of every camera on this localhost port")
+    parser.add_argument('--live-fps', type=float, default=15,
+                        help="frame rate of the live view streams")
+    parser.add_argument('--live-quality', type=int, default=80,
+                        help="JPEG quality of the live view")
+    parser.add_argument('--live-only', action='store_true',
+                        help="with --headless, run the cameras for the live view without recording")
+    parser.add_argument('--codec', default='auto',
+                        help="fourcc for recordings of decoded frames, e.g. XVID, MJPG, mp4v; "
+                             "'auto' picks one per resolution by a cached benchmark")
+    parser.add_argument('--codec-cpu', type=float, default=0.5,
+                        help="with --codec auto, fraction of one core each camera's encoder may use")
+    parser.add_argument('--codec-disk-mb', type=float, default=0,
+                        help="with --codec auto, MB/s each camera may write (0 = no limit)")
+    parser.add_argument('--plan-codecs', action='store_true',
+                        help="benchmark codecs at --size/--fps, print the table and choice, and exit")
+    parser.add_argument('--bench', action='store_true',
+                        help="benchmark capture, recording and preview on synthetic cameras "
+                             "(--cameras, --size, --fps, --codec, --duration, default 10s) and print JSON")
+    parser.add_argument('--bench-out', default='',
+                        help="also write the --bench result to this file")
+    parser.add_argument('--stress-cycles', type=int, default=0,
+                        help="start and stop --cameras this many times while recording with pre-roll and "
+                             "exit non-zero on leaked threads, files or memory (use --source synthetic)")
+    parser.add_argument('--bench-motion', action='store_true',
+                        help="measure motion detector cost per 1080p frame and exit")
+    parser.add_argument('--startup-check', action='store_true',
+                        help="open the GUI, time first paint and first preview frame, and exit "
+                             "non-zero if either misses its target (use --source synthetic without cameras)")
+    parser.add_argument('--ttfp-target', type=float, default=500,
+                        help="time to first paint target for --startup-check, in ms")
+    parser.add_argument('--ttff-target', type=float, default=2000,
+                        help="time to first frame target for --startup-check, in ms")
+    parser.add_argument('--startup-timeout', type=float, default=15,
+                        help="give up waiting for a first frame after this many seconds")
+    parser.add_argument('--bench-preview', action='store_true',
+                        help="measure preview main-thread cost at 4x1080p and exit")
+    return parser.parse_args(argv)
+
 def main():
+    args = parse_args()
+    if args.bench:
+        run_benchmark(args)
+        return
+    
+    if args.plan_codecs:
+        width, height = (int(v) for v in args.size.lower().split('x'))
+        planner = CodecPlanner(cpu_budget=args.codec_cpu, disk_budget_mb=args.codec_disk_mb)
+        print(planner.report(width, height, args.fps))
+        print(f"Chosen: {planner.choose(width, height, args.fps)}")
+        return
+    
+    if args.bench_motion:
+        benchmark_motion()
+        return
+    
+    if args.list_modes:
+        list_modes(args)
+        return
+    
+    if args.transcode_spools:
+        raise SystemExit(run_transcode(args))
+    
+    if args.locate:
+        raise SystemExit(run_locate(args))
+    
+    if args.review_check:
+        raise SystemExit(run_review_check(args))
+    
+    if args.stress_cycles:
+        raise SystemExit(run_lifecycle_stress(args))
+    
+    if args.headless:
+        raise SystemExit(run_headless(args))
+    
+    if tk is None:
+        raise SystemExit("Tkinter is not available; use --headless")
+    
+    if args.bench_preview:
+        benchmark_preview()
+        return
+    
+    if args.startup_check:
+        raise SystemExit(run_startup_check(args))
+    
     root = tk.Tk()
-    app = DarkCameraGUI(root)
+    app = DarkCameraGUI(root, metrics_outputs=metrics_outputs(args),
+                        cameras=camera_infos(args) if args.source != 'v4l2' else None,
+                        live_view=live_view_options(args), review=args.review or None)
+    app.engine.capture_mode = parse_mode(args.mode) if args.mode else None
+    app.low_latency_var.set(args.low_latency)
+    app.toggle_low_latency()
     root.protocol("WM_DELETE_WINDOW", app.on_closing)
     root.mainloop()
 
 if __name__ == "__main__":
+    # Encoder processes are spawned; frozen (PyInstaller) builds need this first
+    import multiprocessing
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file